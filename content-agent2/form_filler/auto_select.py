@@ -5,8 +5,10 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from playwright.async_api import Page
 
-from .utils import normalize
+from .option_match import canon_pref, norm_text, pref_code, profile_cosine, text_profile
 from .selectors import extract_labels_bulk
+from .runtime import ff_call, register
+from .url_classifier import UrlClassifier
 
 _PLACEHOLDER_RE = re.compile(r"(選択してください|please select|choose|未選択)", re.I)
 
@@ -20,7 +22,7 @@ def _is_placeholder(text: str, value: str) -> bool:
 
 
 def _norm(s: Optional[str]) -> str:
-    return normalize(s or "")
+    return norm_text(s)
 
 
 def _attr_text(field: Dict[str, Any]) -> str:
@@ -35,20 +37,82 @@ def _attr_text(field: Dict[str, Any]) -> str:
     return _norm(" ".join(parts))
 
 
+# select の選択肢 [text, value, disabled]
+_SELECT_OPTIONS_JS = register("selectOptions", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return [];
+  const arr = [];
+  for (const o of el.querySelectorAll('option')) {
+    arr.push([(o.textContent||'').trim(), (o.value||'').trim(), !!o.disabled]);
+  }
+  return arr;
+}
+""")
+
+# 描画されているか（矩形あり・visibility/display で隠れていない）
+_RENDERED_JS = register("rendered", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return false;
+  const r = el.getClientRects();
+  const cs = window.getComputedStyle(el);
+  return !!(r && r.length > 0) && cs.visibility !== 'hidden' && cs.display !== 'none';
+}
+""")
+
+# ラベル文字列が一致する option を選び change を発火（引数は [selector, label]。選んだ value を返す）
+_SELECT_BY_LABEL_JS = register("selectByLabel", r"""
+([sel, label]) => {
+  const el = document.querySelector(sel);
+  if (!el) return null;
+  const opt = Array.from(el.options).find(o => (o.textContent||'').trim() === label);
+  if (!opt) return null;
+  el.value = opt.value;
+  el.dispatchEvent(new Event('change', {bubbles:true}));
+  return opt.value;
+}
+""")
+
+
+# 複数 select の可視性・現在値（withOptions なら選択肢 [text, value, disabled] も）。見つからなければ null
+_SELECT_STATE_JS = register("selectState", r"""
+([sels, withOptions]) => sels.map((sel) => {
+  const el = document.querySelector(sel);
+  if (!el || el.tagName.toLowerCase() !== 'select') return null;
+  const r = el.getClientRects();
+  const cs = window.getComputedStyle(el);
+  const st = {
+    visible: !!(r && r.length > 0) && cs.visibility !== 'hidden' && cs.display !== 'none',
+    value: el.value,
+  };
+  if (withOptions) {
+    st.options = Array.from(el.querySelectorAll('option')).map((o) => [(o.textContent||'').trim(), (o.value||'').trim(), !!o.disabled]);
+  }
+  return st;
+})
+""")
+
+# [{selector, label}] をまとめて選択。値が変わるものだけ input/change を発火し、選択後の value を返す
+_APPLY_SELECTS_JS = register("applySelects", r"""
+(ops) => ops.map((op) => {
+  const el = document.querySelector(op.selector);
+  if (!el || !el.options) return { ok: false };
+  const opt = Array.from(el.options).find((o) => (o.textContent||'').trim() === op.label);
+  if (!opt || opt.disabled) return { ok: false };
+  if (el.value !== opt.value) {
+    el.value = opt.value;
+    el.dispatchEvent(new Event('input', {bubbles:true}));
+    el.dispatchEvent(new Event('change', {bubbles:true}));
+  }
+  return { ok: el.value === opt.value, value: el.value };
+})
+""")
+
+
 async def _get_options(page: Page, selector: str) -> List[Tuple[str, str, bool]]:
     try:
-        return await page.evaluate(
-            """(sel) => {
-                const el = document.querySelector(sel);
-                if (!el) return [];
-                const arr = [];
-                for (const o of el.querySelectorAll('option')) {
-                    arr.push([(o.textContent||'').trim(), (o.value||'').trim(), !!o.disabled]);
-                }
-                return arr;
-            }""",
-            selector,
-        )
+        return await ff_call(page, "selectOptions", selector)
     except Exception:
         return []
 
@@ -64,9 +128,6 @@ def _classify_select(field: Dict[str, Any], options: List[Tuple[str, str, bool]]
     return "unknown"
 
 
-_PREF_SUFFIX = re.compile(r"[都道府県]$")
-
-
 def _get_pref_from_data(data: Dict[str, Any]) -> Optional[str]:
     keys = [
         "prefecture",
@@ -85,27 +146,21 @@ def _get_pref_from_data(data: Dict[str, Any]) -> Optional[str]:
 
 
 def _best_pref_match(options: List[Tuple[str, str, bool]], pref: str) -> Optional[str]:
-    """Prefecture picker: no fuzzy fallback; canonical exact/contains only."""
-    def _canon_pref(s: str) -> str:
-        t = _norm(s)
-        t = re.sub(r"\s+", "", t)
-        if not t:
-            return ""
-        if "北海道" in t:
-            return "北海道"  # special-case
-        return _PREF_SUFFIX.sub("", t)  # strip one trailing suffix
-
-    target = _canon_pref(pref)
+    """Prefecture picker: no fuzzy fallback; prefecture code / canonical exact, then canonical contains."""
+    target = canon_pref(pref)
     if not target:
         return None
+    code = pref_code(pref)
 
-    # 1) exact canonical match (label/value)
+    # 1) exact match: same prefecture code (kanji/kana/romaji variants) or same canonical string (label/value)
     for text, value, disabled in options:
         if disabled or _is_placeholder(text, value):
             continue
         lab = (text or "").strip()
         val = (value or "").strip()
-        if _canon_pref(lab) == target or _canon_pref(val) == target:
+        if code is not None and (pref_code(lab) == code or pref_code(val) == code):
+            return lab
+        if canon_pref(lab) == target or canon_pref(val) == target:
             return lab
 
     # 2) safe contains on canonical
@@ -114,7 +169,7 @@ def _best_pref_match(options: List[Tuple[str, str, bool]], pref: str) -> Optiona
             continue
         lab = (text or "").strip()
         val = (value or "").strip()
-        if target in _canon_pref(lab) or target in _canon_pref(val):
+        if target in canon_pref(lab) or target in canon_pref(val):
             return lab
 
     return None
@@ -129,36 +184,18 @@ def _get_inquiry_phrase(data: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def _bigrams(s: str) -> List[str]:
-    s = f" {s} "
-    return [s[i:i+2] for i in range(max(len(s)-1, 1))]
-
-
-def _cosine_sim(a: List[str], b: List[str]) -> float:
-    from collections import Counter
-    ca, cb = Counter(a), Counter(b)
-    common = set(ca) & set(cb)
-    dot = sum(ca[x]*cb[x] for x in common)
-    na = sum(v*v for v in ca.values()) ** 0.5
-    nb = sum(v*v for v in cb.values()) ** 0.5
-    if na == 0 or nb == 0:
-        return 0.0
-    return dot / (na * nb)
-
-
 def _score_inquiry_option(label: str, query: str) -> float:
-    t = _norm(label)
-    q = _norm(query)
+    pt = text_profile(label)
+    pq = text_profile(query)
+    t, q = pt.norm, pq.norm
     score = 0.0
     if t == q:
         score += 1.5
     if q in t:
         score += 1.0
-    score += 0.9 * _cosine_sim(_bigrams(t), _bigrams(q))
-    toks_t = set([x for x in re.split(r"[\s/・,、]+", t) if x])
-    toks_q = set([x for x in re.split(r"[\s/・,、]+", q) if x])
-    if toks_q:
-        score += 0.6 * (len(toks_t & toks_q) / len(toks_q))
+    score += 0.9 * profile_cosine(pt, pq)
+    if pq.tokens:
+        score += 0.6 * (len(pt.tokens & pq.tokens) / len(pq.tokens))
     score += min(len(label), 60) * 0.005
     return score
 
@@ -231,78 +268,158 @@ def _choose_job_option(options: List[Tuple[str, str, bool]], level: str) -> Opti
     return None
 
 
-async def auto_select_all(page: Page, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+def _choose_for_select(
+    field: Dict[str, Any], options: List[Tuple[str, str, bool]], data: Dict[str, Any]
+) -> Tuple[str, Optional[str], str]:
+    """select 1つ分の (種別, 選ぶ option のラベル, 理由)。選ばない場合ラベルは None"""
+    stype = _classify_select(field, options)
+    if stype == "unknown":
+        return stype, None, ""
+
+    chosen_label: Optional[str] = None
+    reason = ""
+    if stype == "prefecture":
+        pref = _get_pref_from_data(data)
+        if pref:
+            chosen_label = _best_pref_match(options, pref)
+            reason = f"pref={pref}"
+    elif stype == "inquiry":
+        phrase = _get_inquiry_phrase(data)
+        if phrase:
+            chosen_label = _choose_inquiry(options, phrase)
+            reason = f"phrase={phrase}"
+    elif stype == "position":
+        lvl = _job_level_from_data(data)
+        if lvl:
+            chosen_label = _choose_job_option(options, lvl)
+            reason = f"level={lvl}"
+
+    if not chosen_label:
+        for text, value, disabled in options:
+            if disabled or _is_placeholder(text, value):
+                continue
+            if re.search(r"(その他|お問い合わせ|general|contact)", text, re.I):
+                chosen_label = text.strip()
+                reason = (reason + " fallback=other").strip()
+                break
+    return stype, chosen_label, reason
+
+
+def _option_value(options: List[Tuple[str, str, bool]], label: str) -> Optional[str]:
+    for text, value, _disabled in options:
+        if (text or "").strip() == label:
+            return value
+    return None
+
+
+async def _select_with_playwright(page: Page, selector: str, label: str) -> None:
+    try:
+        # Try label first
+        await page.select_option(selector, label=label)
+    except Exception:
+        # Fallback: set the option by label in-page, then re-select by value
+        try:
+            value = await ff_call(page, "selectByLabel", [selector, label])
+            if value:
+                await page.select_option(selector, value=value)
+        except Exception:
+            pass
+
+
+async def _auto_select_each(page: Page, data: Dict[str, Any], selects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """select ごとに可視判定・選択肢取得・選択を行う従来経路（一括スナップショットが使えない場合）"""
     logs: List[Dict[str, Any]] = []
-    fields = await extract_labels_bulk(page, None)
-    selects = [f for f in fields if str(f.get("tag", "")).lower() == "select" and f.get("selector")]
     for field in selects:
         selector = field["selector"]
         try:
-            vis = await page.evaluate(
-                "(sel)=>{const el=document.querySelector(sel); if(!el) return false; const r=el.getClientRects(); return !!(r && r.length>0) && window.getComputedStyle(el).visibility!=='hidden' && window.getComputedStyle(el).display!=='none'; }",
-                selector,
-            )
+            vis = await ff_call(page, "rendered", selector)
             if not vis:
                 continue
         except Exception:
             pass
 
         options = await _get_options(page, selector)
-        stype = _classify_select(field, options)
-        if stype == "unknown":
-            continue
+        stype, chosen_label, reason = _choose_for_select(field, options, data)
+        if chosen_label:
+            await _select_with_playwright(page, selector, chosen_label)
+            logs.append({
+                "selector": selector, "type": stype, "chosen_label": chosen_label, "reason": reason,
+                "value": _option_value(options, chosen_label),
+            })
+    return logs
+
 
-        chosen_label: Optional[str] = None
-        reason = ""
-        if stype == "prefecture":
-            pref = _get_pref_from_data(data)
-            if pref:
-                chosen_label = _best_pref_match(options, pref)
-                reason = f"pref={pref}"
-        elif stype == "inquiry":
-            phrase = _get_inquiry_phrase(data)
-            if phrase:
-                chosen_label = _choose_inquiry(options, phrase)
-                reason = f"phrase={phrase}"
-        elif stype == "position":
-            lvl = _job_level_from_data(data)
-            if lvl:
-                chosen_label = _choose_job_option(options, lvl)
-                reason = f"level={lvl}"
-
-        if not chosen_label:
-            for text, value, disabled in options:
-                if disabled or _is_placeholder(text, value):
-                    continue
-                if re.search(r"(その他|お問い合わせ|general|contact)", text, re.I):
-                    chosen_label = text.strip()
-                    reason = (reason + " fallback=other").strip()
-                    break
+async def _apply_selections(page: Page, logs: List[Dict[str, Any]]) -> None:
+    """logs の選択を1回の applySelects でまとめて反映し、反映できなかったものだけ select_option で入れ直す"""
+    try:
+        res = await ff_call(page, "applySelects", [{"selector": x["selector"], "label": x["chosen_label"]} for x in logs])
+    except Exception:
+        res = None
+    if not isinstance(res, list) or len(res) != len(logs):
+        res = [None] * len(logs)
+    for entry, r in zip(logs, res):
+        if isinstance(r, dict) and r.get("ok"):
+            entry["value"] = r.get("value", entry.get("value"))
+        else:
+            await _select_with_playwright(page, entry["selector"], entry["chosen_label"])
+
+
+async def auto_select_all(
+    page: Page, data: Dict[str, Any], *, classifier: Optional[UrlClassifier] = None
+) -> List[Dict[str, Any]]:
+    """
+    都道府県・問い合わせ種別・役職の select を選ぶ。
+    全 select の可視性・現在値・選択肢を1回の selectState で取り、Python で選んで1回の applySelects で反映する。
+    戻り値の各要素の value は選んだ option の値（reassert_selects が変化の検出に使う）。
+    classifier は extract_labels_bulk に渡す（広告 iframe の判定）。
+    """
+    fields = await extract_labels_bulk(page, None, classifier=classifier)
+    selects = [f for f in fields if str(f.get("tag", "")).lower() == "select" and f.get("selector")]
+    if not selects:
+        return []
+    try:
+        states = await ff_call(page, "selectState", [[f["selector"] for f in selects], True])
+    except Exception:
+        states = None
+    if not isinstance(states, list) or len(states) != len(selects):
+        return await _auto_select_each(page, data, selects)
 
+    logs: List[Dict[str, Any]] = []
+    for field, st in zip(selects, states):
+        if not isinstance(st, dict) or not st.get("visible"):
+            continue
+        options = [tuple(o) for o in st.get("options") or []]
+        stype, chosen_label, reason = _choose_for_select(field, options, data)
         if chosen_label:
-            try:
-                # Try label first
-                await page.select_option(selector, label=chosen_label)
-            except Exception:
-                # Fallback: resolve value by label and select by value
-                try:
-                    value = await page.evaluate("""(sel, lbl)=>{
-                        const el=document.querySelector(sel); if(!el) return null;
-                        const opt=[...el.options].find(o=>(o.textContent||'').trim()===lbl); return opt? (opt.value||null): null; }""", selector, chosen_label)
-                    if value:
-                        await page.select_option(selector, value=value)
-                except Exception:
-                    pass
-                await page.evaluate(
-                    """(sel, label) => {
-                        const el = document.querySelector(sel); if(!el) return;
-                        const opt = Array.from(el.options).find(o => (o.textContent||'').trim() === label);
-                        if (opt) { el.value = opt.value; el.dispatchEvent(new Event('change', {bubbles:true})); }
-                    }""",
-                    selector,
-                    chosen_label,
-                )
-            logs.append({"selector": selector, "type": stype, "chosen_label": chosen_label, "reason": reason})
+            logs.append({
+                "selector": field["selector"], "type": stype, "chosen_label": chosen_label, "reason": reason,
+                "value": _option_value(options, chosen_label),
+            })
+    if logs:
+        await _apply_selections(page, logs)
     return logs
 
 
+async def reassert_selects(
+    page: Page, data: Dict[str, Any], logs: List[Dict[str, Any]], *, classifier: Optional[UrlClassifier] = None
+) -> List[Dict[str, Any]]:
+    """
+    auto_select_all の選択のうち、その後に値が変わってしまった select だけを選び直す（現在値は1回の selectState）。
+    現在値を読めない場合は auto_select_all をやり直す。戻り値: 選び直したもの
+    """
+    targets = [x for x in logs if x.get("value") is not None]
+    if not targets:
+        return []
+    try:
+        states = await ff_call(page, "selectState", [[x["selector"] for x in targets], False])
+    except Exception:
+        states = None
+    if not isinstance(states, list) or len(states) != len(targets):
+        return await auto_select_all(page, data, classifier=classifier)
+    changed = [
+        dict(x) for x, st in zip(targets, states)
+        if isinstance(st, dict) and st.get("visible") and (st.get("value") or "").strip() != (x["value"] or "").strip()
+    ]
+    if changed:
+        await _apply_selections(page, changed)
+    return changed
@@ -0,0 +1,150 @@
+"""
+一括入力（--batch-fill）
+
+fill_form の従来経路はキーごとにスコープ判定・personal 判定・element_handle・tagName・type・closest('form')
+を個別に問い合わせてから fill/select_option/check を呼ぶ（1欄あたり約10往復）。
+ここでは {selector, value} の入力計画（欄の種類はページ内で判定）をフレームごとに1回の evaluate で渡し、ページ内で
+ネイティブ setter による値設定と input/change/blur の発火（Angular の ng-model は $apply）まで済ませる。
+欄ごとの成否を返し、失敗した欄だけ呼び出し側が Playwright の fill（操作可能性チェック付き）に戻す。
+- 非表示・無効・読み取り専用・スコープ外・personal 系の欄は触らずに失敗として返す
+- radio はラベル類似度で選ぶ従来経路に任せる（unsupported）
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from .runtime import ff_call, register
+
+__all__ = ["FillOp", "FillOutcome", "apply_fill_ops"]
+
+
+@dataclass(slots=True)
+class FillOp:
+    """1欄分の入力計画。textarea_value があれば textarea の場合だけそちらを入れる"""
+    key: str
+    selector: str
+    value: str
+    checked: bool = True
+    textarea_value: Optional[str] = None
+
+    def to_js(self) -> Dict[str, Any]:
+        return {
+            "selector": self.selector,
+            "value": self.value,
+            "checked": self.checked,
+            "textareaValue": self.textarea_value,
+        }
+
+
+@dataclass(slots=True)
+class FillOutcome:
+    """1欄分の結果。ok=False の reason は missing/hidden/disabled/out-of-scope/personal/no-option/too-long/mismatch/unsupported/error"""
+    key: str
+    ok: bool
+    reason: str = ""
+    tag: str = ""
+    input_type: str = ""
+    value: str = ""
+    angular: bool = False
+
+
+_BATCH_FILL_JS = register("fill", r"""
+([ops, scopeSel]) => {
+  const personalRe = /(personal|private|kojin|個人)/i;
+  const root = scopeSel ? document.querySelector(scopeSel) : null;
+  const isPersonal = (el) => {
+    for (let n = el; n && n.nodeType === 1; n = n.parentElement) {
+      const tokens = ((n.id || '') + ' ' + (n.getAttribute('name') || '') + ' ' + (typeof n.className === 'string' ? n.className : '')).toLowerCase();
+      if (personalRe.test(tokens)) return true;
+    }
+    return false;
+  };
+  const isVisible = (el) => {
+    const st = getComputedStyle(el);
+    if (st.display === 'none' || st.visibility === 'hidden') return false;
+    return el.getClientRects().length > 0;
+  };
+  const fire = (el, type, Ctor) => el.dispatchEvent(new (Ctor || Event)(type, { bubbles: true }));
+  const setNative = (el, v) => {
+    const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+      : el instanceof HTMLSelectElement ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+    const desc = Object.getOwnPropertyDescriptor(proto, 'value');
+    if (desc && desc.set) desc.set.call(el, v); else el.value = v;
+  };
+  const ngApply = (el) => {
+    if (!(el.hasAttribute('ng-model') || el.hasAttribute('data-ng-model'))) return false;
+    try {
+      const scope = window.angular && window.angular.element && window.angular.element(el).scope();
+      if (scope) scope.$apply();
+    } catch (e) {}
+    return true;
+  };
+  return ops.map((op) => {
+    const el = document.querySelector(op.selector);
+    if (!el) return { ok: false, reason: 'missing' };
+    const tag = el.tagName.toLowerCase();
+    const type = (el.getAttribute('type') || '').toLowerCase();
+    const base = { tag, type };
+    if (root && !root.contains(el)) return { ...base, ok: false, reason: 'out-of-scope' };
+    if (isPersonal(el)) return { ...base, ok: false, reason: 'personal' };
+    if (type === 'radio') return { ...base, ok: false, reason: 'unsupported' };
+    if (!isVisible(el)) return { ...base, ok: false, reason: 'hidden' };
+    if (el.disabled || el.readOnly) return { ...base, ok: false, reason: 'disabled' };
+    try {
+      if (type === 'checkbox') {
+        if (!op.checked || el.checked) return { ...base, ok: true, value: String(el.checked) };
+        el.click();
+        return { ...base, ok: el.checked, reason: el.checked ? '' : 'mismatch', value: String(el.checked) };
+      }
+      let v = op.value;
+      if (tag === 'select') {
+        if (!Array.from(el.options).some((o) => o.value === v)) return { ...base, ok: false, reason: 'no-option' };
+      } else if (tag === 'textarea' && op.textareaValue != null) {
+        v = op.textareaValue;
+      }
+      // ネイティブ setter は maxlength を無視するため、超える値は従来の fill に任せる
+      if (tag !== 'select' && el.maxLength > 0 && v.length > el.maxLength) return { ...base, ok: false, reason: 'too-long' };
+      fire(el, 'focus', FocusEvent);
+      setNative(el, v);
+      if (tag !== 'select') fire(el, 'input', InputEvent);
+      fire(el, 'change');
+      fire(el, 'blur', FocusEvent);
+      fire(el, 'focusout', FocusEvent);
+      const angular = ngApply(el);
+      const ok = el.value === v;
+      return { ...base, ok, reason: ok ? '' : 'mismatch', value: el.value, angular };
+    } catch (e) {
+      return { ...base, ok: false, reason: 'error:' + (e && e.message || e) };
+    }
+  });
+}
+""")
+
+
+async def apply_fill_ops(frame: Any, ops: Sequence[FillOp], scope_selector: Optional[str] = None) -> List[FillOutcome]:
+    """
+    ops を frame 内で1回の evaluate で適用し、ops と同じ順序で結果を返す。
+    evaluate 自体が失敗した場合は全件 ok=False（reason='error:...'）として返す（呼び出し側で従来経路へ）。
+    """
+    if not ops:
+        return []
+    try:
+        raw = await ff_call(frame, "fill", [[op.to_js() for op in ops], scope_selector])
+    except Exception as e:
+        return [FillOutcome(op.key, False, f"error:{e}") for op in ops]
+    if not isinstance(raw, list) or len(raw) != len(ops):
+        return [FillOutcome(op.key, False, "error:unexpected-result") for op in ops]
+    return [
+        FillOutcome(
+            op.key,
+            bool(r.get("ok")),
+            r.get("reason") or "",
+            r.get("tag") or "",
+            r.get("type") or "",
+            r.get("value") or "",
+            bool(r.get("angular")),
+        )
+        for op, r in zip(ops, raw)
+    ]
@@ -0,0 +1,156 @@
+"""
+リクエスト遮断エンジン
+
+従来は context.route("**/*") で全リクエストを Python のコールバックに通していたが、
+ここでは判定の大半を Chromium / Playwright ドライバ側で済ませる。
+- 広告・解析ドメイン: CDP Network.setBlockedURLs でページ単位にネイティブ遮断
+  （許可リストと重なるドメイン（例: www.googletagmanager.com/gtag/js）は除外し、route 側で許可/遮断を判定）
+- 同ドメインの取りこぼし（OOPIF・ポップアップ・CDP 失敗時）: ホスト名正規表現の route で遮断
+- 画像/フォント/メディア: 拡張子の正規表現に一致したものだけ Python に回し、
+  フォーム補助（reCAPTCHA 等）なら許可、それ以外は遮断（"曖昧なケース"のみ Python で判定）
+route の URL 正規表現はドライバ側で照合されるため、一致しないリクエストは Python を往復しない。
+拡張子のない画像URL（/image?id=... 等）は遮断されずに読み込まれる。
+ドメイン判定と遮断件数の集計は UrlClassifier が担う。
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Iterable, List, Optional, Sequence
+
+from playwright.async_api import BrowserContext, Page, Request, Route
+
+from .constants import BLOCKED_RESOURCE_TYPES
+from .url_classifier import ALLOW, BLOCK, UrlClassifier
+
+__all__ = ["RequestBlocker"]
+
+logger = logging.getLogger(__name__)
+
+# 画像/フォント/メディアとみなす拡張子（クエリ・フラグメント付きも対象）
+_STATIC_EXTENSIONS = (
+    "png", "jpe?g", "gif", "webp", "avif", "bmp", "ico", "svg",
+    "woff2?", "ttf", "otf", "eot",
+    "mp4", "webm", "mov", "m4v", "mp3", "m4a", "ogg", "wav",
+)
+
+
+def _host_regex(domains: Iterable[str]) -> re.Pattern:
+    """ドメイン（またはそのサブドメイン）をホストに持つURLの正規表現（JS互換の構文のみ使用）"""
+    alt = "|".join(re.escape(d.strip().lower()) for d in domains if d and d.strip())
+    return re.compile(rf"^[a-z][a-z0-9+.-]*://(?:[^/?#@]*@)?(?:[^/?#:]*\.)?(?:{alt})(?::\d+)?(?:[/?#]|$)", re.I)
+
+
+def _native_block_domains(block: Iterable[str], allow_hosts: Iterable[str]) -> List[str]:
+    """
+    ネイティブ遮断してよいドメイン。許可エントリのホストがそのドメイン自身・サブドメイン・親ドメインなら除く
+    （CDP はパス単位の例外を持てず、route に届く前に遮断してしまうため）
+    """
+    allow = [h for h in allow_hosts if h]
+    out: List[str] = []
+    for d in block:
+        if any(h == d or h.endswith("." + d) or d.endswith("." + h) for h in allow):
+            continue
+        out.append(d)
+    return out
+
+
+def _cdp_patterns(domains: Iterable[str]) -> List[str]:
+    """Network.setBlockedURLs 用のワイルドカードパターン"""
+    out: List[str] = []
+    for d in domains:
+        d = (d or "").strip().lower()
+        if d:
+            out.extend([f"*://{d}/*", f"*://*.{d}/*"])
+    return out
+
+
+def _cdp_unsupported(page: Page, error: Exception) -> bool:
+    """new_cdp_session の失敗がブラウザの機能不足（Chromium 以外）によるものか"""
+    if page.is_closed():
+        return False
+    browser = getattr(page.context, "browser", None)
+    browser_type = getattr(browser, "browser_type", None)
+    if browser_type is not None and getattr(browser_type, "name", "chromium") != "chromium":
+        return True
+    return "only available in chromium" in str(error).lower()
+
+
+class RequestBlocker:
+    """コンテキスト/ページへ遮断ルールを組み込む"""
+
+    def __init__(
+        self,
+        classifier: Optional[UrlClassifier] = None,
+        blocked_types: Sequence[str] = BLOCKED_RESOURCE_TYPES,
+    ) -> None:
+        self.classifier = classifier or UrlClassifier()
+        self.ad_domains = self.classifier.block_domains
+        self.blocked_types = frozenset(blocked_types)
+        self._ad_re = _host_regex(self.ad_domains)
+        self._static_re = re.compile(
+            rf"\.(?:{'|'.join(_STATIC_EXTENSIONS)})(?:[?#]|$)", re.I
+        )
+        self.cdp_patterns = _cdp_patterns(_native_block_domains(self.ad_domains, self.classifier.allow_hosts))
+        self.native = True  # CDP が使えない環境（Chromium 以外など）では False に落とす
+
+    def is_form_helper(self, url: str) -> bool:
+        return self.classifier.is_allowed(url)
+
+    async def install(self, context: BrowserContext) -> None:
+        """コンテキスト単位の route（ドライバ側で URL を照合）を登録"""
+        if self.ad_domains:
+            await context.route(self._ad_re, self._on_ad)
+        if self.blocked_types:
+            await context.route(self._static_re, self._on_static)
+
+    async def attach(self, page: Page) -> bool:
+        """ページに CDP のネイティブ遮断を設定。失敗時は route 側の遮断だけで動作する"""
+        if not self.native or not self.cdp_patterns:
+            return False
+        try:
+            session = await page.context.new_cdp_session(page)
+        except Exception as e:
+            if _cdp_unsupported(page, e):
+                # ブラウザが CDP を持たない（Chromium 以外）。以降のページでも試さない
+                self.native = False
+                logger.info(f"[blocking] CDP 遮断を無効化（route のみで継続）: {e}")
+            else:
+                # 閉じた・クラッシュしたページなど。このページだけ route のみで動かす
+                logger.debug(f"[blocking] このページは CDP 遮断なし（route のみ）: {e}")
+            return False
+        try:
+            await session.send("Network.enable")
+            await session.send("Network.setBlockedURLs", {"urls": self.cdp_patterns})
+            # ネイティブ遮断は Python を通らないため、失敗イベントから件数だけ数える
+            page.on("requestfailed", self._on_failed)
+            return True
+        except Exception as e:
+            logger.debug(f"[blocking] このページは CDP 遮断なし（route のみ）: {e}")
+            return False
+
+    def _on_failed(self, request: Request) -> None:
+        try:
+            if "ERR_BLOCKED_BY_CLIENT" not in (request.failure or ""):
+                return
+            rule = self.classifier.match_block(request.url)
+            if rule is not None:
+                self.classifier.record(BLOCK, rule)
+        except Exception:
+            pass
+
+    async def _on_ad(self, route: Route) -> None:
+        if self.classifier.classify(route.request.url) == ALLOW:
+            await route.continue_()
+        else:
+            await route.abort()
+
+    async def _on_static(self, route: Route) -> None:
+        r = route.request
+        if r.resource_type in self.blocked_types and not self.is_form_helper(r.url):
+            self.classifier.record(r.resource_type, "static")
+            await route.abort()
+        else:
+            # 広告ドメインの route にも判定を回す
+            await route.fallback()
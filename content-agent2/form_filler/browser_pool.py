@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+__all__ = ["BrowserPool", "DEFAULT_LAUNCH_ARGS"]
+
+logger = logging.getLogger(__name__)
+
+# Chromium 起動引数（従来 process_form 内で指定していたものと同一）
+DEFAULT_LAUNCH_ARGS: List[str] = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-web-security",
+    "--disable-features=VizDisplayCompositor",
+]
+
+ContextConfigurer = Callable[[BrowserContext], Awaitable[None]]
+
+# 再利用前に訪問オリジンごとに消すストレージ（Cookie は clear_cookies でコンテキスト全体を消す）
+_STORAGE_TYPES = "local_storage,indexeddb,websql,file_systems,cache_storage,service_workers"
+
+
+class BrowserPool:
+    """
+    長寿命の Chromium を N 個保持し、タスクごとに BrowserContext を払い出すプール。
+    - ブラウザは初回利用時に遅延起動する（入力が空なら Chromium を起動しない）
+    - 払い出しはラウンドロビン。切断されたブラウザは次回利用時に再起動する
+    - context_options / configure で viewport・UA・ルーティング等を各コンテキストに適用する
+    - warm_contexts>0 のとき、ブラウザごとに設定済みコンテキストを K 個温めておき lease() で再利用する。
+      max_pages 回使用したもの／JSヒープが max_heap_mb を超えたものは破棄し、裏で補充する。
+      返却時に Cookie・権限と、訪問したオリジンの localStorage/IndexedDB 等を消してから再利用する
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        *,
+        headless: bool = True,
+        launch_args: Optional[Sequence[str]] = None,
+        context_options: Optional[Dict[str, Any]] = None,
+        configure: Optional[ContextConfigurer] = None,
+        warm_contexts: int = 0,
+        max_pages: int = 50,
+        max_heap_mb: float = 256.0,
+    ) -> None:
+        self.size = max(1, int(size or 1))
+        self.headless = headless
+        self.launch_args = list(launch_args if launch_args is not None else DEFAULT_LAUNCH_ARGS)
+        self.context_options = dict(context_options or {})
+        self.configure = configure
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[Optional[Browser]] = [None] * self.size
+        self._next = 0
+        self._lock = asyncio.Lock()
+        self._closed = False
+        # 温めたコンテキスト（ブラウザのスロットごと）と使用回数
+        self.warm_contexts = max(0, int(warm_contexts or 0))
+        self.max_pages = max(1, int(max_pages or 1))
+        self.max_heap_mb = float(max_heap_mb or 0)
+        self._idle: List[List[BrowserContext]] = [[] for _ in range(self.size)]
+        self._uses: Dict[int, int] = {}
+        self._slot_of: Dict[int, int] = {}
+        # コンテキストごとに文書を読み込んだオリジン（返却時にストレージを消す対象）
+        self._origins: Dict[int, set[str]] = {}
+        # スロットごとに補充タスクは1つだけ
+        self._refills: Dict[int, asyncio.Task] = {}
+        self.recycled = 0
+
+    async def __aenter__(self) -> "BrowserPool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _ensure_playwright(self) -> Playwright:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        return self._playwright
+
+    async def _launch(self) -> Browser:
+        p = await self._ensure_playwright()
+        browser = await p.chromium.launch(headless=self.headless, args=self.launch_args)
+        logger.debug(f"[browser-pool] Chromium 起動 (pool size={self.size})")
+        return browser
+
+    async def _acquire_slot(self) -> Tuple[int, Browser]:
+        if self._closed:
+            raise RuntimeError("BrowserPool は既にクローズされています")
+        async with self._lock:
+            slot = self._next
+            self._next = (self._next + 1) % self.size
+            browser = self._browsers[slot]
+            if browser is None or not browser.is_connected():
+                # 切断済みブラウザに紐づく温めたコンテキストは使えないので捨てる
+                for ctx in self._idle[slot]:
+                    self._forget(ctx)
+                self._idle[slot] = []
+                browser = await self._launch()
+                self._browsers[slot] = browser
+                self._schedule_refill(slot)
+            return slot, browser
+
+    async def acquire_browser(self) -> Browser:
+        """ラウンドロビンでブラウザを1つ返す（未起動/切断済みなら起動）"""
+        _, browser = await self._acquire_slot()
+        return browser
+
+    async def _create_context(self, browser: Browser) -> BrowserContext:
+        context = await browser.new_context(**self.context_options)
+        if self.configure is not None:
+            try:
+                await self.configure(context)
+            except Exception:
+                await context.close()
+                raise
+        return context
+
+    async def new_context(self) -> BrowserContext:
+        """設定済みの新しい BrowserContext を生成"""
+        browser = await self.acquire_browser()
+        return await self._create_context(browser)
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator[BrowserContext]:
+        """タスク1件分のコンテキストを払い出し、終了時に必ずクローズする"""
+        context = await self.new_context()
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    # ========= 温めたコンテキストの再利用 =========
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[BrowserContext]:
+        """
+        温めたコンテキストを1つ貸し出す（warm_contexts=0 なら context() と同じく使い捨て）。
+        返却時にページを閉じ、使用回数/JSヒープで再利用可否を判定する。
+        """
+        if self.warm_contexts <= 0:
+            async with self.context() as context:
+                yield context
+            return
+        slot, browser = await self._acquire_slot()
+        idle = self._idle[slot]
+        if idle:
+            context = idle.pop()
+        else:
+            context = await self._create_context(browser)
+            self._track(context, slot)
+        try:
+            yield context
+        finally:
+            await self._release(context)
+
+    def _track(self, context: BrowserContext, slot: int) -> None:
+        key = id(context)
+        self._uses[key] = 0
+        self._slot_of[key] = slot
+        origins: set[str] = set()
+        self._origins[key] = origins
+
+        def on_request(request: Any) -> None:
+            # フレームの文書（iframe 含む）のオリジンだけ記録する。ストレージはこれらのオリジンにしか書かれない
+            try:
+                if request.resource_type != "document":
+                    return
+                u = urlsplit(request.url)
+                if u.scheme in ("http", "https") and u.netloc:
+                    origins.add(f"{u.scheme}://{u.netloc}")
+            except Exception:
+                pass
+
+        context.on("request", on_request)
+
+    def _forget(self, context: BrowserContext) -> None:
+        self._uses.pop(id(context), None)
+        self._slot_of.pop(id(context), None)
+        self._origins.pop(id(context), None)
+
+    async def _js_heap_mb(self, context: BrowserContext) -> float:
+        """CDP Performance.getMetrics の JSHeapUsedSize（MB）。取れなければ 0"""
+        pages = list(context.pages)
+        if not pages:
+            return 0.0
+        session = None
+        try:
+            session = await context.new_cdp_session(pages[0])
+            await session.send("Performance.enable")
+            res = await session.send("Performance.getMetrics")
+            for m in res.get("metrics", []):
+                if m.get("name") == "JSHeapUsedSize":
+                    return float(m.get("value") or 0) / (1024 * 1024)
+        except Exception:
+            pass
+        finally:
+            if session is not None:
+                try:
+                    await session.detach()
+                except Exception:
+                    pass
+        return 0.0
+
+    async def _clear_state(self, context: BrowserContext) -> None:
+        """
+        前のタスクの状態を消す（Cookie・権限・訪問したオリジンの localStorage/IndexedDB/Cache Storage/Service Worker）。
+        sessionStorage はページ（タブ）単位のため、ページを閉じれば消える。
+        Storage.clearDataForOrigin はセッションのページが属するコンテキストのストレージに効くので、ページを閉じる前に呼ぶ。
+        """
+        await context.clear_cookies()
+        await context.clear_permissions()
+        origins = self._origins.get(id(context))
+        if not origins:
+            return
+        pages = list(context.pages)
+        page = pages[0] if pages else await context.new_page()
+        session = await context.new_cdp_session(page)
+        try:
+            for origin in sorted(origins):
+                await session.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": _STORAGE_TYPES})
+        finally:
+            try:
+                await session.detach()
+            except Exception:
+                pass
+        origins.clear()
+
+    async def _release(self, context: BrowserContext) -> None:
+        key = id(context)
+        slot = self._slot_of.get(key, 0)
+        uses = self._uses.get(key, 0) + 1
+        self._uses[key] = uses
+        heap_mb = await self._js_heap_mb(context) if self.max_heap_mb > 0 else 0.0
+
+        browser = self._browsers[slot]
+        alive = browser is not None and browser.is_connected()
+        recycle = (
+            self._closed
+            or not alive
+            or uses >= self.max_pages
+            or (self.max_heap_mb > 0 and heap_mb >= self.max_heap_mb)
+            or len(self._idle[slot]) >= self.warm_contexts
+        )
+        if not recycle:
+            try:
+                # タスク間で Cookie・ストレージ・権限を持ち越さない（消せなければ破棄する）
+                await self._clear_state(context)
+            except Exception as e:
+                logger.debug(f"[browser-pool] context 状態の消去失敗: {e}")
+                recycle = True
+        for pg in list(context.pages):
+            try:
+                await pg.close()
+            except Exception:
+                pass
+        if not recycle and len(self._idle[slot]) < self.warm_contexts:
+            self._idle[slot].append(context)
+            return
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[browser-pool] context 破棄 uses={uses} heap={heap_mb:.1f}MB")
+        self._forget(context)
+        self.recycled += 1
+        try:
+            await context.close()
+        except Exception:
+            pass
+        if alive and not self._closed:
+            self._schedule_refill(slot)
+
+    def _schedule_refill(self, slot: int) -> None:
+        """
+        不足分の温めたコンテキストを裏で補充（クリティカルパス外）。
+        補充中のタスクがあれば新たに起こさない（そのタスクが不足を見直しながら補充し続ける）。
+        """
+        if self.warm_contexts <= 0 or self._closed:
+            return
+        pending = self._refills.get(slot)
+        if pending is not None and not pending.done():
+            return
+        self._refills[slot] = asyncio.create_task(self._refill(slot))
+
+    async def _refill(self, slot: int) -> None:
+        try:
+            while not self._closed and len(self._idle[slot]) < self.warm_contexts:
+                browser = self._browsers[slot]
+                if browser is None or not browser.is_connected():
+                    return
+                context = await self._create_context(browser)
+                # 生成を待つ間に返却されたコンテキストで埋まっていれば余分は捨てる
+                if self._closed or self._browsers[slot] is not browser or len(self._idle[slot]) >= self.warm_contexts:
+                    await context.close()
+                    return
+                self._track(context, slot)
+                self._idle[slot].append(context)
+        except Exception as e:
+            logger.debug(f"[browser-pool] context 補充失敗: {e}")
+
+    async def close(self) -> None:
+        """全ブラウザと Playwright ドライバを停止（多重呼び出し安全）"""
+        self._closed = True
+        refills, self._refills = list(self._refills.values()), {}
+        for task in refills:
+            task.cancel()
+        if refills:
+            await asyncio.gather(*refills, return_exceptions=True)
+        idle, self._idle = self._idle, [[] for _ in range(self.size)]
+        for contexts in idle:
+            for ctx in contexts:
+                self._forget(ctx)
+                try:
+                    await ctx.close()
+                except Exception:
+                    pass
+        browsers, self._browsers = self._browsers, [None] * self.size
+        for browser in browsers:
+            if browser is None:
+                continue
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
@@ -9,6 +9,7 @@ import typer
 
 from .core import FormFiller
 from .logging_setup import setup_logging  # 追加
+from .sharding import run_sharded
 
 app = typer.Typer(help="フォーム自動入力ツール")
 
@@ -20,12 +21,23 @@ def run(
     output_file: str = typer.Option("result.csv", "--output", "-o", help="結果CSVの出力先"),
     # 実行制御
     concurrency: int = typer.Option(3, "--concurrency"),
+    processes: int = typer.Option(1, "--processes", help="入力をドメイン単位で分割して並行実行するプロセス数（concurrency/browsers はプロセスごと）"),
+    browsers: int = typer.Option(1, "--browsers", help="常駐させるChromiumの数（各ワーカーはタスクごとに新しいコンテキストを使用）"),
+    warm_contexts: int = typer.Option(0, "--warm-contexts", help="ブラウザごとに温めておくコンテキスト数（0でタスクごとに使い捨て）"),
+    context_max_pages: int = typer.Option(50, "--context-max-pages", help="温めたコンテキストを破棄するまでの使用回数"),
+    context_max_heap_mb: float = typer.Option(256.0, "--context-max-heap-mb", help="JSヒープがこのMBを超えたコンテキストは破棄（0で無効）"),
+    blocklist: Optional[str] = typer.Option(None, "--blocklist", help="追加で遮断するドメインのリスト（1行1件）"),
+    allowlist: Optional[str] = typer.Option(None, "--allowlist", help="常に許可するホスト[/パス]のリスト（1行1件）"),
     timeout: int = typer.Option(12, "--timeout"),
     captcha_api: str = typer.Option("none", "--captcha-api"),
     dry_run: bool = typer.Option(False, "--dry-run"),
     no_submit: bool = typer.Option(False, "--no-submit"),
     show_browser: bool = typer.Option(False, "--show-browser"),
     fast: bool = typer.Option(False, "--fast"),
+    triage: bool = typer.Option(False, "--triage", help="ブラウザ投入前にURLを並行プローブし、到達不能/フォームなしの行を即時エラーにする"),
+    http_fast: bool = typer.Option(False, "--http-fast", help="静的なPOSTフォームはブラウザを使わずHTTPで送信（扱えない場合はブラウザへ）"),
+    mapping_cache: Optional[str] = typer.Option(None, "--mapping-cache", help="フォーム構造ごとのマッピングを保存するSQLiteファイル（同じテンプレートは再計算しない）"),
+    batch_fill: bool = typer.Option(False, "--batch-fill", help="マッピング済みの値をページ内で一括入力（失敗した欄だけ従来の fill）"),
     demo_ms: int = typer.Option(0, "--demo-ms", help="可視デモの待機ミリ秒（例: 600）。0で無効"),
     debug: bool = typer.Option(False, "--debug"),
     # Preflight/観測用
@@ -51,15 +63,28 @@ def run(
         out_dir = os.path.dirname(output_file) or "."
         os.makedirs(out_dir, exist_ok=True)
 
-        # フィラー生成
-        filler = FormFiller(
+        filler_kwargs = dict(
             concurrency=concurrency, timeout=timeout, captcha_api=captcha_api,
             dry_run=dry_run, no_submit=no_submit, fast_mode=fast,
             show_browser=show_browser, debug=debug, demo_ms=demo_ms,
+            browsers=browsers, warm_contexts=warm_contexts,
+            context_max_pages=context_max_pages, context_max_heap_mb=context_max_heap_mb,
+            blocklist=blocklist, allowlist=allowlist, http_fast=http_fast,
+            triage=triage, mapping_cache=mapping_cache, batch_fill=batch_fill,
         )
 
-        # 実行（emit_json/limit を run に渡す）
-        asyncio.run(filler.run(input_file, data_file, output_file, emit_json=emit_json, limit=limit))
+        if processes > 1:
+            # ドメイン単位で子プロセスへ分割し、親が入力順にマージ
+            run_sharded(
+                filler_kwargs, input_file, data_file, output_file,
+                processes=processes, emit_json=emit_json, limit=limit, log_level=log_level,
+            )
+        else:
+            # フィラー生成
+            filler = FormFiller(**filler_kwargs)
+
+            # 実行（emit_json/limit を run に渡す）
+            asyncio.run(filler.run(input_file, data_file, output_file, emit_json=emit_json, limit=limit))
         typer.echo(f"処理完了: 結果は '{output_file}' に保存されました")
         
     except Exception as e:
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from playwright.async_api import Page
 
@@ -13,6 +14,93 @@ from .constants import (
     RADIO_NEGATIVE_TOKENS, RADIO_MARKETING_TOKENS,
     RADIO_POSITIVE_TOKENS, RADIO_REQUIRED_ATTRS,
 )
+from .runtime import ff_call, ff_call_el, register
+
+# 同意系（規約・プライバシー等）の語。任意チェックの除外にも使う
+_CONSENT_RE = re.compile(r"(同意|承諾|プライバシー|個人情報|利用規約|規約|privacy|consent|agree|policy|terms)", re.I)
+# 同意系ラジオで選ぶ側
+_PREFER_YES_RE = re.compile(r"(同意する|はい|agree|accept|yes)", re.I)
+# 任意チェックで優先する語（問い合わせ種別など）
+_CATEGORY_RE = re.compile(r"(カテゴリ|カテゴリー|種別|種類|件名|ご用件|subject|category|type|topic)", re.I)
+
+# 同意チェックのピンポイント探索（この順で最初に見つかったものを ON）
+_ACCEPTANCE_TARGETS = [
+    'input#wpcf7-acceptance',
+    '.wpcf7-acceptance input[type="checkbox"]',
+    'input#agree', 'input[name*="agree" i]', 'input[class*="agree" i]',
+    'input[name*="consent" i]', 'input[class*="consent" i]',
+    'input[name*="privacy" i]', 'input[class*="privacy" i]',
+    'input[name*="policy" i]',  'input[class*="policy" i]',
+    'input[name*="terms" i]',   'input[class*="terms" i]',
+    'input[type="checkbox"][aria-label*="同意"]',
+]
+
+# ラジオの必須属性と周辺テキスト（fieldset の legend・祖先 label・th・dt）
+_RADIO_CONTEXT_JS = register("radioContext", r"""
+(el) => {
+  const fs = el.closest('fieldset,[role=group]');
+  const reqAttr = (el.required ? 'required ' : '') + (el.getAttribute('aria-required') || '');
+  let text = '';
+  if (fs) {
+    const lg = fs.querySelector('legend');
+    if (lg) text += ' ' + (lg.innerText||'');
+  }
+  const lab = el.closest('label');
+  if (lab) text += ' ' + (lab.innerText||'');
+  const nearTh = el.closest('tr')?.querySelector('th')?.innerText || '';
+  const nearDt = el.closest('dd')?.previousElementSibling?.innerText || '';
+  return { text: (text + ' ' + nearTh + ' ' + nearDt).toLowerCase(), reqAttr: (reqAttr||'').toLowerCase() };
+}
+""")
+
+# チェックボックス/ラジオのラベル文字列。見つかった最初の候補を返す:
+# label[for] → 祖先 label → dl の dt → aria-labelledby → 親のテキスト先頭64字 → 直前の兄弟（と親の直前兄弟）
+_LABEL_TEXT_JS = register("labelText", r"""
+(n) => {
+  const text = (e) => ((e && e.innerText) || '').trim();
+  if (n.id) {
+    const lab = document.querySelector('label[for="' + CSS.escape(n.id) + '"]');
+    const t = text(lab);
+    if (t) return t;
+  }
+  const t2 = text(n.closest('label'));
+  if (t2) return t2;
+  const dd = n.closest('dd');
+  if (dd && dd.previousElementSibling && dd.previousElementSibling.tagName.toLowerCase() === 'dt') {
+    const t = text(dd.previousElementSibling);
+    if (t) return t;
+  }
+  const ids = (n.getAttribute('aria-labelledby') || '').split(/\s+/).filter(Boolean);
+  const t4 = ids.map((id) => text(document.getElementById(id))).filter(Boolean).join(' ').trim();
+  if (t4) return t4;
+  const t5 = text(n.parentElement).slice(0, 64).trim();
+  if (t5) return t5;
+  const labelish = (e) => {
+    if (!e || e.querySelector('input,textarea,select,button')) return '';
+    const t = text(e);
+    return t && t.length <= 80 ? t : '';
+  };
+  for (let s = n.previousElementSibling, i = 0; i < 3 && s; i++, s = s.previousElementSibling) {
+    const t = labelish(s); if (t) return t;
+  }
+  const p = n.parentElement;
+  if (p) {
+    for (let s = p.previousElementSibling, i = 0; i < 3 && s; i++, s = s.previousElementSibling) {
+      const t = labelish(s); if (t) return t;
+    }
+  }
+  return '';
+}
+""")
+
+
+async def _label_text(el: Any) -> str:
+    """チェックボックス/ラジオのラベル文字列（ページ内の labelText を1往復で呼ぶ）"""
+    try:
+        return (await ff_call_el(el, "labelText") or "").strip()
+    except Exception:
+        return ""
+
 
 async def ensure_required_radio_groups(page: Page, *, logger: Optional[logging.Logger] = None) -> int:
     """
@@ -59,22 +147,7 @@ async def ensure_required_radio_groups(page: Page, *, logger: Optional[logging.L
                     # fieldset/role=group に aria-required
                     if not required_like:
                         try:
-                            ctx = await group[0].evaluate("""
-                                (el) => {
-                                  const fs = el.closest('fieldset,[role=group]');
-                                  const reqAttr = (el.required ? 'required ' : '') + (el.getAttribute('aria-required') || '');
-                                  let text = '';
-                                  if (fs) {
-                                    const lg = fs.querySelector('legend');
-                                    if (lg) text += ' ' + (lg.innerText||'');
-                                  }
-                                  const lab = el.closest('label');
-                                  if (lab) text += ' ' + (lab.innerText||'');
-                                  const nearTh = el.closest('tr')?.querySelector('th')?.innerText || '';
-                                  const nearDt = el.closest('dd')?.previousElementSibling?.innerText || '';
-                                  return { text: (text + ' ' + nearTh + ' ' + nearDt).toLowerCase(), reqAttr: (reqAttr||'').toLowerCase() };
-                                }
-                            """)
+                            ctx = await ff_call_el(group[0], "radioContext")
                         except Exception:
                             ctx = {"text": "", "reqAttr": ""}
                         reqAttr = ctx.get("reqAttr") or ""
@@ -209,97 +282,9 @@ async def try_check_any_non_consent_checkbox(page: Page, *, logger: Optional[log
     戻り値: 何か1つでもONにできたら True
     """
     log = logger or globals().get("logger") or logging.getLogger(__name__)
-    deny_pat = re.compile(r"(同意|承諾|プライバシー|個人情報|利用規約|規約|privacy|consent|agree|policy|terms)", re.I)
-    prefer_pat = re.compile(r"(カテゴリ|カテゴリー|種別|種類|件名|ご用件|subject|category|type|topic)", re.I)
+    deny_pat = _CONSENT_RE
+    prefer_pat = _CATEGORY_RE
 
-    async def _label_text(fr, el):
-        # 1) label[for=id]
-        try:
-            el_id = await el.get_attribute("id")
-            if el_id:
-                lab = await fr.query_selector(f'label[for="{el_id}"]')
-                if lab:
-                    txt = await lab.inner_text()
-                    if txt:
-                        return txt.strip()
-        except Exception:
-            pass
-        # 2) 祖先<label>
-        try:
-            txt = await el.evaluate("n => (n.closest('label') && n.closest('label').innerText) || ''")
-            if txt:
-                return txt.strip()
-        except Exception:
-            pass
-        # 3) CF7等の <dl><dt>…</dt><dd>…<input/></dd>
-        try:
-            txt = await el.evaluate("""n => {
-                const dd = n.closest('dd');
-                if (dd && dd.previousElementSibling && dd.previousElementSibling.tagName.toLowerCase()==='dt') {
-                    return dd.previousElementSibling.innerText.trim();
-                }
-                return '';
-            }""")
-            if txt:
-                return txt.strip()
-        except Exception:
-            pass
-        # 4) aria-labelledby
-        try:
-            txt = await el.evaluate("""n => {
-                const ids = (n.getAttribute('aria-labelledby')||'').split(/\s+/).filter(Boolean);
-                let out = [];
-                for (const id of ids){
-                    const t = document.getElementById(id);
-                    if (t) out.push(t.innerText.trim());
-                }
-                return out.join(' ').trim();
-            }""")
-            if txt:
-                return txt.strip()
-        except Exception:
-            pass
-        # 5) 近傍テキスト（親の中の先頭テキスト）
-        try:
-            txt = await el.evaluate("""n => {
-                const p = n.parentElement;
-                if (!p) return '';
-                const text = p.innerText || '';
-                return text.trim().slice(0,64);
-            }""")
-            if txt:
-                return txt.strip()
-        except Exception:
-            pass
-        # 6) 直前の兄弟要素（と親の直前兄弟）
-        try:
-            txt = await el.evaluate("""(n) => {
-                function labelish(e){
-                    if (!e) return '';
-                    if (e.querySelector('input,textarea,select,button')) return '';
-                    const t = (e.innerText||'').trim();
-                    return t && t.length <= 80 ? t : '';
-                }
-                // 直前の兄弟
-                let s = n.previousElementSibling;
-                for (let i=0;i<3 && s;i++, s = s.previousElementSibling) {
-                    const t = labelish(s); if (t) return t;
-                }
-                // 親の直前兄弟
-                const p = n.parentElement;
-                if (p) {
-                    let s2 = p.previousElementSibling;
-                    for (let i=0;i<3 && s2;i++, s2 = s2.previousElementSibling) {
-                        const t = labelish(s2); if (t) return t;
-                    }
-                }
-                return '';
-            }""")
-            if txt:
-                return txt.strip()
-        except Exception:
-            pass
-        return ""
 
     try:
         frames = [page] + list(page.frames)
@@ -320,7 +305,7 @@ async def try_check_any_non_consent_checkbox(page: Page, *, logger: Optional[log
                     name = (await cb.get_attribute("name") or "")
                     idv  = (await cb.get_attribute("id") or "")
                     cls  = (await cb.get_attribute("class") or "")
-                    label = await _label_text(fr, cb)
+                    label = await _label_text(cb)
                     blob = " ".join([name, idv, cls, label]).lower()
                     # 同意系は除外
                     if deny_pat.search(blob):
@@ -382,106 +367,13 @@ async def ensure_acceptance(page: Page, *, logger: Optional[logging.Logger] = No
     戻り値: 何か1つでもONにできたら True
     """
     log = logger or globals().get("logger") or logging.getLogger(__name__)
-    consent_kw = re.compile(r"(同意|承諾|プライバシー|個人情報|利用規約|規約|privacy|consent|agree|policy|terms)", re.I)
-    prefer_yes_kw = re.compile(r"(同意する|はい|agree|accept|yes)", re.I)
-
-    async def _label_text(fr, el):
-        # label[for=id]
-        try:
-            el_id = await el.get_attribute("id")
-            if el_id:
-                lab = await fr.query_selector(f'label[for="{el_id}"]')
-                if lab:
-                    t = (await lab.inner_text() or "").strip()
-                    if t:
-                        return t
-        except Exception:
-            pass
-        # 祖先<label>
-        try:
-            t = await el.evaluate("n => (n.closest('label') && n.closest('label').innerText) || ''")
-            if t:
-                return t.strip()
-        except Exception:
-            pass
-        # CF7の<dl><dt>…</dt><dd>…</dd>
-        try:
-            t = await el.evaluate("""n => {
-                const dd = n.closest('dd');
-                if (dd && dd.previousElementSibling && dd.previousElementSibling.tagName.toLowerCase()==='dt') {
-                    return dd.previousElementSibling.innerText.trim();
-                }
-                return '';
-            }""")
-            if t:
-                return t.strip()
-        except Exception:
-            pass
-        # aria-labelledby
-        try:
-            t = await el.evaluate("""n => {
-                const ids = (n.getAttribute('aria-labelledby')||'').split(/\s+/).filter(Boolean);
-                let out = [];
-                for (const id of ids){
-                    const t = document.getElementById(id);
-                    if (t) out.push(t.innerText.trim());
-                }
-                return out.join(' ').trim();
-            }""")
-            if t:
-                return t.strip()
-        except Exception:
-            pass
-        # 近傍
-        try:
-            t = await el.evaluate("n => (n.parentElement && n.parentElement.innerText || '').trim().slice(0,64)")
-            if t:
-                return t.strip()
-        except Exception:
-            pass
-        # 直前の兄弟/親の直前兄弟
-        try:
-            t = await el.evaluate("""(n) => {
-                function labelish(e){
-                    if (!e) return '';
-                    if (e.querySelector('input,textarea,select,button')) return '';
-                    const t = (e.innerText||'').trim();
-                    return t && t.length <= 80 ? t : '';
-                }
-                // 直前の兄弟
-                let s = n.previousElementSibling;
-                for (let i=0;i<3 && s;i++, s = s.previousElementSibling) {
-                    const t = labelish(s); if (t) return t;
-                }
-                // 親の直前兄弟
-                const p = n.parentElement;
-                if (p) {
-                    let s2 = p.previousElementSibling;
-                    for (let i=0;i<3 && s2;i++, s2 = s2.previousElementSibling) {
-                        const t = labelish(s2); if (t) return t;
-                    }
-                }
-                return '';
-            }""")
-            if t:
-                return t.strip()
-        except Exception:
-            pass
-        return ""
+    consent_kw = _CONSENT_RE
+    prefer_yes_kw = _PREFER_YES_RE
 
     toggled = False
     frames = [page] + list(page.frames)
     # 1) ピンポイント探索
-    css_targets = [
-        'input#wpcf7-acceptance',
-        '.wpcf7-acceptance input[type="checkbox"]',
-        'input#agree', 'input[name*="agree" i]', 'input[class*="agree" i]',
-        'input[name*="consent" i]', 'input[class*="consent" i]',
-        'input[name*="privacy" i]', 'input[class*="privacy" i]',
-        'input[name*="policy" i]',  'input[class*="policy" i]',
-        'input[name*="terms" i]',   'input[class*="terms" i]',
-        'input[type="checkbox"][aria-label*="同意"]',
-    ]
+    css_targets = _ACCEPTANCE_TARGETS
     try:
         for fr in frames:
             found = False
@@ -544,7 +436,7 @@ async def ensure_acceptance(page: Page, *, logger: Optional[logging.Logger] = No
                     name = (await el.get_attribute("name") or "")
                     idv  = (await el.get_attribute("id") or "")
                     cls  = (await el.get_attribute("class") or "")
-                    txt  = await _label_text(fr, el)
+                    txt  = await _label_text(el)
                     blob = " ".join([name, idv, cls, txt]).lower()
                     if not consent_kw.search(blob):
                         continue
@@ -595,14 +487,14 @@ async def ensure_acceptance(page: Page, *, logger: Optional[logging.Logger] = No
                 any_label = ""
                 for r in group:
                     try:
-                        any_label += " " + (await _label_text(fr, r))
+                        any_label += " " + (await _label_text(r))
                     except Exception:
                         pass
                 if consent_kw.search(group_blob + " " + any_label.lower()):
                     chosen = None
                     for r in group:
                         try:
-                            t = (await _label_text(fr, r)).lower()
+                            t = (await _label_text(r)).lower()
                             val = (await r.get_attribute("value") or "").lower()
                             if prefer_yes_kw.search(t) or prefer_yes_kw.search(val):
                                 chosen = r
@@ -641,3 +533,284 @@ async def ensure_acceptance(page: Page, *, logger: Optional[logging.Logger] = No
         except Exception:
             pass
     return toggled
+
+
+# ========== 一括パス（フレームごとに1回のスナップショット → Python で判定 → 1回の適用） ==========
+
+# チェックボックス/ラジオ/select の状態とラベル文脈。select は selects=true のフレームの root（既定は最初の form）配下だけ inRoot
+_CONTROLS_JS = register("controls", r"""
+(arg) => {
+  const opts = arg || {};
+  const pins = opts.pins || [];
+  const selRoot = opts.selects ? (opts.root || document.querySelector('form') || document) : null;
+  const ctrls = Array.from(document.querySelectorAll('input[type="checkbox"], input[type="radio"], select'));
+  return ctrls.map((el, i) => {
+    const isSelect = el.tagName.toLowerCase() === 'select';
+    const base = {
+      i,
+      kind: isSelect ? 'select' : (el.type || '').toLowerCase(),
+      name: el.getAttribute('name') || '',
+      id: el.id || '',
+      cls: typeof el.className === 'string' ? el.className : '',
+      disabled: !!el.disabled,
+    };
+    if (isSelect) {
+      return {
+        ...base,
+        inRoot: !!selRoot && selRoot.contains(el),
+        multiple: !!el.multiple,
+        selectedIndex: el.selectedIndex,
+        options: Array.from(el.options).map((o) => ({ value: (o.value || '').trim(), disabled: !!o.disabled })),
+      };
+    }
+    const own = el.closest('label');
+    const out = {
+      ...base,
+      value: el.getAttribute('value') || '',
+      checked: !!el.checked,
+      label: ff.labelText(el),
+      ownLabel: own ? (own.innerText || '') : '',
+      pin: pins.findIndex((p) => { try { return el.matches(p); } catch (e) { return false; } }),
+      required: el.hasAttribute('required'),
+      ariaRequired: (el.getAttribute('aria-required') || '').toLowerCase(),
+    };
+    if (base.kind === 'radio') out.context = ff.radioContext(el);
+    return out;
+  });
+}
+""")
+
+# controls の添字で要素を引き直して ON/選択（name が変わっていれば stale）
+_APPLY_CONTROLS_JS = register("applyControls", r"""
+(ops) => {
+  const ctrls = Array.from(document.querySelectorAll('input[type="checkbox"], input[type="radio"], select'));
+  const fire = (el, t) => el.dispatchEvent(new Event(t, { bubbles: true }));
+  return ops.map((op) => {
+    const el = ctrls[op.i];
+    if (!el || (el.getAttribute('name') || '') !== op.name) return { ok: false, reason: 'stale' };
+    try {
+      if (op.kind === 'select') {
+        const opt = el.options[op.index];
+        if (!opt) return { ok: false, reason: 'no-option' };
+        el.selectedIndex = op.index;
+        fire(el, 'input');
+        fire(el, 'change');
+        const dd = el.closest('.ui.dropdown');
+        if (dd) {
+          const item = dd.querySelector('.menu .item[data-value="' + CSS.escape(opt.value) + '"]');
+          if (item) item.click();
+        }
+        return { ok: el.selectedIndex === op.index };
+      }
+      if (!el.checked) el.click();
+      if (!el.checked && el.id) {
+        const lab = document.querySelector('label[for="' + CSS.escape(el.id) + '"]');
+        if (lab) lab.click();
+      }
+      if (!el.checked) {
+        el.checked = true;
+        fire(el, 'input');
+        fire(el, 'change');
+      }
+      return { ok: el.checked };
+    } catch (e) {
+      return { ok: false, reason: 'error:' + (e && e.message || e) };
+    }
+  });
+}
+""")
+
+
+def _control_blob(c: Dict[str, Any]) -> str:
+    return " ".join([c.get("name") or "", c.get("id") or "", c.get("cls") or "", c.get("label") or ""]).lower()
+
+
+def _radio_groups(snap: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for c in snap:
+        if c.get("kind") == "radio" and not c.get("disabled") and c.get("name"):
+            groups.setdefault(c["name"], []).append(c)
+    return groups
+
+
+def _second_option_index(c: Dict[str, Any]) -> Optional[int]:
+    """choose_second_option_in_form と同じ規則で選ぶ option の添字（選ばないなら None）"""
+    if c.get("multiple") or c.get("disabled") or not c.get("inRoot"):
+        return None
+    if (c.get("selectedIndex") or 0) > 0:
+        return None
+    vals = c.get("options") or []
+    if len(vals) <= 1:
+        return None
+    if not vals[1]["disabled"] and vals[1]["value"] != "":
+        return 1
+    for i in range(2, len(vals)):
+        if not vals[i]["disabled"] and vals[i]["value"] != "":
+            return i
+    return None
+
+
+def plan_control_actions(snapshots: List[List[Dict[str, Any]]]) -> Tuple[List[List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    フレームごとの controls スナップショットから、従来の4段
+    （任意チェック → 同意チェック/ラジオ → 未選択ラジオ群 → select の2番目）と同じ判定で操作を決める。
+    先の段で ON にする予定のものは後の段で選択済みとして扱う。
+    戻り値: (フレームごとの applyControls 操作, 段ごとの内訳)
+    """
+    ops: List[List[Dict[str, Any]]] = [[] for _ in snapshots]
+    planned: Set[Tuple[int, int]] = set()
+    summary: Dict[str, Any] = {"optional": None, "consent": None, "radios": [], "selects": []}
+
+    def checked(fi: int, c: Dict[str, Any]) -> bool:
+        return bool(c.get("checked")) or (fi, c["i"]) in planned
+
+    def plan(fi: int, c: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+        op = {"i": c["i"], "kind": c.get("kind"), "name": c.get("name") or "", **extra}
+        ops[fi].append(op)
+        if c.get("kind") != "select":
+            planned.add((fi, c["i"]))
+        return op
+
+    boxes = [
+        (fi, c) for fi, snap in enumerate(snapshots) for c in snap
+        if c.get("kind") == "checkbox" and not c.get("disabled")
+    ]
+
+    # 1) 同意以外のチェックボックスを1つ（種別系を優先）
+    optional = [(fi, c) for fi, c in boxes if not c.get("checked") and not _CONSENT_RE.search(_control_blob(c))]
+    if optional:
+        fi, c = next(((fi, c) for fi, c in optional if _CATEGORY_RE.search(_control_blob(c))), optional[0])
+        plan(fi, c)
+        summary["optional"] = c.get("label") or c.get("name") or c.get("id") or "(no label)"
+
+    # 2) 同意: ピンポイント → 同意語のチェックボックス → 同意語のラジオ群（いずれも最初の1件）
+    consent = None
+    for fi, snap in enumerate(snapshots):
+        pins = [c for c in snap if c.get("kind") == "checkbox" and not c.get("disabled") and c.get("pin", -1) >= 0]
+        if pins:
+            consent = (fi, min(pins, key=lambda c: (c["pin"], c["i"])))
+            break
+    if consent is None:
+        consent = next(((fi, c) for fi, c in boxes if _CONSENT_RE.search(_control_blob(c))), None)
+    if consent is None:
+        for fi, snap in enumerate(snapshots):
+            for name, group in _radio_groups(snap).items():
+                labels = " ".join(c.get("label") or "" for c in group)
+                if not _CONSENT_RE.search(name.lower() + " " + labels.lower()):
+                    continue
+                chosen = next(
+                    (c for c in group
+                     if _PREFER_YES_RE.search((c.get("label") or "").lower()) or _PREFER_YES_RE.search((c.get("value") or "").lower())),
+                    group[0],
+                )
+                consent = (fi, chosen)
+                break
+            if consent is not None:
+                break
+    if consent is not None:
+        fi, c = consent
+        if not checked(fi, c):
+            plan(fi, c)
+        summary["consent"] = c.get("label") or c.get("name") or c.get("id") or "(no label)"
+
+    # 3) 未選択のラジオ群（マーケ/購読系は必須でない限り触らない。yes/同意 系を優先）
+    for fi, snap in enumerate(snapshots):
+        for name, group in _radio_groups(snap).items():
+            if any(checked(fi, c) for c in group):
+                continue
+            ctx = group[0].get("context") or {}
+            required_like = any(c.get("required") or c.get("ariaRequired") in ("true", "1") for c in group)
+            if not required_like and any(attr in (ctx.get("reqAttr") or "") for attr in RADIO_REQUIRED_ATTRS):
+                required_like = True
+            if not required_like and any(tok in (ctx.get("text") or "") for tok in RADIO_MARKETING_TOKENS):
+                continue
+            chosen = next(
+                (c for c in group
+                 if any(tok in ((c.get("ownLabel") or "").lower() + " " + (c.get("value") or "").lower()) for tok in RADIO_POSITIVE_TOKENS)),
+                group[0],
+            )
+            plan(fi, chosen)
+            summary["radios"].append(name)
+
+    # 4) 未選択の単一 select は2番目以降の最初の有効な選択肢
+    for fi, snap in enumerate(snapshots):
+        for c in snap:
+            if c.get("kind") != "select":
+                continue
+            idx = _second_option_index(c)
+            if idx is not None:
+                plan(fi, c, index=idx)
+                summary["selects"].append(c.get("name") or c.get("id") or f"select#{c['i']}")
+
+    return ops, summary
+
+
+async def resolve_form_controls(
+    page: Page,
+    active_form_handle: Optional[Any] = None,
+    *,
+    logger: Optional[logging.Logger] = None,
+    debug: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    try_check_any_non_consent_checkbox / ensure_acceptance / ensure_required_radio_groups /
+    choose_second_option_in_form をまとめて行う。フレームごとに controls（1回）→ Python で判定 → applyControls（1回）。
+    select は active_form_handle（無ければ本体の最初の form、それも無ければ本体文書）の配下だけを対象とする。
+    戻り値: 段ごとの内訳（どのフレームもスナップショットを取れなかった場合は None。呼び出し側で従来の4段へ）
+    """
+    log = logger or globals().get("logger") or logging.getLogger(__name__)
+    main = getattr(page, "main_frame", None)
+    frames: List[Any] = [page] + [f for f in (page.frames or []) if f is not main]
+
+    root_fi = 0
+    if active_form_handle is not None:
+        try:
+            owner = await active_form_handle.owner_frame()
+        except Exception:
+            owner = None
+        if owner is not None and owner is not main:
+            root_fi = next((fi for fi, fr in enumerate(frames) if fr is owner), 0)
+
+    async def snapshot(fi: int, fr: Any) -> List[Dict[str, Any]]:
+        arg = {
+            "root": active_form_handle if (fi == root_fi and active_form_handle is not None) else None,
+            "selects": fi == root_fi,
+            "pins": _ACCEPTANCE_TARGETS,
+        }
+        return await ff_call(fr, "controls", arg) or []
+
+    results = await asyncio.gather(*(snapshot(fi, fr) for fi, fr in enumerate(frames)), return_exceptions=True)
+    if all(isinstance(r, BaseException) for r in results):
+        if debug:
+            log.debug(f"controls スナップショット失敗: {results[0]!r}")
+        return None
+    snapshots = [r if isinstance(r, list) else [] for r in results]
+
+    ops, summary = plan_control_actions(snapshots)
+    applied: Dict[Tuple[int, int], bool] = {}
+    for fi, (fr, frame_ops) in enumerate(zip(frames, ops)):
+        if not frame_ops:
+            continue
+        try:
+            res = await ff_call(fr, "applyControls", frame_ops)
+        except Exception as e:
+            if debug:
+                log.debug(f"applyControls 失敗: {e}")
+            res = []
+        for op, r in zip(frame_ops, res or []):
+            applied[(fi, op["i"])] = bool(isinstance(r, dict) and r.get("ok"))
+    summary["applied"] = sum(applied.values())
+    summary["failed"] = len(applied) - summary["applied"]
+
+    try:
+        if summary["optional"]:
+            log.info(f"任意チェックボックスを選択: {summary['optional']}")
+        if summary["consent"]:
+            log.info("同意チェックを自動ON")
+        if summary["radios"]:
+            log.info(f"必須ラジオグループを {len(summary['radios'])} 件、選択しました")
+        if summary["selects"]:
+            log.info(f"選択式リストを {len(summary['selects'])} 件、2番目に設定しました")
+    except Exception:
+        pass
+    return summary
@@ -8,6 +8,8 @@ SPECIAL_MIN_SCORE = {"name": 4, "email": 4}
 # lexicon（外部辞書）デフォルトパス
 DEFAULT_LEXICON_BASE = os.path.join("lexicon", "base_synonyms.yml")
 DEFAULT_LEXICON_CUSTOM = os.path.join("lexicon", "custom_synonyms.yml")
+# マージ・コンパイル済み語彙のキャッシュ置き場（YAML が変わるまで再利用）
+DEFAULT_LEXICON_CACHE_DIR = os.path.join("lexicon", ".cache")
 
 # 学習モードで除外するストップワード（ラベルなど）
 LEARN_STOPWORDS = [
@@ -270,5 +272,47 @@ AUTOCOMPLETE_MAP: dict[str, str] = {
     "address-line2": "address",
     "postal-code": "address",
 }
+
+# ブラウザ/HTTP 共通の User-Agent
+USER_AGENT: str = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# ===== 問い合わせ本文の既定値 =====
+# textarea にマップされた欄へ入れる本文（inquiry_template 未指定時）
+DEFAULT_INQUIRY_TEXT: str = "お問い合わせありがとうございます。\n\n製品・サービスについて詳しく知りたいです。\n\n具体的には以下の点について教えていただけますでしょうか：\n・料金体系\n・導入事例\n・サポート体制\n\nよろしくお願いいたします。"
+# 未マップの textarea を救済入力するときの本文（inquiry_template / message 未指定時）
+FALLBACK_INQUIRY_TEXT: str = "お問い合わせありがとうございます。内容を確認の上、ご連絡いたします。"
+
+# ===== リクエスト遮断（blocking.py で使用） =====
+# 広告・解析系ドメイン（ホスト名がこれ自身かそのサブドメインなら遮断）
+AD_ANALYTICS_DOMAINS: list[str] = [
+    "googletagmanager.com",
+    "google-analytics.com",
+    "analytics.google.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "mixpanel.com",
+    "segment.io",
+    "sentry.io",
+    "bat.bing.com",
+    "criteo.com",
+    "newrelic.com",
+]
+
+# フォーム機能に必要なURL（ホスト＋任意のパス接頭辞。画像等でも遮断しない）
+FORM_HELPER_DOMAINS: list[str] = [
+    "www.google.com/recaptcha",
+    "www.gstatic.com/recaptcha",
+    "challenges.cloudflare.com",
+    "hcaptcha.com",
+    "js.stripe.com",
+    "pay.stripe.com",
+    "paypal.com",
+    "paypalobjects.com",
+]
+
+# 遮断するリソース種別
+BLOCKED_RESOURCE_TYPES: tuple[str, ...] = ("image", "font", "media")
 # --- 追記ここまで ---
 
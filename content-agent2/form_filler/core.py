@@ -2,31 +2,33 @@ from __future__ import annotations
 
 import asyncio
 import csv
+import hashlib
 import json
 import logging
 import os
 import re
+import time
+import weakref
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import aiofiles
 import aiolimiter
 import yaml
-from playwright.async_api import async_playwright, Page
-from .auto_select import auto_select_all
+from playwright.async_api import BrowserContext, Page
+from .auto_select import auto_select_all, reassert_selects
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup, Tag
 
-from .models import FormTask, FormResult
+from .models import FormTask, FormResult, MappingDecision, MappingTrace
 from .constants import (
-    CANDIDATES,
     FILLABLE_KEYS,
     PRIORITY_KEYS,
     SPECIAL_MIN_SCORE,
     LEARN_STOPWORDS,
-    DEFAULT_LEXICON_BASE,
-    DEFAULT_LEXICON_CUSTOM,
+    DEFAULT_LEXICON_CACHE_DIR,
     # 追記（カスケード判定用）
     STRONG_TOKENS,
     CONFIRM_TOKENS,
@@ -39,66 +41,341 @@ from .constants import (
     PERSON_TABS_TOKENS,
     CORP_FIELD_TOKENS,
     PERSON_FIELD_TOKENS,
+    DEFAULT_INQUIRY_TEXT,
+    FALLBACK_INQUIRY_TEXT,
+    USER_AGENT,
 )
 from .utils import normalize, css_escape, split_name, split_phone
+from .mapping import score_adjustment
+from .lexicon import Lexicon, default_lexicon, lexicon_sources, load_lexicon
+from .similarity import NgramProfile, ngram_profile, similar
 from .selectors import (
-    selector_for,
     selector_for_locator,
     get_label_text_for_locator,
     extract_label_text,
     # 追記：一括抽出
     extract_labels_bulk,
+    snapshot_form_controls,
     fallback_fill_textarea,  # NEW: 汎用textarea救済
     # デモ可視化の前にスクロール
 )
 from .filling import scroll_into_view  # 可視化時に利用
+from .assignment import solve_assignment
+from .batch_fill import FillOp, apply_fill_ops
+from .runtime import ff_call, install_runtime, register
+from .frameworks import FrameworkMatch, detect_framework
+from .browser_pool import BrowserPool
+from .blocking import RequestBlocker
+from .http_fastpath import HttpFastPath
+from .mapping_cache import MappingCache, form_fingerprint
+from .triage import UrlTriage
+from .url_classifier import UrlClassifier, default_classifier
 from .captcha import CaptchaHandler
+from .success import is_thanks_url, race_success
 from .consent import (
     ensure_acceptance,
     try_check_any_non_consent_checkbox,
     choose_second_option_in_form,
     ensure_required_radio_groups,
+    resolve_form_controls,
 )
 
 
 logger = logging.getLogger(__name__)
 
+# find_best_field_match の類似加点（キー名と属性値の文字 bigram の cosine）
+SIMILARITY_ATTRS = ('name', 'id', 'class', 'placeholder', 'aria-label')
+SIMILARITY_THRESHOLD = 0.65
+
+# check_success の全体の締め切り（秒）。検出器はこの中で並行に待つ
+SUCCESS_DEADLINE = 5.0
+SUCCESS_DEADLINE_FAST = 2.5
+
 
 def is_ad_or_analytics(url: str) -> bool:
     """広告・解析系ドメインかどうかを判定する"""
-    url_lower = url.lower()
-    ad_analytics_domains = [
-        "googletagmanager.com",
-        "google-analytics.com",
-        "analytics.google.com",
-        "doubleclick.net",
-        "facebook.net",
-        "connect.facebook.net",
-        "hotjar.com",
-        "mixpanel.com",
-        "segment.io",
-        "sentry.io",
-        "bat.bing.com",
-        "criteo.com",
-        "newrelic.com",
-    ]
-    return any(domain in url_lower for domain in ad_analytics_domains)
+    return default_classifier().is_blocked(url)
 
 
 def is_form_helper(url: str) -> bool:
     """フォーム機能に必要なドメインかどうかを判定する"""
-    url_lower = url.lower()
-    form_helper_domains = [
-        "www.google.com/recaptcha",
-        "www.gstatic.com/recaptcha",
-        "challenges.cloudflare.com",
-        "hcaptcha.com",
-        "js.stripe.com",
-        "pay.stripe.com",
-        "paypal.com",
-        "paypalobjects.com",
-    ]
-    return any(domain in url_lower for domain in form_helper_domains)
+    return default_classifier().is_allowed(url)
+
+
+# ========== ページ内ヘルパ（window.__ff に登録。ff_call で関数名だけを送って呼ぶ） ==========
+
+# 企業/法人の切替コントロールが指すパネルを企業パネル全体に正規化した CSS パス
+_CORP_SCOPE_BY_CONTROLS_JS = register("corpScope", r"""
+() => {
+  const txtRe = /(企業|法人|会社|法人[／/・]団体|企業の方|法人の方)/;
+  const controls = Array.from(document.querySelectorAll(
+    '[role="tab"], [aria-controls], [data-target], a[href^="#"], button, label'
+  )).filter(el => txtRe.test((el.textContent || "").replace(/\s+/g,"")));
+  const getPanel = (el) => {
+    let sel = el.getAttribute('aria-controls') || el.getAttribute('data-target') || '';
+    if (!sel) {
+      const href = el.getAttribute('href') || '';
+      if (href && href.startsWith('#')) sel = href;
+    }
+    if (!sel) return null;
+    try {
+      const panel = sel.startsWith('#') ? document.querySelector(sel) : document.querySelector(sel);
+      return panel || null;
+    } catch { return null; }
+  };
+
+  const totalInputs = (node) => node ? node.querySelectorAll('input,textarea,select').length : 0;
+  const countCorp = (node) => node ? node.querySelectorAll(
+    'select[name="company_inquiry_type"], input[name="company_name"], input[name="company_email"], textarea[name="company_your_message"], [name^="company_"], [id^="company_"]'
+  ).length : 0;
+  const hasPersonal = (node) => node ? !!node.querySelector('[name^="personal_"], [id^="personal_"]') : false;
+
+  const normalizePanel = (panel) => {
+    if (!panel) return null;
+    const form = panel.closest('form') || document;
+    // panel を含む祖先候補（form 配下のブロック要素）を列挙
+    const blocks = Array.from(form.querySelectorAll('div,section,fieldset,article'));
+    let cand = blocks.filter(b => b.contains(panel));
+    // 企業のまとまりと判断できる最小祖先：企業キー>=2、personalなし、入力数>=5
+    cand = cand.filter(b => countCorp(b) >= 2 && !hasPersonal(b) && totalInputs(b) >= 5);
+    if (cand.length) {
+      // 企業キー多い順 → 入力数多い順 → panel に近い順（より"まとまり"に近い）
+      const depth = (el) => { let d=0; for (let n=el; n; n=n.parentElement) d++; return d; };
+      cand.sort((a,b) => {
+        const cB = countCorp(b) - countCorp(a);
+        if (cB) return cB;
+        const tB = totalInputs(b) - totalInputs(a);
+        if (tB) return tB;
+        return depth(b) - depth(a); // 近い方（深い方）を優先
+      });
+      return cand[0];
+    }
+    // 条件を満たさない場合は、panel 自体を返す（後段の fallback に委ねる）
+    return panel;
+  };
+  const cssPath = (el) => {
+    if (!el) return null;
+    if (el.id) return '#'+CSS.escape(el.id);
+    const parts = [];
+    for (let n=el; n && n.nodeType===1 && n!==document; n=n.parentElement) {
+      if (n.id) { parts.unshift('#'+CSS.escape(n.id)); break; }
+      const tn = n.tagName.toLowerCase();
+      let i=1, s=n;
+      while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
+      parts.unshift(`${tn}:nth-of-type(${i})`);
+    }
+    return parts.join(' > ');
+  };
+  for (const el of controls) {
+    const panel0 = getPanel(el);
+    if (!panel0) continue;
+    const panel = normalizePanel(panel0);
+    if (panel && countCorp(panel) >= 2 && !hasPersonal(panel) && totalInputs(panel) >= 5) {
+      return cssPath(panel);
+    }
+  }
+  // フォールバック：代表フィールドから祖先を正規化
+  const anchor = document.querySelector('select[name="company_inquiry_type"], input[name="company_name"], input[name="company_email"], textarea[name="company_your_message"], [name^="company_"], [id^="company_"]');
+  if (!anchor) return null;
+  const norm = normalizePanel(anchor);
+  return cssPath(norm);
+}
+""")
+
+
+# セレクタの要素の CSS パス（id があればそこで打ち切り）
+_CSS_PATH_JS = register("cssPath", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return null;
+  if (el.id) return '#'+CSS.escape(el.id);
+  const parts=[];
+  let n = el;
+  while (n && n.nodeType===1 && n!==document){
+    if (n.id){ parts.unshift('#'+CSS.escape(n.id)); break; }
+    const tn=n.tagName.toLowerCase(); let i=1, s=n;
+    while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
+    parts.unshift(`${tn}:nth-of-type(${i})`);
+    n=n.parentElement;
+  }
+  return parts.join(' > ');
+}
+""")
+
+
+# 祖先の hidden/aria-hidden/display/visibility/opacity とビューポート内かまで見る可視判定
+_REALLY_VISIBLE_JS = register("reallyVisible", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return false;
+  const visibleInTree = (n) => {
+    while (n && n.nodeType === 1) {
+      const cs = getComputedStyle(n);
+      if (n.hasAttribute('hidden') || n.getAttribute('aria-hidden') === 'true') return false;
+      if (cs.display === 'none' || cs.visibility === 'hidden' || parseFloat(cs.opacity) === 0) return false;
+      n = n.parentElement;
+    }
+    return true;
+  };
+  if (!visibleInTree(el)) return false;
+  if (el.offsetParent === null) return false;
+  const r = el.getBoundingClientRect();
+  if (r.width === 0 || r.height === 0) return false;
+  const vw = (window.innerWidth || document.documentElement.clientWidth);
+  const vh = (window.innerHeight || document.documentElement.clientHeight);
+  if (r.right <= 0 || r.bottom <= 0 || r.left >= vw || r.top >= vh) return false;
+  return true;
+}
+""")
+
+
+# スコープ内で現在有効な入力要素の安定キー（name/id/CSS パス）
+_ACTIVE_FIELD_KEYS_JS = register("activeFieldKeys", r"""
+(scopeSel) => {
+  const root = document.querySelector(scopeSel);
+  if (!root) return [];
+  const isHiddenByLogic = (el) => {
+    if (el.closest('[hidden]')) return true;
+    if (el.closest('[aria-hidden="true"]')) return true;
+    if (el.closest('.wpcf7cf-hidden, .is-hidden, .u-hidden, .is-none, .hidden')) return true;
+    const style = window.getComputedStyle(el);
+    if (style.display === 'none' || style.visibility === 'hidden' || parseFloat(style.opacity) === 0) return true;
+    if (el.offsetParent === null && style.position !== 'fixed') return true;
+    return false;
+  };
+  const cssPath = (el) => {
+    if (el.id) return `#${el.id}`;
+    const segs = [];
+    let e = el;
+    while (e && e.nodeType === 1 && e !== root) {
+      if (e.id) { segs.unshift(`#${e.id}`); break; }
+      const tag = e.tagName.toLowerCase();
+      let i = 1, s = e;
+      while ((s = s.previousElementSibling) != null) if (s.tagName === e.tagName) i++;
+      segs.unshift(`${tag}:nth-of-type(${i})`);
+      e = e.parentElement;
+    }
+    return segs.join(' > ');
+  };
+  const els = root.querySelectorAll('input, select, textarea');
+  const out = new Set();
+  els.forEach(el => {
+    if (el.disabled) return;
+    if (isHiddenByLogic(el)) return;
+    const key = el.getAttribute('name') || el.id || cssPath(el);
+    out.add(key);
+  });
+  return Array.from(out);
+}
+""")
+
+
+# 要素の安定キー（name / id / セレクタ）
+_STABLE_KEY_JS = register("stableKey", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return sel;
+  return el.getAttribute('name') || el.id || sel;
+}
+""")
+
+
+# 要素または祖先に personal/private/個人 系のトークンがあるか
+_LOOKS_PERSONAL_JS = register("looksPersonal", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return false;
+  const re = /(personal|private|kojin|個人)/i;
+  let n = el;
+  while (n && n.nodeType === 1) {
+    const tokens = ((n.id||'') + ' ' + (n.getAttribute('name')||'') + ' ' + (n.className||'')).toLowerCase();
+    if (re.test(tokens)) return true;
+    n = n.parentElement;
+  }
+  return false;
+}
+""")
+
+
+# company 系要素の最小共通祖先から personal 系を含まない祖先を求めた CSS パス
+_CORP_PANEL_JS = register("corpPanel", r"""
+() => {
+  const qs = (s) => Array.from(document.querySelectorAll(s));
+  const corp = qs('[name^="company_"],[name*="company_"],[id^="company_"],[id*="company_"],[class*="company"]');
+  if (corp.length < 2) return null;
+  const hasPersonal = (node) => !!node.querySelector('[id^="personal_"],[id*="personal_"],[name^="personal_"],[name*="personal_"],[class*="personal"]');
+  const lca = (a,b) => {
+    if (!a || !b) return null;
+    const path = (n) => { const arr=[]; while(n){arr.unshift(n); n=n.parentElement;} return arr; };
+    const pa = path(a), pb = path(b);
+    let i=0, last=null;
+    while (i<pa.length && i<pb.length && pa[i]===pb[i]) { last = pa[i]; i++; }
+    return last;
+  };
+  let node = corp[0];
+  for (let i=1; i<corp.length; i++){ node = lca(node, corp[i]) || node; }
+  if (!node) return null;
+  while (node && hasPersonal(node)) node = node.parentElement;
+  if (!node) return null;
+  const cssPath = (el) => {
+    if (!el) return null;
+    if (el.id) return '#'+CSS.escape(el.id);
+    const parts=[]; let n=el;
+    while (n && n.nodeType===1 && n!==document) {
+      if (n.id){ parts.unshift('#'+CSS.escape(n.id)); break; }
+      const tn=n.tagName.toLowerCase(); let i=1, s=n;
+      while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
+      parts.unshift(`${tn}:nth-of-type(${i})`);
+      n=n.parentElement;
+    }
+    return parts.join(' > ');
+  };
+  return cssPath(node);
+}
+""")
+
+
+# 要素の id/name/type（名前系キーへの tel 混入チェック用）
+_FIELD_META_JS = register("fieldMeta", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  return { id: el?.id || '', name: el?.getAttribute('name') || '', type: (el?.getAttribute('type') || '').toLowerCase() };
+}
+""")
+
+
+# 複数セレクタの要素の tag/name/type（見つからなければ null。マッピングキャッシュの照合用）
+_FIELD_METAS_JS = register("fieldMetas", r"""
+(sels) => sels.map((sel) => {
+  let el = null;
+  try { el = document.querySelector(sel); } catch (e) {}
+  if (!el) return null;
+  return { tag: el.tagName.toLowerCase(), name: el.getAttribute('name') || '', type: (el.getAttribute('type') || '').toLowerCase() };
+})
+""")
+
+
+# 要素がスコープ要素の配下か（引数は [scope, selector]）
+_WITHIN_SCOPE_JS = register("withinScope", r"""
+([sc, sel]) => {
+  const root = document.querySelector(sc);
+  const el = document.querySelector(sel);
+  return !!(root && el && root.contains(el));
+}
+""")
+
+
+# id/name が personal_ 等で始まるか
+_PERSONAL_PREFIXED_JS = register("personalPrefixed", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return false;
+  const nm = (el.getAttribute('name') || '');
+  const id = (el.id || '');
+  const re = /^(personal|private|individual)[_-]/i;
+  return re.test(nm) || re.test(id);
+}
+""")
 
 
 class FormFillerCore:
@@ -114,153 +391,26 @@ class FormFillerCore:
         3) パネル候補を『企業パネル全体』に正規化（小さすぎる span/p を祖先へ持ち上げ）
         4) その CSS パスを返す（見つからなければ None）
         """
-        js = r"""
-        (() => {
-          const txtRe = /(企業|法人|会社|法人[／/・]団体|企業の方|法人の方)/;
-          const controls = Array.from(document.querySelectorAll(
-            '[role="tab"], [aria-controls], [data-target], a[href^="#"], button, label'
-          )).filter(el => txtRe.test((el.textContent || "").replace(/\s+/g,"")));
-          const getPanel = (el) => {
-            let sel = el.getAttribute('aria-controls') || el.getAttribute('data-target') || '';
-            if (!sel) {
-              const href = el.getAttribute('href') || '';
-              if (href && href.startsWith('#')) sel = href;
-            }
-            if (!sel) return null;
-            try {
-              const panel = sel.startsWith('#') ? document.querySelector(sel) : document.querySelector(sel);
-              return panel || null;
-            } catch { return null; }
-          };
-
-          const totalInputs = (node) => node ? node.querySelectorAll('input,textarea,select').length : 0;
-          const countCorp = (node) => node ? node.querySelectorAll(
-            'select[name="company_inquiry_type"], input[name="company_name"], input[name="company_email"], textarea[name="company_your_message"], [name^="company_"], [id^="company_"]'
-          ).length : 0;
-          const hasPersonal = (node) => node ? !!node.querySelector('[name^="personal_"], [id^="personal_"]') : false;
-
-          const normalizePanel = (panel) => {
-            if (!panel) return null;
-            const form = panel.closest('form') || document;
-            // panel を含む祖先候補（form 配下のブロック要素）を列挙
-            const blocks = Array.from(form.querySelectorAll('div,section,fieldset,article'));
-            let cand = blocks.filter(b => b.contains(panel));
-            // 企業のまとまりと判断できる最小祖先：企業キー>=2、personalなし、入力数>=5
-            cand = cand.filter(b => countCorp(b) >= 2 && !hasPersonal(b) && totalInputs(b) >= 5);
-            if (cand.length) {
-              // 企業キー多い順 → 入力数多い順 → panel に近い順（より"まとまり"に近い）
-              const depth = (el) => { let d=0; for (let n=el; n; n=n.parentElement) d++; return d; };
-              cand.sort((a,b) => {
-                const cB = countCorp(b) - countCorp(a);
-                if (cB) return cB;
-                const tB = totalInputs(b) - totalInputs(a);
-                if (tB) return tB;
-                return depth(b) - depth(a); // 近い方（深い方）を優先
-              });
-              return cand[0];
-            }
-            // 条件を満たさない場合は、panel 自体を返す（後段の fallback に委ねる）
-            return panel;
-          };
-          const cssPath = (el) => {
-            if (!el) return null;
-            if (el.id) return '#'+CSS.escape(el.id);
-            const parts = [];
-            for (let n=el; n && n.nodeType===1 && n!==document; n=n.parentElement) {
-              if (n.id) { parts.unshift('#'+CSS.escape(n.id)); break; }
-              const tn = n.tagName.toLowerCase();
-              let i=1, s=n;
-              while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
-              parts.unshift(`${tn}:nth-of-type(${i})`);
-            }
-            return parts.join(' > ');
-          };
-          for (const el of controls) {
-            const panel0 = getPanel(el);
-            if (!panel0) continue;
-            const panel = normalizePanel(panel0);
-            if (panel && countCorp(panel) >= 2 && !hasPersonal(panel) && totalInputs(panel) >= 5) {
-              return cssPath(panel);
-            }
-          }
-          // フォールバック：代表フィールドから祖先を正規化
-          const anchor = document.querySelector('select[name="company_inquiry_type"], input[name="company_name"], input[name="company_email"], textarea[name="company_your_message"], [name^="company_"], [id^="company_"]');
-          if (!anchor) return null;
-          const norm = normalizePanel(anchor);
-          return cssPath(norm);
-        })();
-        """
         try:
-            return await page.evaluate(js)
+            return await ff_call(page, "corpScope")
         except Exception:
             return None
 
     async def _css_path(self, page, handle_selector: str) -> str | None:
-        js = r"""
-        (sel) => {
-          const el = document.querySelector(sel);
-          if (!el) return null;
-          if (el.id) return '#'+CSS.escape(el.id);
-          const parts=[];
-          let n = el;
-          while (n && n.nodeType===1 && n!==document){
-            if (n.id){ parts.unshift('#'+CSS.escape(n.id)); break; }
-            const tn=n.tagName.toLowerCase(); let i=1, s=n;
-            while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
-            parts.unshift(`${tn}:nth-of-type(${i})`);
-            n=n.parentElement;
-          }
-          return parts.join(' > ');
-        }
-        """
         try:
-            return await page.evaluate(js, handle_selector)
+            return await ff_call(page, "cssPath", handle_selector)
         except Exception:
             return None
 
     async def _is_visible(self, page, selector: str) -> bool:
-        js = r"""
-        (sel) => {
-          const el = document.querySelector(sel);
-          if (!el) return false;
-          const cs = getComputedStyle(el);
-          if (!cs) return false;
-          if (cs.display === 'none' || cs.visibility === 'hidden' || parseFloat(cs.opacity || '1') === 0) return false;
-          const r = el.getClientRects();
-          return !!(r && r.length > 0);
-        }
-        """
         try:
-            return await page.evaluate(js, selector)
+            return await ff_call(page, "visible", selector)
         except Exception:
             return False
 
     async def _is_really_visible(self, page, selector: str) -> bool:
-        js = r"""
-        (sel) => {
-          const el = document.querySelector(sel);
-          if (!el) return false;
-          const visibleInTree = (n) => {
-            while (n && n.nodeType === 1) {
-              const cs = getComputedStyle(n);
-              if (n.hasAttribute('hidden') || n.getAttribute('aria-hidden') === 'true') return false;
-              if (cs.display === 'none' || cs.visibility === 'hidden' || parseFloat(cs.opacity) === 0) return false;
-              n = n.parentElement;
-            }
-            return true;
-          };
-          if (!visibleInTree(el)) return false;
-          if (el.offsetParent === null) return false;
-          const r = el.getBoundingClientRect();
-          if (r.width === 0 || r.height === 0) return false;
-          const vw = (window.innerWidth || document.documentElement.clientWidth);
-          const vh = (window.innerHeight || document.documentElement.clientHeight);
-          if (r.right <= 0 || r.bottom <= 0 || r.left >= vw || r.top >= vh) return false;
-          return true;
-        }
-        """
         try:
-            return await page.evaluate(js, selector)
+            return await ff_call(page, "reallyVisible", selector)
         except Exception:
             return False
 
@@ -310,45 +460,7 @@ class FormFillerCore:
         scope 内の input/select/textarea のうち、内部ロジックにより“現在有効”な要素の
         安定キー集合（name/id/簡易CSSパス）を返す。
         """
-        js = r"""
-        (scopeSel) => {
-          const root = document.querySelector(scopeSel);
-          if (!root) return [];
-          const isHiddenByLogic = (el) => {
-            if (el.closest('[hidden]')) return true;
-            if (el.closest('[aria-hidden="true"]')) return true;
-            if (el.closest('.wpcf7cf-hidden, .is-hidden, .u-hidden, .is-none, .hidden')) return true;
-            const style = window.getComputedStyle(el);
-            if (style.display === 'none' || style.visibility === 'hidden' || parseFloat(style.opacity) === 0) return true;
-            if (el.offsetParent === null && style.position !== 'fixed') return true;
-            return false;
-          };
-          const cssPath = (el) => {
-            if (el.id) return `#${el.id}`;
-            const segs = [];
-            let e = el;
-            while (e && e.nodeType === 1 && e !== root) {
-              if (e.id) { segs.unshift(`#${e.id}`); break; }
-              const tag = e.tagName.toLowerCase();
-              let i = 1, s = e;
-              while ((s = s.previousElementSibling) != null) if (s.tagName === e.tagName) i++;
-              segs.unshift(`${tag}:nth-of-type(${i})`);
-              e = e.parentElement;
-            }
-            return segs.join(' > ');
-          };
-          const els = root.querySelectorAll('input, select, textarea');
-          const out = new Set();
-          els.forEach(el => {
-            if (el.disabled) return;
-            if (isHiddenByLogic(el)) return;
-            const key = el.getAttribute('name') || el.id || cssPath(el);
-            out.add(key);
-          });
-          return Array.from(out);
-        }
-        """
-        keys = await page.evaluate(js, scope_selector)
+        keys = await ff_call(page, "activeFieldKeys", scope_selector)
         return set(keys or [])
 
     async def _ensure_mode(self, page: Page, target: str = "company") -> None:
@@ -387,36 +499,14 @@ class FormFillerCore:
         """
         入力対象要素から安定キー（name / id / 簡易CSSパス）を得る。
         """
-        js = r"""
-        (sel) => {
-          const el = document.querySelector(sel);
-          if (!el) return sel;
-          return el.getAttribute('name') || el.id || sel;
-        }
-        """
         try:
-            return await self.page.evaluate(js, elem_selector)
+            return await ff_call(self.page, "stableKey", elem_selector)
         except Exception:
             return elem_selector
 
     async def _looks_personal(self, page, selector: str) -> bool:
-        js = r"""
-        (sel) => {
-          const el = document.querySelector(sel);
-          if (!el) return false;
-          const re = /(personal|private|kojin|個人)/i;
-          let n = el;
-          while (n && n.nodeType === 1) {
-            const tokens = ((n.id||'') + ' ' + (n.getAttribute('name')||'') + ' ' + (n.className||''))\
-              .toLowerCase();
-            if (re.test(tokens)) return true;
-            n = n.parentElement;
-          }
-          return false;
-        }
-        """
         try:
-            return await page.evaluate(js, selector)
+            return await ff_call(page, "looksPersonal", selector)
         except Exception:
             return False
 
@@ -425,43 +515,8 @@ class FormFillerCore:
         company系アンカー群の最小共通祖先(LCA)を取り、personal系を含まない最小祖先を
         「企業用パネル」として返す。見つからなければ None。
         """
-        js = r"""
-        () => {
-          const qs = (s) => Array.from(document.querySelectorAll(s));
-          const corp = qs('[name^="company_"],[name*="company_"],[id^="company_"],[id*="company_"],[class*="company"]');
-          if (corp.length < 2) return null;
-          const hasPersonal = (node) => !!node.querySelector('[id^="personal_"],[id*="personal_"],[name^="personal_"],[name*="personal_"],[class*="personal"]');
-          const lca = (a,b) => {
-            if (!a || !b) return null;
-            const path = (n) => { const arr=[]; while(n){arr.unshift(n); n=n.parentElement;} return arr; };
-            const pa = path(a), pb = path(b);
-            let i=0, last=null;
-            while (i<pa.length && i<pb.length && pa[i]===pb[i]) { last = pa[i]; i++; }
-            return last;
-          };
-          let node = corp[0];
-          for (let i=1; i<corp.length; i++){ node = lca(node, corp[i]) || node; }
-          if (!node) return null;
-          while (node && hasPersonal(node)) node = node.parentElement;
-          if (!node) return null;
-          const cssPath = (el) => {
-            if (!el) return null;
-            if (el.id) return '#'+CSS.escape(el.id);
-            const parts=[]; let n=el;
-            while (n && n.nodeType===1 && n!==document) {
-              if (n.id){ parts.unshift('#'+CSS.escape(n.id)); break; }
-              const tn=n.tagName.toLowerCase(); let i=1, s=n;
-              while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
-              parts.unshift(`${tn}:nth-of-type(${i})`);
-              n=n.parentElement;
-            }
-            return parts.join(' > ');
-          };
-          return cssPath(node);
-        }
-        """
         try:
-            const_selector = await page.evaluate(js)
+            const_selector = await ff_call(page, "corpPanel")
             if const_selector and getattr(self, "debug", False):
                 logger.debug(f"[corp-scope-panel] scope={const_selector}")
             return const_selector
@@ -475,15 +530,8 @@ class FormFillerCore:
         """
         if not scope_selector:
             return True
-        js = r"""
-        (sc, sel) => {
-          const root = document.querySelector(sc);
-          const el = document.querySelector(sel);
-          return !!(root && el && root.contains(el));
-        }
-        """
         try:
-            return await page.evaluate(js, scope_selector, selector)
+            return await ff_call(page, "withinScope", [scope_selector, selector])
         except Exception:
             return False
 
@@ -492,18 +540,8 @@ class FormFillerCore:
         selector の要素が personal 系プレフィックス（id/name が ^personal[_-] 等）なら除外。
         True を返したら「除外」扱い。
         """
-        js = r"""
-        (sel) => {
-          const el = document.querySelector(sel);
-          if (!el) return false;
-          const nm = (el.getAttribute('name') || '');
-          const id = (el.id || '');
-          const re = /^(personal|private|individual)[_-]/i;
-          return re.test(nm) || re.test(id);
-        }
-        """
         try:
-            return await page.evaluate(js, selector)
+            return await ff_call(page, "personalPrefixed", selector)
         except Exception:
             return False
 
@@ -529,10 +567,7 @@ class FormFillerCore:
             # 明らかな意味不一致の除外（名前系に tel/phone を混入させない）
             if key in {"name", "first_name", "last_name", "nameSei", "nameMei"}:
                 try:
-                    meta = await page.evaluate(
-                        "(sel)=>{const el=document.querySelector(sel);return {id:el?.id||'',name:el?.getAttribute('name')||'',type:(el?.getAttribute('type')||'').toLowerCase()};}",
-                        sel
-                    )
+                    meta = await ff_call(page, "fieldMeta", sel)
                     iname = (meta.get('id','') + ' ' + meta.get('name','')).lower()
                     if 'tel' in iname or 'phone' in iname or meta.get('type') == 'tel':
                         if getattr(self, "debug", False):
@@ -567,6 +602,17 @@ class FormFiller(FormFillerCore):
         show_browser: bool = False,
         debug: bool = False,
         demo_ms: int = 0,
+        browsers: int = 1,
+        warm_contexts: int = 0,
+        context_max_pages: int = 50,
+        context_max_heap_mb: float = 256.0,
+        global_rate_per_min: float = 60.0,
+        blocklist: Optional[str] = None,
+        allowlist: Optional[str] = None,
+        http_fast: bool = False,
+        triage: bool = False,
+        mapping_cache: Optional[str] = None,
+        batch_fill: bool = False,
     ):
         self.concurrency = concurrency
         self.timeout = timeout
@@ -579,7 +625,8 @@ class FormFiller(FormFillerCore):
         self.lexicon_path = lexicon
         self.dump_lexicon = dump_lexicon
         # レート制限: グローバル + ドメイン別（12/min）
-        self.global_limiter = aiolimiter.AsyncLimiter(60, 60)
+        # 分割実行時は親が global_rate_per_min をプロセス数で割って渡す
+        self.global_limiter = aiolimiter.AsyncLimiter(max(1.0, float(global_rate_per_min or 60.0)), 60)
         self._domain_limiters: dict[str, aiolimiter.AsyncLimiter] = {}
         self.results: List[FormResult] = []
         self.show_browser = show_browser
@@ -588,7 +635,35 @@ class FormFiller(FormFillerCore):
         self._file_lock = asyncio.Lock()
         self._learn_lock = asyncio.Lock()
         self._learn_seen: set[tuple[str, str, str, str]] = set()
-
+        # ブラウザプール（run 中のみ保持。process_form 単体呼び出し時は都度生成）
+        self.browsers = max(1, int(browsers or 1))
+        self._browser_pool: Optional[BrowserPool] = None
+        self._collected: Optional[Dict[int, FormResult]] = None
+        # find_best_field_match 用のフォームスナップショット（ページ単位・マッピング1回分）
+        self._snapshots: "weakref.WeakKeyDictionary[Any, List[Tuple[Any, Dict[str, Any]]]]" = weakref.WeakKeyDictionary()
+        # マッピング時に検出したフォームフレームワーク（送信・成功判定で規約を使う）
+        self._frameworks: "weakref.WeakKeyDictionary[Any, FrameworkMatch]" = weakref.WeakKeyDictionary()
+        # 直近のマッピングで各キーを決めた段・スコア・所要時間（--emit-json 用）
+        self._traces: "weakref.WeakKeyDictionary[Any, MappingTrace]" = weakref.WeakKeyDictionary()
+        # 広告/画像等の遮断（ネイティブ遮断＋必要最小限の route）。リストファイルで追加可能
+        self.url_classifier = UrlClassifier.from_files(blocklist, allowlist)
+        self._blocker = RequestBlocker(self.url_classifier)
+        # 静的フォームをブラウザなしで処理する HTTP 高速経路（run 中のみ保持）
+        self.http_fast = bool(http_fast)
+        self._http_fast: Optional[HttpFastPath] = None
+        # ブラウザ投入前の到達性/フォーム有無チェック
+        self.triage = bool(triage)
+        # マッピング済みの値をフレームごとに1回の evaluate で入力する（失敗した欄だけ従来経路）
+        self.batch_fill = bool(batch_fill)
+        # 温めたコンテキストの再利用（0 ならタスクごとに使い捨て）
+        self.warm_contexts = max(0, int(warm_contexts or 0))
+        self.context_max_pages = max(1, int(context_max_pages or 1))
+        self.context_max_heap_mb = float(context_max_heap_mb or 0)
+
+        # 語彙（キー → シノニム）と入力対象キー。インスタンスごとに持ち、構築後は変更しない
+        # （外部 YAML の読み込みに失敗しても組み込みの語彙で動く）
+        self.lexicon: Lexicon = default_lexicon()
+        self.fillable_keys: FrozenSet[str] = frozenset(FILLABLE_KEYS)
         try:
             self._load_lexicon()
         except Exception as e:
@@ -620,6 +695,14 @@ class FormFiller(FormFillerCore):
         # honeypot判定
         self._honeypot_pat = re.compile("|".join([re.escape(x) for x in HONEYPOT_TOKENS]), re.I) if HONEYPOT_TOKENS else None
 
+        # フォーム構造指紋 → マッピングの永続キャッシュ（語彙が変わったら破棄）
+        self.mapping_cache: Optional[MappingCache] = None
+        if mapping_cache:
+            try:
+                self.mapping_cache = MappingCache(mapping_cache, self._lexicon_version())
+            except Exception as e:
+                logger.warning(f"マッピングキャッシュを開けません（無効化して続行）: {e}")
+
     def _domain_limiter(self, form_url: str) -> aiolimiter.AsyncLimiter:
         """ドメイン別のレートリミッタ（12/min）を取得"""
         try:
@@ -630,63 +713,94 @@ class FormFiller(FormFillerCore):
             self._domain_limiters[host] = aiolimiter.AsyncLimiter(12, 60)
         return self._domain_limiters[host]
 
-    def _compile_regex_dict(self, raw: Dict[str, List[str]]) -> Dict[str, List[re.Pattern]]:
-        compiled: Dict[str, List[re.Pattern]] = {}
-        for key, patterns in raw.items():
-            out: List[re.Pattern] = []
-            for pat in patterns or []:
-                try:
-                    out.append(re.compile(pat, re.I))
-                except Exception:
-                    out.append(re.compile(re.escape(str(pat)), re.I))
-            compiled[key] = out
-        return compiled
+    # ========= ブラウザ/コンテキスト設定 =========
+    def _timeout_ms(self) -> int:
+        # 高速化モードではタイムアウトを短縮
+        return (self.timeout // 2) * 1000 if self.fast_mode else self.timeout * 1000
+
+    def _context_options(self) -> Dict[str, Any]:
+        """BrowserContext 生成オプション（viewport/UA/SW無効化/CSP・証明書バイパス）"""
+        # ブラウザウィンドウサイズ設定（より見やすいサイズに調整）
+        if self.show_browser:
+            # 環境変数でサイズ指定可能
+            custom_width = os.getenv('BROWSER_WIDTH')
+            custom_height = os.getenv('BROWSER_HEIGHT')
+            if custom_width and custom_height:
+                viewport_width = int(custom_width)
+                viewport_height = int(custom_height)
+            else:
+                # デフォルトサイズ（ノートPCに適したサイズ）
+                viewport_width = 1366
+                viewport_height = 768
+        else:
+            # headlessモードでは大きなサイズ
+            viewport_width = 1920
+            viewport_height = 1080
+        return {
+            "viewport": {'width': viewport_width, 'height': viewport_height},
+            "user_agent": USER_AGENT,
+            "service_workers": "block",  # Service Workerを無効化して高速化
+            "bypass_csp": True,  # Content Security Policyをバイパス
+            "ignore_https_errors": True,  # HTTPS証明書エラーを無視
+        }
 
-    def _load_yaml_if_exists(self, path: str) -> Dict[str, List[str]]:
-        try:
-            if path and os.path.exists(path):
-                with open(path, "r", encoding="utf-8") as f:
-                    data = yaml.safe_load(f) or {}
-                if isinstance(data, dict):
-                    return {str(k): (list(v) if isinstance(v, list) else [str(v)]) for k, v in data.items()}
-        except Exception as e:
-            logger.debug(f"lexiconファイル読み込み失敗: {path}: {e}")
-        return {}
+    async def _configure_context(self, context: BrowserContext) -> None:
+        """新規コンテキストへ既定タイムアウト・リクエスト遮断・ページ内ヘルパを適用"""
+        context.set_default_timeout(self._timeout_ms())
+        await self._blocker.install(context)
+        # ページ内ヘルパ（window.__ff）を全ページ・全フレームに1度だけ注入
+        await install_runtime(context)
+
+    def _new_browser_pool(self) -> BrowserPool:
+        return BrowserPool(
+            self.browsers,
+            headless=not self.show_browser,
+            context_options=self._context_options(),
+            configure=self._configure_context,
+            warm_contexts=self.warm_contexts,
+            max_pages=self.context_max_pages,
+            max_heap_mb=self.context_max_heap_mb,
+        )
+
+    @asynccontextmanager
+    async def _open_context(self) -> AsyncIterator[BrowserContext]:
+        """
+        タスク用の BrowserContext を払い出す。
+        run 中はプールの長寿命ブラウザ（と温めたコンテキスト）を使い、単体呼び出し時は一時プールを起動・破棄する。
+        """
+        pool = self._browser_pool
+        if pool is not None:
+            async with pool.lease() as context:
+                yield context
+            return
+        async with self._new_browser_pool() as tmp_pool:
+            async with tmp_pool.context() as context:
+                yield context
 
     def _load_lexicon(self) -> None:
-        global CANDIDATES, FILLABLE_KEYS
-        base = self._load_yaml_if_exists(DEFAULT_LEXICON_BASE)
-        custom = self._load_yaml_if_exists(DEFAULT_LEXICON_CUSTOM)
-        extra = self._load_yaml_if_exists(self.lexicon_path) if self.lexicon_path else {}
-
-        merged: Dict[str, List[str]] = {}
-        for k, v in CANDIDATES.items():
-            merged[k] = [*v]
-        for src in (base, custom, extra):
-            for k, v in src.items():
-                if k in merged:
-                    merged[k].extend([x for x in v if x not in merged[k]])
-                else:
-                    merged[k] = [*v]
-
-        CANDIDATES = self._compile_regex_dict(merged)
-
-        ext_keys: set[str] = set(FILLABLE_KEYS)
-        for src in (base, custom, extra):
-            for k in src.keys():
-                ext_keys.add(k)
-        FILLABLE_KEYS.clear()
-        for k in sorted(ext_keys):
-            FILLABLE_KEYS.add(k)
+        """self.lexicon / self.fillable_keys を差し替える（モジュールの状態は変更しない）"""
+        # YAML が前回から変わっていなければキャッシュ済みのコンパイル結果を使う
+        lexicon = load_lexicon(lexicon_sources(self.lexicon_path), DEFAULT_LEXICON_CACHE_DIR)
+        self.lexicon = lexicon
+        self.fillable_keys = frozenset(FILLABLE_KEYS) | lexicon.source_keys
+
+    def _lexicon_version(self) -> str:
+        """読み込み済み語彙（self.lexicon/STRONG_TOKENS 等）のハッシュ。マッピングキャッシュの無効化に使う"""
+        payload = {
+            "candidates": dict(sorted(self.lexicon.as_dict().items())),
+            "strong": {k: [str(p) for p in v] for k, v in sorted((STRONG_TOKENS or {}).items())},
+            "fillable": sorted(self.fillable_keys),
+            "tokens": [list(CONFIRM_TOKENS or []), list(SEARCH_TOKENS or []), list(HONEYPOT_TOKENS or [])],
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
 
     def _dump_lexicon(self) -> None:
         from typer import echo
 
         echo("=== Dump Lexicon ===")
-        for k in sorted(CANDIDATES.keys()):
-            pats = CANDIDATES[k]
-            shown = [p.pattern if hasattr(p, "pattern") else str(p) for p in pats]
-            echo(f"{k}: {shown}")
+        for k in sorted(self.lexicon.keys()):
+            echo(f"{k}: {list(self.lexicon.patterns(k))}")
 
     # ========== ここから：新規 即決カスケード用ヘルパ ==========
 
@@ -745,13 +859,8 @@ class FormFiller(FormFillerCore):
                 if token == text:  # ← == で完全一致
                     return True
         
-        # CANDIDATESのパターンも完全一致でチェック
-        candidates = CANDIDATES.get(key, [])
-        for pattern in candidates:
-            if re.fullmatch(pattern, text):  # ← fullmatchで完全一致
-                return True
-        
-        return False
+        # 語彙のパターンも完全一致でチェック
+        return self.lexicon.fullmatch(key, text)
 
     # ========= 可視デモ支援（show_browser時のみ動作） =========
     async def _ensure_demo_css(self, page: Page) -> None:
@@ -840,22 +949,6 @@ class FormFiller(FormFillerCore):
             return True
         return False
 
-    def _tie_break(self, matches: List[Dict[str, Any]], prefer_tag: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """同点対処：required > visible > prefer_tag > 先勝ち"""
-        if not matches:
-            return None
-        # required True を優先
-        req = [m for m in matches if m.get("required")]
-        cand = req if req else matches
-        # visible True を優先
-        vis = [m for m in cand if m.get("visible")]
-        cand = vis if vis else cand
-        # prefer_tag（例：message なら textarea）を優先
-        if prefer_tag:
-            pt = [m for m in cand if (m.get("tag") == prefer_tag)]
-            cand = pt if pt else cand
-        return cand[0]
-
     def _auto_key_by_type_ac(self, f: Dict[str, Any]) -> Optional[str]:
         """type / autocomplete からキーを推定（確定強め）"""
         t = (f.get("type") or "").lower()
@@ -925,115 +1018,196 @@ class FormFiller(FormFillerCore):
         except Exception:
             return "unknown"
 
-    def _match_cascade_for_key(self, key: str, fields: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        def _looks_kana(f):
-            tb = self._textbag(f)
-            return any(t in tb for t in ("kana","ｶﾅ","カナ","ふりがな","ﾌﾘｶﾞﾅ","セイ","メイ","せい","めい"))
+    # ========= 割当エンジン（キー × フィールドのスコア行列） =========
+    # 即決カスケードの段（type/autocomplete → placeholder → name → id → labelText）を重みに置き換え、
+    # タイブレーク（required > visible > prefer_tag > 先勝ち）は段の差を越えない小さな加点にする。
+    _TIER_TYPE, _TIER_PLACEHOLDER, _TIER_NAME, _TIER_ID, _TIER_LABEL = 100.0, 80.0, 60.0, 40.0, 20.0
+    _SPLIT_HINT_RE = re.compile(r"(姓|名|せい|めい|family(?:-|\s*)name|given(?:-|\s*)name|first(?:-|\s*)name|last(?:-|\s*)name)")
+    _KANA_TOKENS = ("kana", "ｶﾅ", "カナ", "ふりがな", "ﾌﾘｶﾞﾅ", "セイ", "メイ", "せい", "めい")
+
+    def _field_features(self, f: Dict[str, Any]) -> Dict[str, Any]:
+        """スコア行列用に1フィールド分の判定材料を前計算する"""
+        tb = self._textbag(f)
+        return {
+            "textbag": tb,
+            "search": self._search_like(f),
+            "honeypot": self._honeypot_like(f),
+            "auto_key": self._auto_key_by_type_ac(f),
+            "placeholder": (f.get("placeholder") or "").lower(),
+            "name": (f.get("name") or "").lower(),
+            "id": (f.get("id") or "").lower(),
+            "label": (f.get("labelText") or "").lower(),
+            "kana": any(t in tb for t in self._KANA_TOKENS),
+            "email_confirm": self._is_confirm_like_for_base(f, "email"),
+            "phone_confirm": self._is_confirm_like_for_base(f, "phone"),
+            "split_hint": bool(self._SPLIT_HINT_RE.search(tb)),
+        }
+
+    def _key_field_score(self, key: str, f: Dict[str, Any], feat: Dict[str, Any], order: int) -> float:
+        """1組（キー, フィールド）のスコア。0 以下は割当対象外"""
+        if feat["search"]:
+            return 0.0
+        if key in ("first_name", "last_name") and feat["kana"]:
+            return 0.0
+
+        tier = 0.0
+        if feat["auto_key"] == key:
+            # email_confirm は type だけでは決まらない（確認欄らしさが必要）
+            if key != "email_confirm" or feat["email_confirm"]:
+                tier = self._TIER_TYPE
+        if not tier and not feat["honeypot"]:
+            if self._match_placeholder_exact(key, feat["placeholder"]):
+                # 分割欄の手掛かりが無い placeholder では first/last を割り当てない
+                if key not in ("first_name", "last_name") or feat["split_hint"]:
+                    tier = self._TIER_PLACEHOLDER
+            if not tier and self._match_strong(key, feat["name"]):
+                tier = self._TIER_NAME
+            if not tier and self._match_strong(key, feat["id"]):
+                tier = self._TIER_ID
+            if not tier and self._match_strong(key, feat["label"]):
+                tier = self._TIER_LABEL
+        if not tier:
+            return 0.0
+
+        score = tier
+        if key == "email_confirm" and feat["email_confirm"]:
+            score += 10
+        # 本欄キーが確認欄を奪わないようにする
+        if (key == "email" and feat["email_confirm"]) or (key == "phone" and feat["phone_confirm"]):
+            score -= 30
+        score += score_adjustment(
+            key,
+            tag=(f.get("tag") or ""),
+            input_type=(f.get("type") or ""),
+            attrs={"placeholder": f.get("placeholder") or "", "aria-label": f.get("ariaLabel") or ""},
+            candidate_label_text=f.get("labelText") or "",
+            lexicon=self.lexicon,
+        )
+        # タイブレーク相当（合計 < 段の差）
+        if f.get("required"):
+            score += 4
+        if f.get("visible"):
+            score += 2
+        if key == "message" and (f.get("tag") or "") == "textarea":
+            score += 1
+        return max(score - order * 1e-4, 0.0)
+
+    def _cascade_score_matrix(self, keys: List[str], fields: List[Dict[str, Any]]) -> List[List[float]]:
+        """キー × フィールドのスコア行列を一度に作る（ブラウザ往復なし）"""
+        feats = [self._field_features(f) for f in fields]
+        return [
+            [self._key_field_score(key, f, feat, j) for j, (f, feat) in enumerate(zip(fields, feats))]
+            for key in keys
+        ]
+
+    def _cascade_assign(
+        self,
+        fields: List[Dict[str, Any]],
+        data: Dict[str, Any],
+        *,
+        skip_keys: Optional[set[str]] = None,
+        used_selectors: Optional[set[str]] = None,
+        trace: Optional[MappingTrace] = None,
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[str], bool]:
         """
-        判定順：
-        1) type / autocomplete
-        2) placeholder（完全一致）
-        3) name（部分一致）
-        4) id（部分一致）
-        5) labelText（部分一致）
-        ※ 途中でヒットしたら即決（タイブレーク経由）
+        即決カスケード＋型ベース救済（ページ非依存。extract_labels_bulk 形式の dict 列を入力）。
+        カスケードの各段はスコア行列の重みとして扱い、割当問題として全キーを一度に決める。
+        戻り値: ({key: 割り当てたフィールド}, needed_keys, split_like)
+        used_selectors は割り当てたセレクタで更新される。HTTP 高速経路からも利用する。
+        trace を渡すと、割り当てたキーごとに行列上のスコアと次点（同じキーの他の欄）との差を記録する。
         """
-        # --- 氏名単一欄ガード ---
-        # 分割欄の気配が無いページでは first_name / last_name を割り当てない（単一氏名欄を奪わない）
-        if key in ("first_name", "last_name"):
-            fields = [f for f in fields if not _looks_kana(f)]
-            try:
-                split_like = False
-                for f in fields:
-                    tb = self._textbag(f)
-                    name_attr = (f.get("name") or "").lower()
-                    id_attr = (f.get("id") or "").lower()
-                    # ラベル/placeholder/aria/class 等に明示語があるか
-                    if re.search(r"(姓|名|せい|めい|かな|カナ|ふりがな|姓.*名|family(?:-|\s*)name|given(?:-|\s*)name|first(?:-|\s*)name|last(?:-|\s*)name)", tb):
-                        split_like = True
-                        break
-                    # name/id に典型トークンや連番があるか
-                    if re.search(r"(name0?2|name_?first|name_?last|fname|lname|first|last|given|family)", name_attr):
-                        split_like = True
-                        break
-                    if re.search(r"(name0?2|fname|lname|first|last|given|family)", id_attr):
-                        split_like = True
-                        break
-                if not split_like:
-                    return None
-            except Exception:
-                pass
- 
-        # 1) type/autocomplete
-        type_hits = []
+        skip_keys = skip_keys or set()
+        used_selectors = used_selectors if used_selectors is not None else set()
+        assigned: Dict[str, Dict[str, Any]] = {}
+
+        split_like = self._detect_split_name_context(fields)
+        name_structure = self._detect_name_field_structure(fields)
+        logger.info(f"分割氏名欄検出結果: split_like={split_like}, name_structure={name_structure}")
+        needed_keys = [k for k in self.fillable_keys if k in data]
+        if "furigana" in data:
+            for k in ("kanaSei", "kanaMei"):
+                if k not in needed_keys:
+                    needed_keys.append(k)
+        
+        # 分割フリガナフィールドが存在する場合は分割氏名として扱う
+        split_kana_fields = []
         for f in fields:
-            if self._search_like(f):
-                continue
-            k = self._auto_key_by_type_ac(f)
-            if k == key:
-                type_hits.append(f)
-        if type_hits:
-            # email_confirm は type だけでは決まらないのでここでは本欄を優先
-            if key == "email_confirm":
-                # confirm らしいものを選ぶ（なければスキップ）
-                confs = [f for f in type_hits if self._is_confirm_like_for_base(f, "email")]
-                if confs:
-                    return self._tie_break(confs)
-            else:
-                return self._tie_break(type_hits, prefer_tag=("textarea" if key == "message" else None))
+            field_name = f.get("name", "").lower()
+            # より具体的なパターンで分割フリガナフィールドを検出
+            if re.search(r"name_?sei_?kana|name_?mei_?kana|kana_?sei|kana_?mei|name_mei_kana|name_sei_kana", field_name):
+                split_kana_fields.append(field_name)
+        
+        if split_kana_fields:
+            split_like = True
+            logger.info(f"分割フリガナフィールドを検出: {split_kana_fields}, split_like={split_like}")
+            
+        if not split_like:
+            needed_keys = [k for k in needed_keys if k not in ("first_name", "last_name")]
 
-        # 2) placeholder（完全一致）
-        ph_hits = [
-            f for f in fields
-            if not self._search_like(f) and not self._honeypot_like(f)
-            and self._match_placeholder_exact(key, (f.get("placeholder") or "").lower())
-        ]
-        if ph_hits:
-            if key == "email_confirm":
-                confs = [f for f in ph_hits if self._is_confirm_like_for_base(f, "email")]
-                if confs:
-                    return self._tie_break(confs)
-            # placeholder経由でも、分割欄の気配が無ければ first/last のマッピングは行わない
-            if key in ("first_name", "last_name"):
-                split_like = False
-                for f in ph_hits:
-                    tb = self._textbag(f)
-                    if re.search(r"(姓|名|せい|めい|family(?:-|\s*)name|given(?:-|\s*)name|first(?:-|\s*)name|last(?:-|\s*)name)", tb):
-                        split_like = True
-                        break
-                if not split_like:
-                    return None
-            return self._tie_break(ph_hits, prefer_tag=("textarea" if key == "message" else None))
-
-        # 3) name（部分一致）
-        name_hits = [f for f in fields if not self._search_like(f) and not self._honeypot_like(f) and self._match_strong(key, (f.get("name") or "").lower())]
-        if name_hits:
-            # email_confirm 特例
-            if key == "email_confirm":
-                confs = [f for f in name_hits if self._is_confirm_like_for_base(f, "email")]
-                if confs:
-                    return self._tie_break(confs)
-            return self._tie_break(name_hits, prefer_tag=("textarea" if key == "message" else None))
-
-        # 4) id（部分一致）
-        id_hits = [f for f in fields if not self._search_like(f) and not self._honeypot_like(f) and self._match_strong(key, (f.get("id") or "").lower())]
-        if id_hits:
-            if key == "email_confirm":
-                confs = [f for f in id_hits if self._is_confirm_like_for_base(f, "email")]
-                if confs:
-                    return self._tie_break(confs)
-            return self._tie_break(id_hits, prefer_tag=("textarea" if key == "message" else None))
-
-        # 5) labelText（部分一致）
-        lb_hits = [f for f in fields if not self._search_like(f) and not self._honeypot_like(f) and self._match_strong(key, (f.get("labelText") or "").lower())]
-        if lb_hits:
-            if key == "email_confirm":
-                confs = [f for f in lb_hits if self._is_confirm_like_for_base(f, "email")]
-                if confs:
-                    return self._tie_break(confs)
-            return self._tie_break(lb_hits, prefer_tag=("textarea" if key == "message" else None))
+        def reserve(f: Dict[str, Any], key: str):
+            sel = f.get("selector")
+            if not sel or sel in used_selectors:
+                return False
+            used_selectors.add(sel)
+            assigned[key] = f
+            return True
 
-        return None
+        # 氏名欄構造に基づいて優先順位を動的に決定
+        if name_structure == "split":
+            # 分割氏名の場合：first_name, last_name を優先
+            priority_first = [k for k in ["email", "email_confirm", "phone", "website", "first_name", "last_name"] if k in needed_keys]
+        elif name_structure == "single":
+            # 単一氏名の場合：name を優先
+            priority_first = [k for k in ["email", "email_confirm", "phone", "website", "name"] if k in needed_keys]
+        else:
+            # 不明な場合：従来通り
+            priority_first = [k for k in ["email", "email_confirm", "phone", "website", "name"] if k in needed_keys]
+        
+        rest_keys = [k for k in needed_keys if k not in priority_first]
+        cascade_order = [*priority_first, *rest_keys]
+
+        # キー × フィールドのスコア行列を解き、全体で最適な組み合わせを一度に決める
+        keys = [k for k in cascade_order if k not in skip_keys and k not in assigned]
+        free: List[Dict[str, Any]] = []
+        seen: set[str] = set()
+        for f in fields:
+            sel = f.get("selector")
+            if sel and sel not in used_selectors and sel not in seen:
+                seen.add(sel)
+                free.append(f)
+        if keys and free:
+            t0 = time.perf_counter()
+            matrix = self._cascade_score_matrix(keys, free)
+            solved = sorted(solve_assignment(matrix).items())
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            for row, col in solved:
+                if reserve(free[col], keys[row]) and trace is not None:
+                    scores = matrix[row]
+                    others = [v for j, v in enumerate(scores) if j != col]
+                    trace.record(
+                        keys[row], "cascade",
+                        score=scores[col],
+                        margin=scores[col] - max(others) if others else None,
+                        elapsed_ms=elapsed_ms,
+                    )
+            if trace is not None:
+                trace.add_time("cascade", elapsed_ms)
+
+        # 型ベースの救済
+        def _find_by_type(fields: List[Dict[str, Any]], tval: str) -> Optional[Dict[str, Any]]:
+            for f in fields:
+                if f.get("selector") in used_selectors:
+                    continue
+                if (f.get("type") or "").lower() == tval:
+                    return f
+            return None
+        for key, tval in (("website", "url"), ("email", "email"), ("phone", "tel")):
+            if key in needed_keys and key not in skip_keys and key not in assigned:
+                t = _find_by_type(fields, tval)
+                if t and reserve(t, key) and trace is not None:
+                    trace.record(key, "fallback", detail=[f"type={tval}"])
+
+        return assigned, needed_keys, split_like
 
     # ========== ここまで：新規ヘルパ ==========
 
@@ -1111,6 +1285,209 @@ class FormFiller(FormFillerCore):
         except Exception as e:
             logger.debug(f"learning signal記録エラー: {e}")
 
+    @staticmethod
+    def _score_field_candidate(
+        field_name: str,
+        attrs: Dict[str, str],
+        tag_name: str,
+        label_text: str,
+        lexicon: Lexicon,
+        norm_field: str,
+        profiles: Optional[Dict[str, NgramProfile]] = None,
+    ) -> Tuple[int, List[str]]:
+        """find_best_field_match のスコア計算（属性・タグ・ラベルのみから算出する純粋関数）"""
+        input_type = (attrs.get('type') or '').lower()
+
+        score = 0
+        score_detail: List[str] = []
+
+        for attr in ['name', 'id', 'class']:
+            v = normalize(attrs.get(attr, ""))
+            for syn in lexicon.matches(field_name, v):
+                score += 5
+                score_detail.append(f"{attr}~{syn}:+5")
+
+        name_attr = attrs.get('name', '')
+        m = re.search(r'form_fields\[([^\]]+)\]', name_attr or '')
+        if m:
+            field_in_brackets = m.group(1)
+            if lexicon.search(field_name, field_in_brackets):
+                score += 6
+                score_detail.append("elementor_field:+6")
+
+        if field_name == 'message' and tag_name == 'textarea':
+            score += 15
+            score_detail.append("textarea:+15")
+        elif field_name == 'message' and input_type == 'radio':
+            score -= 20
+            score_detail.append("radio:-20")
+
+        if field_name == 'subject':
+            if input_type == 'radio':
+                score += 15
+                score_detail.append("radio:+15")
+            elif tag_name == 'select':
+                score += 10
+                score_detail.append("select:+10")
+            elif tag_name == 'textarea':
+                score -= 20
+                score_detail.append("textarea:-20")
+
+        if field_name in ['name', 'first_name', 'last_name', 'name_last', 'name_first', 'furigana', 'kana_last', 'kana_first', 'email', 'email_confirm', 'phone', 'company', 'department', 'website']:
+            if input_type == 'radio':
+                score -= 15
+                score_detail.append("radio:-15")
+            elif tag_name == 'textarea':
+                score -= 10
+                score_detail.append("textarea:-10")
+            elif tag_name == 'select':
+                score -= 20
+                score_detail.append("select:-20")
+
+        if label_text:
+            for syn in lexicon.matches(field_name, label_text):
+                score += 4
+                score_detail.append(f"label~{syn}:+4")
+
+        for attr in ['placeholder', 'aria-label']:
+            v = normalize(attrs.get(attr, ""))
+            for syn in lexicon.matches(field_name, v):
+                score += 3
+                score_detail.append(f"{attr}~{syn}:+3")
+
+        t = attrs.get('type', "").lower()
+        if t == "url" and field_name == "website":
+            score += 4
+            score_detail.append("type=url:+4")
+        if t == "tel" and field_name == "phone":
+            score += 2
+            score_detail.append("type=tel:+2")
+        if t == "email" and field_name in ["email", "email_confirm"]:
+            score += 4
+            score_detail.append("type=email:+4")
+
+        if field_name == "website":
+            placeholder = attrs.get('placeholder', '')
+            if re.search(r'(https?://|^www\.)', placeholder.lower()):
+                score += 3
+                score_detail.append("placeholder-url:+3")
+
+        if attrs.get('required') is not None:
+            score += 2
+            score_detail.append("required:+2")
+
+        if attrs.get('type') == 'hidden':
+            score -= 10
+            score_detail.append("hidden:-10")
+
+        key_profile = ngram_profile(norm_field)
+        if profiles is None:
+            profiles = FormFiller._similarity_profiles(attrs)
+        for attr in SIMILARITY_ATTRS:
+            if similar(key_profile, profiles.get(attr), SIMILARITY_THRESHOLD):
+                score += 2
+                score_detail.append(f"{attr}-sim:+2")
+
+        return score, score_detail
+
+    @staticmethod
+    def _similarity_profiles(attrs: Dict[str, str]) -> Dict[str, NgramProfile]:
+        """類似加点に使う属性の n-gram 集合（スナップショットでは要素ごとに1回だけ作る）"""
+        return {attr: ngram_profile(normalize(attrs.get(attr, ""))) for attr in SIMILARITY_ATTRS}
+
+    async def _form_snapshot(self, page: Page) -> Optional[List[Tuple[Any, Dict[str, Any]]]]:
+        """
+        全フレームのコントロール一覧（snapshot_form_controls）をページ単位でキャッシュして返す。
+        find_all_field_matches の開始時に破棄する。メインフレームで取得できなければ None。
+        """
+        try:
+            cached = self._snapshots.get(page)
+        except TypeError:
+            cached = None
+        if cached is not None:
+            return cached
+        scope_css = getattr(self, "_corp_scope_selector", None)
+        try:
+            items = await snapshot_form_controls(page, scope_css)
+        except Exception as e:
+            logger.debug(f"[snapshot] 取得失敗（従来経路で探索）: {e}")
+            return None
+        controls: List[Tuple[Any, Dict[str, Any]]] = [(page, it) for it in items]
+        main_frame = getattr(page, "main_frame", None)
+        for frame in list(getattr(page, "frames", []) or []):
+            if frame is main_frame:
+                continue
+            try:
+                controls.extend((frame, it) for it in await snapshot_form_controls(frame, scope_css))
+            except Exception:
+                continue
+        for _, it in controls:
+            it["profiles"] = self._similarity_profiles(it.get("attrs") or {})
+        try:
+            self._snapshots[page] = controls
+        except TypeError:
+            pass
+        return controls
+
+    async def _collect_candidates_legacy(
+        self, page: Page, field_name: str, norm_field: str
+    ) -> List[Tuple[Tuple[Any, str], int, List[str]]]:
+        """要素ごとに属性・ラベル等を取得する従来経路（スナップショット失敗時のみ）"""
+        all_fields = []
+        frames = [page] + list(page.frames)
+        for frame in frames:
+            try:
+                fields = await frame.query_selector_all('input, textarea, select')
+                all_fields.extend([(field, frame) for field in fields])
+            except Exception:
+                continue
+
+        candidates = []
+        for field, frame in all_fields:
+            try:
+                attrs = {}
+                for attr in ['name', 'placeholder', 'aria-label', 'id', 'class', 'type', 'required']:
+                    value = await field.get_attribute(attr)
+                    if value:
+                        attrs[attr] = value
+
+                try:
+                    tag_name = (await field.evaluate('el => el.tagName.toLowerCase()')) or ''
+                except Exception:
+                    tag_name = ''
+
+                label_text = await get_label_text_for_locator(frame, field)
+                score, score_detail = self._score_field_candidate(
+                    field_name, attrs, tag_name, label_text, self.lexicon, norm_field
+                )
+
+                selector = await selector_for_locator(field)
+                # ---- 企業スコープ外／personal 系／非表示は候補に入れない（強制）----
+                scope_css = getattr(self, "_corp_scope_selector", None)
+                if scope_css:
+                    try:
+                        inside = await self._within_scope(page, scope_css, selector)
+                    except Exception:
+                        inside = True
+                    if not inside:
+                        continue
+                try:
+                    if await self._looks_personal(page, selector):
+                        continue
+                except Exception:
+                    pass
+                try:
+                    if not await self._is_really_visible(page, selector):
+                        continue
+                except Exception:
+                    pass
+                candidates.append(((frame, selector), score, score_detail))
+
+            except Exception as e:
+                logger.debug(f"フィールド処理エラー: {e}")
+                continue
+        return candidates
+
     async def find_best_field_match(
         self,
         page: Page,
@@ -1119,156 +1496,32 @@ class FormFiller(FormFillerCore):
     ) -> Optional[Tuple[Any, str]]:
         """
         既存のスコア法（フォールバック用に温存）。
+        フォームのスナップショット（1フレーム1回の evaluate）に対して Python 側で採点する。
+        選んだ欄のスコア・次点との差・採点内訳は、マッピング中のページの trace.ranked に残す。
         """
+        t0 = time.perf_counter()
         try:
-            all_fields = []
-            frames = [page] + list(page.frames)
-            for frame in frames:
-                try:
-                    fields = await frame.query_selector_all('input, textarea, select')
-                    all_fields.extend([(field, frame) for field in fields])
-                except Exception:
-                    continue
-
             norm_field = normalize(field_name)
-            synonyms = CANDIDATES.get(field_name, [field_name])
-
-            candidates = []
-            import difflib
 
-            for field, frame in all_fields:
-                try:
-                    attrs = {}
-                    for attr in ['name', 'placeholder', 'aria-label', 'id', 'class', 'type', 'required']:
-                        value = await field.get_attribute(attr)
-                        if value:
-                            attrs[attr] = value
-
-                    try:
-                        tag_name = (await field.evaluate('el => el.tagName.toLowerCase()')) or ''
-                    except Exception:
-                        tag_name = ''
-                    input_type = (attrs.get('type') or '').lower()
-
-                    score = 0
-                    score_detail: List[str] = []
-
-                    for attr in ['name', 'id', 'class']:
-                        v = normalize(attrs.get(attr, ""))
-                        for syn in synonyms:
-                            if re.search(syn, v):
-                                score += 5
-                                score_detail.append(f"{attr}~{syn}:+5")
-
-                    name_attr = attrs.get('name', '')
-                    m = re.search(r'form_fields\[([^\]]+)\]', name_attr or '')
-                    if m:
-                        field_in_brackets = m.group(1)
-                        if any(re.search(syn, field_in_brackets) for syn in synonyms):
-                            score += 6
-                            score_detail.append("elementor_field:+6")
-
-                    if field_name == 'message' and tag_name == 'textarea':
-                        score += 15
-                        score_detail.append("textarea:+15")
-                    elif field_name == 'message' and input_type == 'radio':
-                        score -= 20
-                        score_detail.append("radio:-20")
-
-                    if field_name == 'subject':
-                        if input_type == 'radio':
-                            score += 15
-                            score_detail.append("radio:+15")
-                        elif tag_name == 'select':
-                            score += 10
-                            score_detail.append("select:+10")
-                        elif tag_name == 'textarea':
-                            score -= 20
-                            score_detail.append("textarea:-20")
-
-                    if field_name in ['name', 'first_name', 'last_name', 'name_last', 'name_first', 'furigana', 'kana_last', 'kana_first', 'email', 'email_confirm', 'phone', 'company', 'department', 'website']:
-                        if input_type == 'radio':
-                            score -= 15
-                            score_detail.append("radio:-15")
-                        elif tag_name == 'textarea':
-                            score -= 10
-                            score_detail.append("textarea:-10")
-                        elif tag_name == 'select':
-                            score -= 20
-                            score_detail.append("select:-20")
-
-                    label_text = await get_label_text_for_locator(frame, field)
-                    if label_text:
-                        for syn in synonyms:
-                            if re.search(syn, label_text):
-                                score += 4
-                                score_detail.append(f"label~{syn}:+4")
-
-                    for attr in ['placeholder', 'aria-label']:
-                        v = normalize(attrs.get(attr, ""))
-                        for syn in synonyms:
-                            if re.search(syn, v):
-                                score += 3
-                                score_detail.append(f"{attr}~{syn}:+3")
-
-                    t = attrs.get('type', "").lower()
-                    if t == "url" and field_name == "website":
-                        score += 4
-                        score_detail.append("type=url:+4")
-                    if t == "tel" and field_name == "phone":
-                        score += 2
-                        score_detail.append("type=tel:+2")
-                    if t == "email" and field_name in ["email", "email_confirm"]:
-                        score += 4
-                        score_detail.append("type=email:+4")
-
-                    if field_name == "website":
-                        placeholder = attrs.get('placeholder', '')
-                        if re.search(r'(https?://|^www\.)', placeholder.lower()):
-                            score += 3
-                            score_detail.append("placeholder-url:+3")
-
-                    if attrs.get('required') is not None:
-                        score += 2
-                        score_detail.append("required:+2")
-
-                    if attrs.get('type') == 'hidden':
-                        score -= 10
-                        score_detail.append("hidden:-10")
-
-                    for attr in ['name', 'id', 'class', 'placeholder', 'aria-label']:
-                        v = normalize(attrs.get(attr, ""))
-                        if v:
-                            ratio = difflib.SequenceMatcher(None, norm_field, v).ratio()
-                            if ratio > 0.65:
-                                score += 2
-                                score_detail.append(f"{attr}-sim:+2")
-
-                    selector = await selector_for_locator(field)
+            controls = await self._form_snapshot(page)
+            if controls is None:
+                candidates = await self._collect_candidates_legacy(page, field_name, norm_field)
+            else:
+                candidates = []
+                for frame, item in controls:
                     # ---- 企業スコープ外／personal 系／非表示は候補に入れない（強制）----
-                    scope_css = getattr(self, "_corp_scope_selector", None)
-                    if scope_css:
-                        try:
-                            inside = await self._within_scope(page, scope_css, selector)
-                        except Exception:
-                            inside = True
-                        if not inside:
-                            continue
-                    try:
-                        if await self._looks_personal(page, selector):
-                            continue
-                    except Exception:
-                        pass
-                    try:
-                        if not await self._is_really_visible(page, selector):
-                            continue
-                    except Exception:
-                        pass
-                    candidates.append(((frame, selector), score, score_detail))
-
-                except Exception as e:
-                    logger.debug(f"フィールド処理エラー: {e}")
-                    continue
+                    if not item.get("inScope", True) or item.get("personal") or not item.get("visible"):
+                        continue
+                    score, score_detail = self._score_field_candidate(
+                        field_name,
+                        item.get("attrs") or {},
+                        item.get("tag") or "",
+                        item.get("label") or "",
+                        self.lexicon,
+                        norm_field,
+                        item.get("profiles"),
+                    )
+                    candidates.append(((frame, item["selector"]), score, score_detail))
 
             candidates.sort(key=lambda x: x[1], reverse=True)
 
@@ -1280,7 +1533,7 @@ class FormFiller(FormFillerCore):
 
             min_score = SPECIAL_MIN_SCORE.get(field_name, 5)
             exclude = exclude_selectors or set()
-            for (best_frame, best_selector), best_score, best_detail in candidates:
+            for idx, ((best_frame, best_selector), best_score, best_detail) in enumerate(candidates):
                 if best_selector in exclude:
                     if self.debug:
                         try:
@@ -1307,6 +1560,20 @@ class FormFiller(FormFillerCore):
                     except Exception:
                         pass
 
+                # 次点: 除外されていない次の候補（最低点未満でも比較対象にする）
+                runner_up = next((sc for (_, sel), sc, _ in candidates[idx + 1:] if sel not in exclude), None)
+                try:
+                    trace = self._traces.get(page)
+                except TypeError:
+                    trace = None
+                if trace is not None:
+                    trace.ranked[field_name] = MappingDecision(
+                        "fallback",
+                        score=float(best_score),
+                        margin=None if runner_up is None else float(best_score - runner_up),
+                        elapsed_ms=(time.perf_counter() - t0) * 1000,
+                        detail=list(best_detail),
+                    )
                 return (best_frame, best_selector)
 
             return None
@@ -1320,8 +1587,17 @@ class FormFiller(FormFillerCore):
           1) extract_labels_bulk(page) で候補を一括取得
           2) 即決カスケード（type→autocomplete→placeholder→name→id→labelText）
           3) 未決定は find_best_field_match() にフォールバック
+        各キーを決めた段・スコア・所要時間は self._traces[page] に残す（--emit-json で出力）。
         """
         element_map: Dict[str, Tuple[Optional[Any], str]] = {}
+        trace = MappingTrace()
+        try:
+            self._traces[page] = trace
+        except TypeError:
+            pass
+
+        def _ms(t0: float) -> float:
+            return (time.perf_counter() - t0) * 1000
 
         # 0) 会社名が必要なら、対象フィールドの出現を短時間だけ待つ（軽量・条件付き）
         need_company = ("company" in data)
@@ -1334,14 +1610,62 @@ class FormFiller(FormFillerCore):
         # 企業スコープ（未使用：旧実装互換）
         scope_selector: Optional[str] = None
         self._corp_scope_selector = scope_selector
+        # DOM が変わっている可能性があるため、スナップショットはマッピングごとに取り直す
+        try:
+            self._snapshots.pop(page, None)
+        except TypeError:
+            pass
 
         # 1) 一括抽出（可視のみ・personal除外）
         try:
-            bulk_fields = await extract_labels_bulk(page, scope_selector=scope_selector)
+            bulk_fields = await extract_labels_bulk(page, scope_selector=scope_selector, classifier=self.url_classifier)
         except Exception as e:
             if self.debug:
                 logger.debug(f"[extract_labels_bulk] 失敗: {e}")
             bulk_fields = []
+        # 0.4) 既知のフォームフレームワークなら規約どおりのマッピングを使う
+        t0 = time.perf_counter()
+        framework = detect_framework(bulk_fields, data.keys())
+        trace.add_time("framework", _ms(t0))
+        try:
+            if framework is not None:
+                self._frameworks[page] = framework
+            else:
+                self._frameworks.pop(page, None)
+        except TypeError:
+            pass
+        if framework is not None:
+            fw_frame = self._frame_for_url(page, framework.frame_url)
+            fw_map: Dict[str, Tuple[Optional[Any], str]] = {k: (fw_frame, sel) for k, sel in framework.mapping.items()}
+            for k in fw_map:
+                trace.record(k, "framework", elapsed_ms=trace.stage_ms["framework"], detail=[framework.name])
+            if framework.complete:
+                logger.info(f"フレームワーク検出: {framework.name}（{len(fw_map)} 件を規約どおりにマッピング）")
+                self._apply_furigana_split(fw_map, data)
+                return fw_map
+            logger.info(f"フレームワーク検出: {framework.name}（未知の欄 {framework.unknown_fields} は汎用探索）")
+            element_map.update(fw_map)
+
+        # 0.5) 同一構造のフォームを過去に解いていれば、そのマッピングをそのまま使う
+        fingerprint: Optional[str] = None
+        if self.mapping_cache is not None and bulk_fields:
+            t0 = time.perf_counter()
+            fingerprint = form_fingerprint(bulk_fields, data.keys())
+            entries = self.mapping_cache.get(fingerprint)
+            cached = self._mapping_from_cache_entries(page, entries)
+            if cached is not None and not await self._cached_mapping_still_matches(page, cached, entries):
+                # 同じ指紋でも要素の name/type が違う（別サイトの同一テンプレート等）→ 破棄して解き直す
+                logger.info("マッピングキャッシュの要素が一致しないため再マッピング")
+                self.mapping_cache.discard(fingerprint)
+                cached = None
+            trace.add_time("cache", _ms(t0))
+            if cached is not None:
+                for k in cached:
+                    trace.record(k, "cache", elapsed_ms=trace.stage_ms["cache"], detail=[f"fingerprint={fingerprint[:12]}"])
+                logger.info(f"マッピングキャッシュ命中: {len(cached)} 件")
+                self._apply_furigana_split(cached, data)
+                return cached
+
         def _visible_only(fs): return [f for f in (fs or []) if f.get("visible")]
         def _without_personal(fs):
             out=[]
@@ -1351,9 +1675,12 @@ class FormFiller(FormFillerCore):
                     continue
                 out.append(f)
             return out
+        all_fields = bulk_fields  # 非表示を含む一括抽出の全件（corp_sub の特例で使う）
         bulk_fields = _without_personal(_visible_only(bulk_fields))
 
         # --- 先行プリパス（即決ルール）: email / phone / 氏名2or4件 ---
+        t_prepass = time.perf_counter()
+        prepass_rules: Dict[str, str] = {}
         try:
             # email: name 属性に 'mail' を含む最初の input を即決割当
             if "email" in data and "email" not in element_map:
@@ -1363,6 +1690,7 @@ class FormFiller(FormFillerCore):
                         sel = _f.get("selector")
                         if sel:
                             element_map["email"] = (page, sel)
+                            prepass_rules["email"] = "name~mail"
                             break
         except Exception:
             pass
@@ -1375,6 +1703,7 @@ class FormFiller(FormFillerCore):
                     sel = _phones[0].get("selector")
                     if sel:
                         element_map["phone"] = (page, sel)
+                        prepass_rules["phone"] = "name~tel|phone"
         except Exception:
             pass
 
@@ -1398,47 +1727,32 @@ class FormFiller(FormFillerCore):
             if len(_name_inputs) == 2:
                 if "name" in data and "name" not in element_map and _name_inputs[0].get("selector"):
                     element_map["name"] = (page, _name_inputs[0]["selector"])
+                    prepass_rules["name"] = "name-inputs=2"
                 if "furigana" in data and "furigana" not in element_map and _name_inputs[1].get("selector"):
                     element_map["furigana"] = (page, _name_inputs[1]["selector"])
+                    prepass_rules["furigana"] = "name-inputs=2"
             elif len(_name_inputs) == 4:
                 _order_keys = ["last_name", "first_name", "kanaSei", "kanaMei"]
                 for _f, _k in zip(_name_inputs, _order_keys):
                     if (_k in data) and (_k not in element_map) and _f.get("selector"):
                         element_map[_k] = (page, _f["selector"])
+                        prepass_rules[_k] = "name-inputs=4"
                 # 分割確定時は name を使わない
                 if "name" in element_map:
                     element_map.pop("name", None)
         except Exception:
             pass
+        prepass_ms = _ms(t_prepass)
+        trace.add_time("prepass", prepass_ms)
+        for k, rule in prepass_rules.items():
+            if k in element_map:
+                trace.record(k, "prepass", elapsed_ms=prepass_ms, detail=[rule])
         
         # デバッグ: 検出されたフィールド名をログ出力
         field_names = [f.get("name", "") for f in bulk_fields if f.get("name")]
         logger.info(f"検出されたフィールド名: {field_names}")
 
         # 2) 即決カスケード
-        split_like = self._detect_split_name_context(bulk_fields)
-        name_structure = self._detect_name_field_structure(bulk_fields)
-        logger.info(f"分割氏名欄検出結果: split_like={split_like}, name_structure={name_structure}")
-        needed_keys = [k for k in FILLABLE_KEYS if k in data]
-        if "furigana" in data:
-            for k in ("kanaSei", "kanaMei"):
-                if k not in needed_keys:
-                    needed_keys.append(k)
-        
-        # 分割フリガナフィールドが存在する場合は分割氏名として扱う
-        split_kana_fields = []
-        for f in bulk_fields:
-            field_name = f.get("name", "").lower()
-            # より具体的なパターンで分割フリガナフィールドを検出
-            if re.search(r"name_?sei_?kana|name_?mei_?kana|kana_?sei|kana_?mei|name_mei_kana|name_sei_kana", field_name):
-                split_kana_fields.append(field_name)
-        
-        if split_kana_fields:
-            split_like = True
-            logger.info(f"分割フリガナフィールドを検出: {split_kana_fields}, split_like={split_like}")
-            
-        if not split_like:
-            needed_keys = [k for k in needed_keys if k not in ("first_name", "last_name")]
         used_selectors: set[str] = set()
         reserved_selectors: set[str] = set()
         # プリパスで割当済みのセレクタを使用済みに登録
@@ -1456,56 +1770,12 @@ class FormFiller(FormFillerCore):
             if selector:
                 reserved_selectors.add(selector)
 
-        def reserve(f: Dict[str, Any], key: str):
-            sel = f.get("selector")
-            if not sel or sel in used_selectors:
-                return False
-            used_selectors.add(sel)
-            _mark_reserved(sel)
-            element_map[key] = (page, sel)
-            return True
-
-        # 氏名欄構造に基づいて優先順位を動的に決定
-        if name_structure == "split":
-            # 分割氏名の場合：first_name, last_name を優先
-            priority_first = [k for k in ["email", "email_confirm", "phone", "website", "first_name", "last_name"] if k in needed_keys]
-        elif name_structure == "single":
-            # 単一氏名の場合：name を優先
-            priority_first = [k for k in ["email", "email_confirm", "phone", "website", "name"] if k in needed_keys]
-        else:
-            # 不明な場合：従来通り
-            priority_first = [k for k in ["email", "email_confirm", "phone", "website", "name"] if k in needed_keys]
-        
-        rest_keys = [k for k in needed_keys if k not in priority_first]
-        cascade_order = [*priority_first, *rest_keys]
-
-        for key in cascade_order:
-            if key in element_map:
-                continue
-            target = self._match_cascade_for_key(
-                key,
-                [f for f in bulk_fields if f.get("selector") not in used_selectors]
-            )
-            if target:
-                reserve(target, key)
-
-        # 型ベースの救済
-        def _find_by_type(fields: List[Dict[str, Any]], tval: str) -> Optional[Dict[str, Any]]:
-            for f in fields:
-                if f.get("selector") in used_selectors:
-                    continue
-                if (f.get("type") or "").lower() == tval:
-                    return f
-            return None
-        if "website" in needed_keys and "website" not in element_map:
-            t = _find_by_type(bulk_fields, "url")
-            if t: reserve(t, "website")
-        if "email" in needed_keys and "email" not in element_map:
-            t = _find_by_type(bulk_fields, "email")
-            if t: reserve(t, "email")
-        if "phone" in needed_keys and "phone" not in element_map:
-            t = _find_by_type(bulk_fields, "tel")
-            if t: reserve(t, "phone")
+        assigned, needed_keys, split_like = self._cascade_assign(
+            bulk_fields, data, skip_keys=set(element_map), used_selectors=used_selectors, trace=trace
+        )
+        for key, f in assigned.items():
+            element_map[key] = (page, f["selector"])
+            _mark_reserved(f["selector"])
 
         # 2.5) ヒント抽出（旧実装互換）
         hinted_keys: set[str] = set()
@@ -1517,29 +1787,37 @@ class FormFiller(FormFillerCore):
                 k_auto = self._auto_key_by_type_ac(f)
                 if k_auto in needed_keys:
                     hinted_keys.add(k_auto)
-                for k in needed_keys:
-                    try:
-                        candidates = CANDIDATES.get(k, [])
-                        for pattern in candidates:
-                            if re.search(pattern, tb):
-                                hinted_keys.add(k); break
-                    except Exception:
-                        continue
+                hinted_keys.update(k for k in self.lexicon.scan(tb) if k in needed_keys)
         except Exception:
             hinted_keys = set(needed_keys)
 
         # 3) フォールバック（find_best_field_match）
-        html = await page.content()
-        soup = BeautifulSoup(html, "html.parser")
+        t_fallback = time.perf_counter()
+        # ページ全体の HTML 直列化＋解析は重い（大きなページで数百 ms）ので、学習モードで必要になった時だけ行う
+        soup: Optional[BeautifulSoup] = None
 
-        # subject=corp_sub の特例
+        async def _page_soup() -> BeautifulSoup:
+            nonlocal soup
+            if soup is None:
+                soup = BeautifulSoup(await page.content(), "html.parser")
+            return soup
+
+        # subject=corp_sub の特例（一括抽出の結果から引き、抽出できなかった時だけページに1回問い合わせる）
         if "subject" in data and "subject" not in element_map:
             try:
-                corp_sub_el = soup.find("input", attrs={"name": "corp_sub"})
-                if corp_sub_el:
-                    sel = selector_for(corp_sub_el)
+                sel = next(
+                    (f.get("selector") for f in all_fields
+                     if (f.get("tag") or "").lower() == "input" and f.get("name") == "corp_sub" and f.get("selector")),
+                    None,
+                )
+                if sel is None and not all_fields:
+                    corp_sub_el = await page.query_selector('input[name="corp_sub"]')
+                    if corp_sub_el:
+                        sel = await selector_for_locator(corp_sub_el)
+                if sel:
                     element_map["subject"] = (None, sel)
                     _mark_reserved(sel)
+                    trace.record("subject", "fallback", detail=["name=corp_sub"])
                     logger.info("subjectフィールド（corp_sub）を直接マッピングしました")
             except Exception as e:
                 logger.debug(f"subjectフィールド（corp_sub）直接マッピングエラー: {e}")
@@ -1557,9 +1835,10 @@ class FormFiller(FormFillerCore):
                     else:
                         element_map[key] = fr_sel
                         _mark_reserved(sel)
-                if not fr_sel:
+                        trace.adopt(key)
+                if not fr_sel and getattr(self, "learn", False):
                     try:
-                        await self._record_learning_signal(page, soup, key)
+                        await self._record_learning_signal(page, await _page_soup(), key)
                     except Exception:
                         pass
 
@@ -1573,12 +1852,14 @@ class FormFiller(FormFillerCore):
                 if sel not in reserved_selectors:
                     element_map["company"] = fr_sel
                     _mark_reserved(sel)
+                    trace.adopt("company")
         if need_company and "company" not in element_map:
             try:
                 el = await page.query_selector('input[name="company_name"], input[name*="company" i]')
                 if el:
                     sel = await selector_for_locator(el)
                     element_map["company"] = (page, sel)
+                    trace.record("company", "fallback", detail=["pin-rescue"])
                     logger.info("pin-rescue: company <- input[name*=company]")
             except Exception:
                 pass
@@ -1592,6 +1873,7 @@ class FormFiller(FormFillerCore):
                     if elh:
                         sel = await selector_for_locator(elh)
                         element_map["website"] = (page, sel)
+                        trace.record("website", "fallback", detail=["type=url"])
             except Exception:
                 pass
         if "email" in data and "email" not in element_map:
@@ -1602,6 +1884,7 @@ class FormFiller(FormFillerCore):
                     if elh:
                         sel = await selector_for_locator(elh)
                         element_map["email"] = (page, sel)
+                        trace.record("email", "fallback", detail=["type=email"])
             except Exception:
                 pass
         if "phone" in data and "phone" not in element_map:
@@ -1612,9 +1895,12 @@ class FormFiller(FormFillerCore):
                     if elh:
                         sel = await selector_for_locator(elh)
                         element_map["phone"] = (page, sel)
+                        trace.record("phone", "fallback", detail=["type=tel"])
             except Exception:
                 pass
 
+        trace.add_time("fallback", _ms(t_fallback))
+
         # 最終安全策：単一氏名欄なら name を優先
         if not split_like and "name" in element_map:
             for k in ("first_name", "last_name"):
@@ -1632,7 +1918,166 @@ class FormFiller(FormFillerCore):
                 if k in element_map and element_map[k][1] == name_sel:
                     del element_map[k]
 
-        # フリガナの分割反映
+        if fingerprint is not None:
+            self.mapping_cache.put(fingerprint, await self._mapping_to_cache_entries(page, element_map))
+
+        self._apply_furigana_split(element_map, data)
+        trace.derive(element_map, "post-process")
+        return element_map
+
+    async def _batch_fill(
+        self,
+        page: Page,
+        element_map: Dict[str, Tuple[Optional[Any], str]],
+        data: Dict[str, Any],
+        keys: List[str],
+    ) -> Tuple[set[str], Any]:
+        """
+        --batch-fill: マッピング済みの値をフレームごとに1回の evaluate で入力する（batch_fill.apply_fill_ops）。
+        戻り値: (入力できたキー, 最初に入力した欄を含むフォームの ElementHandle)。残りは従来経路で入力する。
+        """
+        inquiry_content = data.get('inquiry_template', DEFAULT_INQUIRY_TEXT)
+        groups: Dict[int, Tuple[Any, List[FillOp]]] = {}
+        for key in keys:
+            # phone は分割欄への分配（_fill_phone_group）があるため従来経路
+            if key not in data or key not in element_map or key == "phone":
+                continue
+            fr, selector = element_map[key]
+            base = fr or page
+            value = data[key]
+            if key == "website":
+                value = value or data.get("company_url")
+                if value and not re.match(r"^https?://", value, re.I):
+                    value = "https://" + value
+            op = FillOp(
+                key,
+                selector,
+                "" if value is None else str(value),
+                checked=bool(value),
+                textarea_value=inquiry_content,
+            )
+            groups.setdefault(id(base), (base, []))[1].append(op)
+
+        scope_css = getattr(self, "_corp_scope_selector", None)
+        done: set[str] = set()
+        first: Optional[Tuple[int, Any, str]] = None
+        angular = False
+        for base, ops in groups.values():
+            for op, out in zip(ops, await apply_fill_ops(base, ops, scope_css)):
+                if logger.isEnabledFor(logging.DEBUG) or self.debug:
+                    logger.debug(f"[batch-fill] '{op.key}' → selector={op.selector} tag={out.tag} type={out.input_type} ok={out.ok} {out.reason}")
+                if not out.ok:
+                    if out.reason in ("out-of-scope", "personal"):
+                        logger.warning(f"[SCOPED-BLOCK] {out.reason} key='{op.key}' selector={op.selector}")
+                        done.add(op.key)  # 従来経路でも入力しない欄
+                    continue
+                done.add(op.key)
+                angular = angular or out.angular
+                logger.info(f"フィールド '{op.key}' に '{data[op.key]}' を入力")
+                order = keys.index(op.key)
+                if first is None or order < first[0]:
+                    first = (order, base, op.selector)
+        if angular:
+            await page.wait_for_timeout(500 if not self.fast_mode else 50)
+
+        form_handle = None
+        if first is not None:
+            _, base, selector = first
+            try:
+                _tmp = await base.evaluate_handle(
+                    """sel => {
+                        const el = document.querySelector(sel);
+                        return el && (el.closest('form')
+                            || el.closest('[role="form"]')
+                            || el.closest('.wpcf7-form')
+                            || el.closest('[class*="form"]')
+                            || document);
+                    }""",
+                    selector,
+                )
+                form_handle = _tmp.as_element()
+            except Exception:
+                form_handle = None
+        return done, form_handle
+
+    def _mapping_event(
+        self,
+        page: Optional[Page],
+        element_map: Dict[str, Any],
+        trace: Optional[MappingTrace] = None,
+    ) -> Dict[str, Any]:
+        """--emit-json の mapping イベント。段ごとの所要時間（stages, ms）も併せて出す
+
+        trace を渡さなければ page のマッピング記録を使う（HTTP 高速経路はページを持たないため trace を渡す）。
+        """
+        if trace is None:
+            try:
+                trace = self._traces.get(page)
+            except TypeError:
+                trace = None
+        trace = trace or MappingTrace()
+        mapping = []
+        for key, val in element_map.items():
+            _, selector = val if isinstance(val, tuple) else (None, val)
+            decision = trace.decisions.get(key)
+            entry: Dict[str, Any] = {"key": key, "selector": selector}
+            entry.update(decision.to_json() if decision is not None else {"stage": "unknown"})
+            mapping.append(entry)
+        return {
+            "event": "mapping",
+            "mapping": mapping,
+            "stages": {k: round(v, 3) for k, v in trace.stage_ms.items()},
+        }
+
+    @staticmethod
+    def _frame_for_url(page: Page, frame_url: str) -> Any:
+        """frameUrl からフレームを引く（メインフレーム・不明なら page）"""
+        if not frame_url or frame_url == getattr(page, "url", None):
+            return page
+        main_frame = getattr(page, "main_frame", None)
+        for fr in getattr(page, "frames", None) or []:
+            if fr is not main_frame and getattr(fr, "url", None) == frame_url:
+                return fr
+        return page
+
+    async def _click_framework_submit(self, page: Page, framework: FrameworkMatch) -> bool:
+        """検出したフレームワークの送信ボタンを押す（見つからなければ False で汎用探索へ）"""
+        base = self._frame_for_url(page, framework.frame_url)
+        for sel in framework.scoped_submit_selectors():
+            try:
+                loc = base.locator(sel).first
+                if not await loc.count() or not await loc.is_visible():
+                    continue
+                if self.no_submit:
+                    logger.info("テストモード: 送信ボタンを押さずにスキップ")
+                    self._clicked_submit_selector = f"framework:{framework.name}:{sel} (SKIPPED)"
+                else:
+                    await loc.click(timeout=3000)
+                    self._clicked_submit_selector = f"framework:{framework.name}:{sel}"
+                return True
+            except Exception as e:
+                if logger.isEnabledFor(logging.DEBUG) or self.debug:
+                    logger.debug(f"[送信ボタン:framework] selector={sel} error={e}")
+        return False
+
+    async def _framework_success(self, page: Page, framework: FrameworkMatch) -> bool:
+        """フレームワーク固有の成功表示（例: .wpcf7-mail-sent-ok）が出るかを待つ"""
+        if not framework.success_selectors:
+            return False
+        base = self._frame_for_url(page, framework.frame_url)
+        try:
+            await base.wait_for_selector(
+                ", ".join(framework.success_selectors),
+                state="visible",
+                timeout=2000 if self.fast_mode else 5000,
+            )
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _apply_furigana_split(element_map: Dict[str, Tuple[Optional[Any], str]], data: Dict[str, Any]) -> None:
+        """フリガナの分割反映（kanaSei/kanaMei が両方あれば furigana 欄は使わない）"""
         if "furigana" in data:
             last_kana, first_kana = split_name(data["furigana"])
             kana_sei_mapped = "kanaSei" in element_map
@@ -1644,8 +2089,84 @@ class FormFiller(FormFillerCore):
             if kana_sei_mapped and kana_mei_mapped:
                 element_map.pop("furigana", None)
 
+    @staticmethod
+    async def _field_metas(page: Page, element_map: Dict[str, Tuple[Optional[Any], str]]) -> Dict[str, Optional[Dict[str, str]]]:
+        """element_map の各要素の tag/name/type をフレームごとに1回の fieldMetas で取る（key → meta / None）"""
+        by_frame: Dict[int, Tuple[Any, List[str]]] = {}
+        for key, (frame, _sel) in element_map.items():
+            base = frame or page
+            by_frame.setdefault(id(base), (base, []))[1].append(key)
+        metas: Dict[str, Optional[Dict[str, str]]] = {}
+        for base, keys in by_frame.values():
+            try:
+                res = await ff_call(base, "fieldMetas", [element_map[k][1] for k in keys])
+            except Exception:
+                res = None
+            if not isinstance(res, list) or len(res) != len(keys):
+                res = [None] * len(keys)
+            metas.update(zip(keys, res))
+        return metas
+
+    async def _mapping_to_cache_entries(
+        self, page: Page, element_map: Dict[str, Tuple[Optional[Any], str]]
+    ) -> List[Tuple[str, Optional[str], str, Dict[str, str]]]:
+        """element_map をキャッシュ保存用の (key, frame参照, selector, 要素の tag/name/type) 列に変換"""
+        entries: List[Tuple[str, Optional[str], str, Dict[str, str]]] = []
+        main_frame = getattr(page, "main_frame", None)
+        normalized = {
+            k: (v if isinstance(v, tuple) else (None, v)) for k, v in element_map.items()
+        }
+        normalized = {k: v for k, v in normalized.items() if v[1]}
+        metas = await self._field_metas(page, normalized)
+        for key, (frame, selector) in normalized.items():
+            meta = metas.get(key)
+            if not isinstance(meta, dict):
+                return []  # 要素を確かめられないマッピングは保存しない（命中時に照合できないため）
+            if frame is None:
+                ref = None
+            elif frame is page or frame is main_frame:
+                ref = ""
+            else:
+                ref = getattr(frame, "url", None) or ""
+                if not ref:
+                    return []  # 参照できない iframe を含むマッピングは保存しない
+            entries.append((key, ref, selector, meta))
+        return entries
+
+    @staticmethod
+    def _mapping_from_cache_entries(
+        page: Page, entries: Optional[List[Tuple[str, Optional[str], str, Dict[str, str]]]]
+    ) -> Optional[Dict[str, Tuple[Optional[Any], str]]]:
+        """キャッシュの (key, frame参照, selector, meta) 列を element_map に戻す。iframe が見つからなければ None"""
+        if not entries:
+            return None
+        frames_by_url = {getattr(fr, "url", ""): fr for fr in (getattr(page, "frames", None) or [])}
+        element_map: Dict[str, Tuple[Optional[Any], str]] = {}
+        for key, ref, selector, _meta in entries:
+            if ref is None:
+                element_map[key] = (None, selector)
+            elif ref == "":
+                element_map[key] = (page, selector)
+            elif ref in frames_by_url:
+                element_map[key] = (frames_by_url[ref], selector)
+            else:
+                return None
         return element_map
 
+    async def _cached_mapping_still_matches(
+        self, page: Page, element_map: Dict[str, Tuple[Optional[Any], str]],
+        entries: List[Tuple[str, Optional[str], str, Dict[str, str]]],
+    ) -> bool:
+        """キャッシュの各セレクタが、保存時と同じ tag/name/type の要素を指しているか"""
+        metas = await self._field_metas(page, element_map)
+        for key, _ref, _selector, expected in entries:
+            actual = metas.get(key)
+            if not isinstance(actual, dict):
+                return False
+            if any((actual.get(f) or "") != (expected.get(f) or "") for f in ("tag", "name", "type")):
+                return False
+        return True
+
     # =========================
     # 分割型・電話欄の自動分配
     # =========================
@@ -1764,8 +2285,9 @@ class FormFiller(FormFillerCore):
         """フォーム入力（CSSセレクタ使用）"""
         try:
             # Auto select common selects (prefecture/inquiry/position) before mapping
+            _auto_logs: List[Dict[str, Any]] = []
             try:
-                _auto_logs = await auto_select_all(page, data)
+                _auto_logs = await auto_select_all(page, data, classifier=self.url_classifier)
                 if getattr(self, "debug", False) and _auto_logs:
                     logger.debug("[auto-select] " + "; ".join([f"{x['type']} -> {x['chosen_label']}" for x in _auto_logs]))
             except Exception:
@@ -1774,32 +2296,28 @@ class FormFiller(FormFillerCore):
 
             # === Re-assert auto-select after generic field filling ===
             # Some sites or subsequent routines may override select values.
-            # Run auto_select_all again to ensure prefecture/inquiry/position stay as intended.
+            # Re-select only the prefecture/inquiry/position selects whose value no longer matches.
             try:
-                _auto_logs2 = await auto_select_all(page, data)
+                _auto_logs2 = await reassert_selects(page, data, _auto_logs, classifier=self.url_classifier)
                 if getattr(self, "debug", False) and _auto_logs2:
                     logger.debug("[auto-select:reassert] " + "; ".join([f"{x['type']} -> {x['chosen_label']}" for x in _auto_logs2]))
             except Exception:
                 pass
-            for k, v in list(element_map.items()):
-                if isinstance(v, str):
-                    element_map[k] = (None, v)
+            normalized = [k for k, v in element_map.items() if isinstance(v, str)]
+            for k in normalized:
+                element_map[k] = (None, element_map[k])
+            if normalized:
+                try:
+                    trace = self._traces.get(page)
+                except TypeError:
+                    trace = None
+                if trace is not None:
+                    trace.derive(normalized, "selector-only")
 
-            # マッピングの可視化（--emit-json 時）：key と selector をJSONで1行出力
+            # マッピングの可視化（--emit-json 時）：key / selector と、決めた段・スコア・次点との差・所要時間
             if getattr(self, "emit_json", False):
                 try:
-                    mapping = []
-                    for key, val in element_map.items():
-                        frame, selector = val if isinstance(val, tuple) else (None, val)
-                        mapping.append({
-                            "key": key,
-                            "selector": selector,
-                            # method や confidence を持っていない実装のため省略（拡張余地）
-                        })
-                    print(json.dumps({
-                        "event": "mapping",
-                        "mapping": mapping,
-                    }), flush=True)
+                    print(json.dumps(self._mapping_event(page, element_map)), flush=True)
                 except Exception:
                     # 可視化が失敗しても本処理は続行
                     pass
@@ -1849,9 +2367,15 @@ class FormFiller(FormFillerCore):
             if ("email" in element_map) and ("email_confirm" in element_map) and ("email" in data):
                 data["email_confirm"] = data.get("email_confirm") or data["email"]
 
-            keys_primary = [k for k in PRIORITY_KEYS if k in FILLABLE_KEYS]
-            keys_rest = [k for k in FILLABLE_KEYS if k not in keys_primary]
-            for key in [*keys_primary, *keys_rest]:
+            keys_primary = [k for k in PRIORITY_KEYS if k in self.fillable_keys]
+            keys_rest = [k for k in self.fillable_keys if k not in keys_primary]
+            fill_order = [*keys_primary, *keys_rest]
+            batched: set[str] = set()
+            if self.batch_fill and not (self.show_browser and self.demo_ms):
+                batched, active_form_handle = await self._batch_fill(page, element_map, data, fill_order)
+            for key in fill_order:
+                if key in batched:
+                    continue
                 if key in data and key in element_map:
                     fr, selector = element_map[key]
                     value = data[key]
@@ -1918,7 +2442,7 @@ class FormFiller(FormFillerCore):
                                 await locator.select_option(value=str(value))
                         elif tag_name == 'textarea':
                             # textareaは既定でお問い合わせ内容（既存方針：あなた側で解決済み）
-                            inquiry_content = data.get('inquiry_template', "お問い合わせありがとうございます。\n\n製品・サービスについて詳しく知りたいです。\n\n具体的には以下の点について教えていただけますでしょうか：\n・料金体系\n・導入事例\n・サポート体制\n\nよろしくお願いいたします。")
+                            inquiry_content = data.get('inquiry_template', DEFAULT_INQUIRY_TEXT)
                             try:
                                 ng_model = await locator.get_attribute('data-ng-model')
                                 if ng_model:
@@ -2095,7 +2619,7 @@ class FormFiller(FormFillerCore):
                         inquiry_content = (
                             data.get('inquiry_template')
                             or data.get('message')
-                            or "お問い合わせありがとうございます。内容を確認の上、ご連絡いたします。"
+                            or FALLBACK_INQUIRY_TEXT
                         )
                         try:
                             await ta.fill(inquiry_content)
@@ -2112,7 +2636,7 @@ class FormFiller(FormFillerCore):
                     inquiry_content = (
                         data.get('inquiry_template')
                         or data.get('message')
-                        or "お問い合わせありがとうございます。内容を確認の上、ご連絡いたします。"
+                        or FALLBACK_INQUIRY_TEXT
                     )
                     try:
                         await fallback_fill_textarea(page, inquiry_content, dry_run=self.dry_run, scope_selector=scope_css)
@@ -2122,7 +2646,7 @@ class FormFiller(FormFillerCore):
             except Exception:
                 pass
 
-            unmapped = [k for k in FILLABLE_KEYS if k in data and k not in element_map]
+            unmapped = [k for k in self.fillable_keys if k in data and k not in element_map]
             if unmapped:
                 logger.warning("unmapped: %s", ",".join(unmapped))
             return True, active_form_handle, unmapped
@@ -2250,103 +2774,32 @@ class FormFiller(FormFillerCore):
             logger.error(f"CAPTCHA処理エラー: {e}")
             return False
 
-    async def check_success(self, page: Page, original_url: str) -> Tuple[bool, str]:
-        """送信成功判定（URL/POST/文言/フォームリセットを総合判定）"""
+    async def check_success(self, page: Page, original_url: str, form: Optional[Any] = None) -> Tuple[bool, str]:
+        """送信成功判定（URL/POST/文言/フォームリセット/フレームワーク表示を並行に待ち、最初の決着で返す）
+
+        form は送信したフォームの要素。フォームリセットの判定をそのフォームに限る。
+        """
         try:
             current_url = page.url
-            if current_url != original_url:
-                if any(k in current_url.lower() for k in ['/thanks', '/complete', '/success', '/thank', 'done', 'sent']):
-                    return True, "url_change"
-
-            posted = False
-            try:
-                await page.wait_for_function(
-                    "window.location.href !== args[0]",
-                    arg=original_url,
-                    timeout=1500,
-                )
-                posted = True
-            except Exception:
-                posted = False
-
-            if not posted:
-                def _any_post(resp):
-                    try:
-                        return resp.request.method in ('POST','PUT')
-                    except Exception:
-                        return False
-                try:
-                    await page.wait_for_response(_any_post, timeout=3000)
-                    posted = True
-                except Exception:
-                    posted = False
-
-            phrases = [
-                'お問い合わせありがとうございました', '送信が完了', '送信完了', '送信されました',
-                'お問い合わせを受け付けました', '送信ありがとうございます', '受け付けました',
-                '受付完了', 'ありがとうございました'
-            ]
-            for ph in phrases:
-                try:
-                    loc = page.get_by_text(ph, exact=False).first
-                    if await loc.is_visible():
-                        note = f"visible_phrase:{ph}"
-                        if posted:
-                            note += "|post_detected"
-                        return True, note
-                except Exception:
-                    pass
-
-            try:
-                keywords = ['contact', 'inquiry', 'form', 'wpcf7', 'submit', 'send', 'mail']
-                def _form_post(resp):
-                    try:
-                        if resp.request.method not in ('POST','PUT'):
-                            return False
-                        return any(k in resp.url.lower() for k in keywords)
-                    except Exception:
-                        return False
-
-                response = await page.wait_for_response(_form_post, timeout=2000)
-                if response and response.ok:
-                    ctype = (response.headers.get('content-type') or '').lower()
-                    if 'application/json' in ctype:
-                        try:
-                            data = await response.json()
-                            if isinstance(data, dict) and (data.get('success') or data.get('status') in ('success', 'ok', 'sent', True)):
-                                return True, f"post_json_success:{response.url}"
-                            if any(k in json.dumps(data).lower() for k in ['ok', 'sent', 'thank', 'ありがとうございます']):
-                                return True, f"post_json_heuristic:{response.url}"
-                        except Exception:
-                            pass
-                    else:
-                        try:
-                            txt = (await response.text()).lower()
-                            if any(k in txt for k in ['ありがとうございます', '送信', '完了']):
-                                return True, f"post_text_success:{response.url}"
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-
-            try:
-                cleared = await page.evaluate("""() => {
-                    const f = document.querySelector('form');
-                    if (!f) return false;
-                    const fields = Array.from(f.querySelectorAll('input[type=text], input[type=email], textarea'));
-                    if (fields.length === 0) return false;
-                    const emptyRate = fields.filter(x => !x.value || x.value.trim() === '').length / fields.length;
-                    return emptyRate >= 0.7;
-                }""")
-                if cleared:
-                    return True, "fields_cleared"
-            except Exception:
-                pass
-
-            note = "no_success_indicator"
-            if not posted:
-                note += "|no_post_detected"
-            return False, note
+            if current_url != original_url and is_thanks_url(current_url):
+                return True, "url_change"
+
+            extra = []
+            framework = self._frameworks.get(page)
+            if framework is not None and framework.success_selectors:
+                async def framework_success() -> Optional[Tuple[bool, str]]:
+                    if await self._framework_success(page, framework):
+                        return True, f"framework_success:{framework.name}"
+                    return None
+                extra.append(framework_success)
+
+            return await race_success(
+                page,
+                original_url,
+                deadline=SUCCESS_DEADLINE_FAST if self.fast_mode else SUCCESS_DEADLINE,
+                extra=extra,
+                form=form,
+            )
 
         except Exception as e:
             logger.error(f"成功判定エラー: {e}")
@@ -2355,75 +2808,17 @@ class FormFiller(FormFillerCore):
     async def process_form(self, task: FormTask) -> FormResult:
         """フォーム処理"""
         async with self.global_limiter, self._domain_limiter(task.form_url):
+            # 静的フォームなら HTTP だけで完了（処理できなければ None → ブラウザ経路）
+            if self._http_fast is not None:
+                result = await self._http_fast.try_process(task)
+                if result is not None:
+                    return result
             try:
-                async with async_playwright() as p:
-                    browser = await p.chromium.launch(
-                        headless=not self.show_browser,
-                        args=[
-                            '--no-sandbox',
-                            '--disable-dev-shm-usage',
-                            '--disable-gpu',
-                            '--disable-web-security',
-                            '--disable-features=VizDisplayCompositor'
-                        ]
-                    )
-
-                    # Service Worker無効化とセキュリティ制限バイパスで高速化
-                    # ブラウザウィンドウサイズ設定（より見やすいサイズに調整）
-                    if self.show_browser:
-                        # 環境変数でサイズ指定可能
-                        import os
-                        custom_width = os.getenv('BROWSER_WIDTH')
-                        custom_height = os.getenv('BROWSER_HEIGHT')
-                        
-                        if custom_width and custom_height:
-                            viewport_width = int(custom_width)
-                            viewport_height = int(custom_height)
-                        else:
-                            # デフォルトサイズ（ノートPCに適したサイズ）
-                            viewport_width = 1366
-                            viewport_height = 768
-                    else:
-                        # headlessモードでは大きなサイズ
-                        viewport_width = 1920
-                        viewport_height = 1080
-                    
-                    context = await browser.new_context(
-                        viewport={'width': viewport_width, 'height': viewport_height},
-                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        service_workers="block",  # Service Workerを無効化して高速化
-                        bypass_csp=True,  # Content Security Policyをバイパス
-                        ignore_https_errors=True  # HTTPS証明書エラーを無視
-                    )
-                    # 高速化モードではタイムアウトを短縮
-                    timeout_ms = (self.timeout // 2) * 1000 if self.fast_mode else self.timeout * 1000
-                    context.set_default_timeout(timeout_ms)
-
-                    async def _smart_block(route):
-                        r = route.request
-                        url = r.url
-                        rtype = r.resource_type
-                        
-                        # フォーム機能に必要なドメインは必ず許可
-                        if is_form_helper(url):
-                            await route.continue_()
-                            return
-                        
-                        # 広告・解析系ドメインはブロック
-                        if is_ad_or_analytics(url):
-                            await route.abort()
-                            return
-                        
-                        # 既存のブロック条件（image, font, media）
-                        if rtype in ("image", "font", "media"):
-                            await route.abort()
-                            return
-                        
-                        # その他は許可
-                        await route.continue_()
-                    await context.route("**/*", _smart_block)
+                async with self._open_context() as context:
+                    timeout_ms = self._timeout_ms()
 
                     page = await context.new_page()
+                    await self._blocker.attach(page)
                     
                     # ブラウザウィンドウの位置を調整（画面中央に配置）
                     if self.show_browser:
@@ -2450,7 +2845,6 @@ class FormFiller(FormFillerCore):
 
                     fill_result, active_form_handle, unmapped = await self.fill_form(page, task.data)
                     if not fill_result:
-                        await browser.close()
                         return FormResult(
                             form_url=task.form_url,
                             status="ERROR",
@@ -2459,26 +2853,33 @@ class FormFiller(FormFillerCore):
                             unmapped_fields=','.join(unmapped) if unmapped else ''
                         )
 
-                    # 問い合わせ種別などのチェックボックス（同意以外）を最低1つON
+                    # チェックボックス/ラジオ/select の確定（任意チェック1つ・同意・未選択ラジオ群・select の2番目）を
+                    # フレームごとに1回のスナップショットと1回の適用で行う。スナップショットが取れなければ従来の4段へ
                     try:
-                        await try_check_any_non_consent_checkbox(page, logger=logger, debug=self.debug)
+                        resolved = await resolve_form_controls(page, active_form_handle, logger=logger, debug=self.debug)
                     except Exception:
-                        pass
-                    # 同意系チェックボックス/ラジオもON（送信に必須な場合が多い）
-                    try:
-                        await ensure_acceptance(page, logger=logger, debug=self.debug)
-                    except Exception:
-                        pass
-                    # 必須ラジオグループが未選択なら安全側で確定
-                    try:
-                        await ensure_required_radio_groups(page, logger=logger)
-                    except Exception:
-                        pass
+                        resolved = None
+                    if resolved is None:
+                        # 問い合わせ種別などのチェックボックス（同意以外）を最低1つON
+                        try:
+                            await try_check_any_non_consent_checkbox(page, logger=logger, debug=self.debug)
+                        except Exception:
+                            pass
+                        # 同意系チェックボックス/ラジオもON（送信に必須な場合が多い）
+                        try:
+                            await ensure_acceptance(page, logger=logger, debug=self.debug)
+                        except Exception:
+                            pass
+                        # 必須ラジオグループが未選択なら安全側で確定
+                        try:
+                            await ensure_required_radio_groups(page, logger=logger)
+                        except Exception:
+                            pass
 
-                    try:
-                        await choose_second_option_in_form(page, active_form_handle, logger=logger)
-                    except Exception:
-                        pass
+                        try:
+                            await choose_second_option_in_form(page, active_form_handle, logger=logger)
+                        except Exception:
+                            pass
 
                     # バリデーションエラーチェック・リトライ（無効化）
                     # try:
@@ -2498,7 +2899,6 @@ class FormFiller(FormFillerCore):
                     if captcha_type:
                         logger.info(f"CAPTCHA検出: {captcha_type}")
                         if not await self.handle_captcha(page, captcha_type, captcha_info):
-                            await browser.close()
                             return FormResult(
                                 form_url=task.form_url,
                                 status="CAPTCHA_FAIL",
@@ -2507,7 +2907,6 @@ class FormFiller(FormFillerCore):
                             )
 
                     if self.dry_run:
-                        await browser.close()
                         return FormResult(
                             form_url=task.form_url,
                             status="DRY_RUN",
@@ -2525,6 +2924,12 @@ class FormFiller(FormFillerCore):
                     except Exception:
                         base = page
 
+                    # 0) 検出済みフレームワークの送信ボタン
+                    framework = self._frameworks.get(page)
+                    if framework is not None and await self._click_framework_submit(page, framework):
+                        submitted = True
+                        await page.wait_for_timeout(300)
+
                     # 1) roleベース（最優先）- ナビゲーションリンクを除外
                     role_patterns = [
                         r"送信(する)?", r"送る", r"確認(する)?", r"同意して送信", r"申し込", r"お問い合わせ(する)?",
@@ -2839,9 +3244,7 @@ class FormFiller(FormFillerCore):
                                         pass
                             except Exception as e:
                                 logger.debug(f"[送信ボタン] デバッグ情報取得エラー: {e}")
-                    success, note = await self.check_success(page, task.form_url)
-
-                    await browser.close()
+                    success, note = await self.check_success(page, task.form_url, active_form_handle)
 
                     if success:
                         return FormResult(
@@ -2879,11 +3282,13 @@ class FormFiller(FormFillerCore):
                     unmapped_fields=','.join(unmapped) if unmapped else ''
                 )
 
-    async def save_result(self, result: FormResult, output_file: str):
+    async def save_result(self, result: FormResult, output_file: Optional[str]):
         try:
-            async with self._file_lock:
-                async with aiofiles.open(output_file, 'a', newline='', encoding='utf-8') as f:
-                    await f.write(f'{result.form_url},{result.status},"{result.note}",{result.timestamp},"{result.unmapped_fields}"\n')
+            # 分割実行の子プロセスでは親がまとめて書き出すため、ここでは収集のみ
+            if output_file:
+                async with self._file_lock:
+                    async with aiofiles.open(output_file, 'a', newline='', encoding='utf-8') as f:
+                        await f.write(result.to_csv_line())
             # 進捗イベントを JSON Lines で出力（--emit-json 時）
             if getattr(self, "emit_json", False):
                 try:
@@ -2900,9 +3305,9 @@ class FormFiller(FormFillerCore):
         except Exception as e:
             logger.error(f"結果保存エラー: {e}")
 
-    async def run(self, input_file: str, data_file: str, output_file: str, *, emit_json: bool = False, limit: Optional[int] = None):
-        # emit_json フラグをインスタンスにセット（他メソッドで参照）
-        self.emit_json = bool(emit_json)
+    @staticmethod
+    def load_tasks(input_file: str, data_file: str, limit: Optional[int] = None) -> List[FormTask]:
+        """入力CSVとデフォルトYAMLを読み込み、行データをマージしたタスク一覧を返す"""
         tasks: List[FormTask] = []
         with open(input_file, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
@@ -2917,10 +3322,6 @@ class FormFiller(FormFillerCore):
         with open(data_file, 'r', encoding='utf-8') as f:
             default_data = yaml.safe_load(f) or {}
 
-        async with aiofiles.open(output_file, 'w', newline='', encoding='utf-8') as f:
-            await f.write('form_url,status,note,timestamp,unmapped_fields\n')
-
-        queue: asyncio.Queue[FormTask] = asyncio.Queue()
         for task in tasks:
             row_data = {
                 key: value
@@ -2928,24 +3329,88 @@ class FormFiller(FormFillerCore):
                 if value is not None and (not isinstance(value, str) or value.strip() != "")
             }
             task.data = {**default_data, **row_data}
-            await queue.put(task)
+        return tasks
 
-        workers = []
-        for _ in range(self.concurrency):
-            worker = asyncio.create_task(self._worker(queue, output_file))
-            workers.append(worker)
+    async def run(self, input_file: str, data_file: str, output_file: str, *, emit_json: bool = False, limit: Optional[int] = None):
+        # emit_json フラグをインスタンスにセット（他メソッドで参照）
+        self.emit_json = bool(emit_json)
+        tasks = self.load_tasks(input_file, data_file, limit=limit)
+
+        async with aiofiles.open(output_file, 'w', newline='', encoding='utf-8') as f:
+            await f.write('form_url,status,note,timestamp,unmapped_fields\n')
 
-        await queue.join()
-        for worker in workers:
-            worker.cancel()
-        await asyncio.gather(*workers, return_exceptions=True)
+        await self.run_tasks(tasks, output_file)
         logger.info(f"処理完了: {len(tasks)} 件")
 
+    async def run_tasks(self, tasks: List[FormTask], output_file: Optional[str] = None) -> Dict[int, FormResult]:
+        """
+        タスク群をワーカーで処理し、{入力行index: 結果} を返す。
+        output_file=None のときはファイルへ書かず結果の収集のみ（分割実行の子プロセス用）。
+        """
+        collected: Dict[int, FormResult] = {}
+        self._collected = collected
+        queue: asyncio.Queue[FormTask] = asyncio.Queue()
+        if not self.triage:
+            for task in tasks:
+                await queue.put(task)
+
+        # ブラウザプールは run が所有（Chromium は初回タスクで遅延起動）
+        self._browser_pool = self._new_browser_pool()
+        if self.http_fast:
+            self._http_fast = HttpFastPath(self, timeout=self.timeout)
+        try:
+            workers = []
+            for _ in range(self.concurrency):
+                worker = asyncio.create_task(self._worker(queue, output_file))
+                workers.append(worker)
+
+            if self.triage:
+                # プローブが終わった行から順にキューへ流す（ワーカーは並行して処理開始）
+                await self._triage_into_queue(tasks, queue, output_file)
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            pool, self._browser_pool = self._browser_pool, None
+            await pool.close()
+            http_fast, self._http_fast = self._http_fast, None
+            if http_fast is not None:
+                await http_fast.close()
+            self._collected = None
+        self.url_classifier.log_stats()
+        if self.mapping_cache is not None:
+            self.mapping_cache.log_stats()
+        return collected
+
+    async def _triage_into_queue(self, tasks: List[FormTask], queue: asyncio.Queue, output_file: Optional[str]) -> None:
+        """到達不能・フォームなしの行は即座に結果化し、それ以外だけをブラウザのキューへ入れる"""
+        async with UrlTriage(timeout=min(8.0, float(self.timeout))) as triage:
+            async def _one(task: FormTask) -> None:
+                verdict = await triage.probe(task.form_url)
+                if verdict.viable:
+                    await queue.put(task)
+                    return
+                result = FormResult(
+                    form_url=task.form_url,
+                    status="ERROR",
+                    note=f"triage:{verdict.reason}",
+                    timestamp=datetime.now().isoformat(),
+                )
+                if self._collected is not None:
+                    self._collected[task.index] = result
+                await self.save_result(result, output_file)
+                logger.info(f"タスク {task.index + 1} 完了: {result.status} ({result.note})")
+
+            await asyncio.gather(*(_one(t) for t in tasks))
+
     async def _worker(self, queue: asyncio.Queue, output_file: str):
         while True:
             try:
                 task: FormTask = await queue.get()
                 result = await self.process_form(task)
+                if self._collected is not None:
+                    self._collected[task.index] = result
                 await self.save_result(result, output_file)
                 logger.info(f"タスク {task.index + 1} 完了: {result.status}")
                 queue.task_done()
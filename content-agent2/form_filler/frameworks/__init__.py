@@ -0,0 +1,44 @@
+"""
+フォームフレームワーク検出（Contact Form 7 / Elementor / HubSpot / formrun / MW WP Form）
+
+extract_labels_bulk のスナップショットからフレームワークを判定し、既定の name 規約による
+key → selector、送信ボタン、成功表示のセレクタを返す。新しい検出器は register() で追加する。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from .base import FrameworkDetector, FrameworkMatch
+from .elementor import ElementorDetector
+from .formrun import FormrunDetector
+from .hubspot import HubSpotDetector
+from .mw_wp_form import MwWpFormDetector
+from .wpcf7 import ContactForm7Detector
+
+__all__ = ["FrameworkDetector", "FrameworkMatch", "DETECTORS", "detect_framework", "register"]
+
+# 判定順。name 属性だけで決まるもの（Elementor）より class で決まるものを先に見る
+DETECTORS: List[FrameworkDetector] = [
+    ContactForm7Detector(),
+    MwWpFormDetector(),
+    HubSpotDetector(),
+    FormrunDetector(),
+    ElementorDetector(),
+]
+
+
+def register(detector: FrameworkDetector) -> None:
+    """検出器を追加する（既存より優先）"""
+    DETECTORS.insert(0, detector)
+
+
+def detect_framework(fields: Iterable[Dict[str, Any]], data_keys: Iterable[str]) -> Optional[FrameworkMatch]:
+    """最初に一致したフレームワークの検出結果（なければ None）"""
+    fields = list(fields or [])
+    keys = list(data_keys)
+    for detector in DETECTORS:
+        match = detector.detect(fields, keys)
+        if match is not None:
+            return match
+    return None
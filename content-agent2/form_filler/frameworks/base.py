@@ -0,0 +1,131 @@
+"""
+フォームフレームワーク検出の共通部品
+
+各検出器は extract_labels_bulk のスナップショット（formSelector/formClass/formAction 付き）だけを見て
+フレームワークを判定し、name 属性の既定規約から key → selector を組み立てる。
+送信ボタンと成功表示の規約も併せて返し、汎用の探索を省略できるようにする。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+__all__ = ["FrameworkDetector", "FrameworkMatch", "TEXT_LIKE_TYPES"]
+
+# マッピング対象（＝網羅判定の対象）とする input type。select/checkbox/radio は auto_select/consent が扱う
+TEXT_LIKE_TYPES = frozenset({"", "text", "email", "tel", "url", "number", "search"})
+
+
+@dataclass(slots=True)
+class FrameworkMatch:
+    """検出結果（1フォーム分）"""
+    name: str
+    frame_url: str
+    form_selector: str
+    mapping: Dict[str, str]
+    # フォーム内の入力欄をすべて既知の規約で説明できた場合だけ True（汎用ヒューリスティクスを省略できる）
+    complete: bool
+    submit_selectors: Tuple[str, ...] = ()
+    success_selectors: Tuple[str, ...] = ()
+    unknown_fields: List[str] = field(default_factory=list)
+
+    def scoped_submit_selectors(self) -> List[str]:
+        """フォーム配下に限定した送信ボタンのセレクタ"""
+        if not self.form_selector:
+            return list(self.submit_selectors)
+        return [f"{self.form_selector} {sel}" for sel in self.submit_selectors]
+
+
+class FrameworkDetector:
+    """
+    フレームワーク検出器の基底クラス。
+
+    サブクラスはクラス属性で規約を宣言し、必要なら owns / field_key を上書きする。
+      - form_classes: form（または親要素）の class トークン
+      - action_pattern: form の action に現れる文字列（正規表現）
+      - name_pattern: フィールドの name 属性だけで判別できる場合の正規表現
+      - name_map: key → 既定の name 属性（小文字）
+    """
+
+    name: str = ""
+    form_classes: Tuple[str, ...] = ()
+    action_pattern: Optional[str] = None
+    name_pattern: Optional[str] = None
+    name_map: Dict[str, Tuple[str, ...]] = {}
+    submit_selectors: Tuple[str, ...] = ('button[type="submit"]', 'input[type="submit"]')
+    success_selectors: Tuple[str, ...] = ()
+
+    def __init__(self) -> None:
+        self._action_re = re.compile(self.action_pattern, re.I) if self.action_pattern else None
+        self._name_re = re.compile(self.name_pattern, re.I) if self.name_pattern else None
+        self._by_name: Dict[str, str] = {}
+        for key, names in self.name_map.items():
+            for nm in names:
+                self._by_name.setdefault(nm.lower(), key)
+
+    # ---- 判定 ----
+    def owns(self, f: Dict[str, Any]) -> bool:
+        """フィールドがこのフレームワークのフォームに属するか"""
+        classes = set((f.get("formClass") or "").lower().split())
+        if classes.intersection(self.form_classes):
+            return True
+        if self._action_re is not None and self._action_re.search(f.get("formAction") or ""):
+            return True
+        if self._name_re is not None and self._name_re.search(f.get("name") or ""):
+            return True
+        return False
+
+    def normalize_name(self, name: str) -> str:
+        return (name or "").strip().lower()
+
+    def field_key(self, f: Dict[str, Any]) -> Optional[str]:
+        """フィールドの name 属性を既定規約で key に変換（不明なら None）"""
+        return self._by_name.get(self.normalize_name(f.get("name") or ""))
+
+    # ---- マッピング ----
+    def detect(self, fields: Iterable[Dict[str, Any]], data_keys: Iterable[str]) -> Optional[FrameworkMatch]:
+        owned = [f for f in fields or [] if self.owns(f)]
+        if not owned:
+            return None
+        # 同一ページに複数フォームがある場合は、入力欄が最も多いものを採る
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for f in owned:
+            groups.setdefault((f.get("frameUrl") or "", f.get("formSelector") or ""), []).append(f)
+        (frame_url, form_selector), members = max(
+            groups.items(), key=lambda kv: sum(1 for f in kv[1] if _is_text_like(f) and f.get("visible"))
+        )
+
+        keys = set(data_keys)
+        mapping: Dict[str, str] = {}
+        unknown: List[str] = []
+        for f in members:
+            if not f.get("visible") or not _is_text_like(f):
+                continue
+            key = self.field_key(f)
+            if key is None:
+                unknown.append(f.get("name") or f.get("id") or f.get("selector") or "")
+                continue
+            sel = f.get("selector")
+            if sel and key in keys and key not in mapping:
+                mapping[key] = sel
+        if not mapping:
+            return None
+        return FrameworkMatch(
+            name=self.name,
+            frame_url=frame_url,
+            form_selector=form_selector,
+            mapping=mapping,
+            complete=not unknown,
+            submit_selectors=self.submit_selectors,
+            success_selectors=self.success_selectors,
+            unknown_fields=unknown,
+        )
+
+
+def _is_text_like(f: Dict[str, Any]) -> bool:
+    tag = (f.get("tag") or "").lower()
+    if tag == "textarea":
+        return True
+    return tag == "input" and (f.get("type") or "").lower() in TEXT_LIKE_TYPES
@@ -0,0 +1,34 @@
+"""Elementor Pro フォームウィジェット（name="form_fields[...]"）"""
+
+from __future__ import annotations
+
+import re
+
+from .base import FrameworkDetector
+
+_FIELD_ID = re.compile(r"^form_fields\[([^\]]+)\]$", re.I)
+
+
+class ElementorDetector(FrameworkDetector):
+    name = "elementor"
+    form_classes = ("elementor-form",)
+    name_pattern = r"^form_fields\["
+    # form_fields[<id>] の <id>。既定テンプレートの id と、よく使われる id のみ
+    name_map = {
+        "name": ("name", "fullname"),
+        "last_name": ("last_name", "lastname"),
+        "first_name": ("first_name", "firstname"),
+        "furigana": ("kana", "furigana"),
+        "email": ("email",),
+        "phone": ("tel", "phone"),
+        "company": ("company",),
+        "website": ("url", "website"),
+        "subject": ("subject",),
+        "message": ("message",),
+    }
+    submit_selectors = ('button[type="submit"]',)
+    success_selectors = (".elementor-message-success",)
+
+    def normalize_name(self, name: str) -> str:
+        m = _FIELD_ID.match((name or "").strip())
+        return m.group(1).lower() if m else ""
@@ -0,0 +1,25 @@
+"""formrun（form.run）埋め込みフォーム。name 属性に日本語の項目名をそのまま使う"""
+
+from __future__ import annotations
+
+from .base import FrameworkDetector
+
+
+class FormrunDetector(FrameworkDetector):
+    name = "formrun"
+    form_classes = ("formrun",)
+    action_pattern = r"form\.run/"
+    name_map = {
+        "name": ("お名前", "氏名", "名前", "担当者名"),
+        "furigana": ("フリガナ", "ふりがな", "お名前（フリガナ）"),
+        "email": ("メールアドレス", "メール", "email"),
+        "phone": ("電話番号", "お電話番号", "tel"),
+        "company": ("会社名", "御社名", "貴社名", "企業名"),
+        "department": ("部署名", "部署"),
+        "position": ("役職",),
+        "website": ("url", "ホームページ", "webサイト"),
+        "subject": ("件名",),
+        "message": ("お問い合わせ内容", "お問い合わせ", "問い合わせ内容", "ご質問", "内容"),
+    }
+    submit_selectors = ("[data-formrun-submitting-text]", 'button[type="submit"]', 'input[type="submit"]')
+    success_selectors = ("[data-formrun-show-if-success]",)
@@ -0,0 +1,36 @@
+"""HubSpot 埋め込みフォーム（hs-form）"""
+
+from __future__ import annotations
+
+import re
+
+from .base import FrameworkDetector
+
+# 新しい埋め込みは "0-1/firstname" のようにオブジェクト種別の接頭辞が付く
+_OBJECT_PREFIX = re.compile(r"^\d+-\d+/")
+
+
+class HubSpotDetector(FrameworkDetector):
+    name = "hubspot"
+    form_classes = ("hs-form", "hs-form-private", "hsfc-form")
+    action_pattern = r"forms\.hsforms\.com|hubspot\.com"
+    name_map = {
+        "last_name": ("lastname",),
+        "first_name": ("firstname",),
+        "email": ("email",),
+        "phone": ("phone", "mobilephone"),
+        "company": ("company",),
+        "position": ("jobtitle",),
+        "website": ("website",),
+        "postal_code": ("zip",),
+        "prefecture": ("state",),
+        "city": ("city",),
+        "address": ("address",),
+        "subject": ("subject", "ticket.subject"),
+        "message": ("message", "ticket.content"),
+    }
+    submit_selectors = ('input.hs-button[type="submit"]', 'input[type="submit"]', 'button[type="submit"]')
+    success_selectors = (".submitted-message",)
+
+    def normalize_name(self, name: str) -> str:
+        return _OBJECT_PREFIX.sub("", (name or "").strip()).lower()
@@ -0,0 +1,27 @@
+"""MW WP Form（WordPress）。送信前に確認画面を挟む構成が既定"""
+
+from __future__ import annotations
+
+from .base import FrameworkDetector
+
+
+class MwWpFormDetector(FrameworkDetector):
+    name = "mw_wp_form"
+    form_classes = ("mw_wp_form", "mw_wp_form_input")
+    name_pattern = r"^mw-wp-form-form-(id|verify-token)$"
+    name_map = {
+        "name": ("name", "your-name", "お名前", "氏名"),
+        "furigana": ("kana", "furigana", "フリガナ", "ふりがな"),
+        "email": ("email", "mail", "メールアドレス"),
+        "email_confirm": ("email_confirm", "email-confirm", "mail_confirm", "メールアドレス（確認）"),
+        "phone": ("tel", "phone", "電話番号"),
+        "company": ("company", "会社名"),
+        "department": ("department", "部署名"),
+        "postal_code": ("zip", "postal_code", "郵便番号"),
+        "address": ("address", "住所"),
+        "subject": ("subject", "件名"),
+        "message": ("message", "content", "inquiry", "お問い合わせ内容"),
+    }
+    # 入力画面の「確認」→ 確認画面の「送信」
+    submit_selectors = ('[name="submitConfirm"]', '[name="submit"]', 'input[type="submit"]', 'button[type="submit"]')
+    success_selectors = (".mw_wp_form_complete",)
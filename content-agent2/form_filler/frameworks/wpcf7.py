@@ -0,0 +1,31 @@
+"""Contact Form 7（WordPress）"""
+
+from __future__ import annotations
+
+from .base import FrameworkDetector
+
+
+class ContactForm7Detector(FrameworkDetector):
+    name = "wpcf7"
+    form_classes = ("wpcf7-form", "wpcf7")
+    name_pattern = r"^_wpcf7"
+    name_map = {
+        "name": ("your-name", "name", "fullname"),
+        "last_name": ("your-sei", "your-lastname", "last-name"),
+        "first_name": ("your-mei", "your-firstname", "first-name"),
+        "furigana": ("your-kana", "your-furigana", "kana", "furigana"),
+        "email": ("your-email", "email", "mail"),
+        "email_confirm": ("your-email-confirm", "your-email_confirm", "email-confirm", "your-email2"),
+        "phone": ("your-tel", "your-phone", "tel", "phone"),
+        "company": ("your-company", "company", "company-name"),
+        "department": ("your-department", "department"),
+        "position": ("your-position", "position"),
+        "website": ("your-url", "url", "website"),
+        "postal_code": ("your-zip", "zip", "postal-code"),
+        "address": ("your-address", "address"),
+        "subject": ("your-subject", "subject"),
+        "message": ("your-message", "message", "content"),
+    }
+    submit_selectors = ("input.wpcf7-submit", "button.wpcf7-submit", 'input[type="submit"]', 'button[type="submit"]')
+    # 5.2 以降は form に .sent、旧版は応答欄に .wpcf7-mail-sent-ok が付く
+    success_selectors = ("form.wpcf7-form.sent", ".wpcf7-mail-sent-ok")
@@ -0,0 +1,540 @@
+"""
+ブラウザを使わない HTTP 高速経路（--http-fast）
+
+サーバーレンダリングの静的な <form method=post> を aiohttp で取得・解析し、
+FormFiller の割当エンジン（_cascade_assign のスコア行列）で項目を割り当てて直接 POST する。
+JS 依存のフォーム・CAPTCHA・meta の CSRF トークン・ファイル添付・確認画面付きフォームなど、
+静的に扱えないものは Fallback を送出して Playwright 経路へ回す（POST 前に限る。二重送信はしない）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import json
+import logging
+import re
+from collections import Counter
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin
+
+import aiohttp
+from bs4 import BeautifulSoup, Tag
+
+from .auto_select import _best_pref_match, _get_pref_from_data
+from .constants import DEFAULT_INQUIRY_TEXT, FALLBACK_INQUIRY_TEXT, USER_AGENT
+from .models import FormResult, FormTask, MappingTrace
+from .success import looks_like_success_text
+from .utils import css_escape, split_name, split_phone
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .core import FormFiller
+
+__all__ = ["HttpFastPath", "Fallback", "new_connector", "parse_form_fields", "DEFAULT_HEADERS"]
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS: Dict[str, str] = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "ja,en;q=0.8",
+}
+MAX_HTML_BYTES = 2 * 1024 * 1024
+
+_CAPTCHA_PAT = re.compile(r"(g-recaptcha|grecaptcha|recaptcha/api|h-captcha|hcaptcha\.com|cf-turnstile|challenges\.cloudflare\.com)", re.I)
+_JS_BINDING_ATTRS = re.compile(r"^(ng-model|data-ng-model|v-model|x-model|wire:model|\[\(ngmodel\)\])$", re.I)
+_CONFIRM_STEP_PAT = re.compile(r"(確認|confirm|next|次へ)", re.I)
+_SEND_PAT = re.compile(r"(送信|送る|submit|send)", re.I)
+_CONSENT_PAT = re.compile(r"(同意|承諾|プライバシー|個人情報|利用規約|規約|privacy|consent|agree|policy|terms)", re.I)
+_SUCCESS_URL_PAT = re.compile(r"(thanks|thank-you|thankyou|complete|finish|done|success|kanryo)", re.I)
+_TEXT_TYPES = {"", "text", "email", "tel", "url", "number", "search", "date", "month", "week", "time", "datetime-local", "password"}
+_SKIP_TYPES = {"submit", "button", "image", "reset"}
+
+
+class Fallback(Exception):
+    """静的に処理できないためブラウザ経路へ回す（メッセージは理由）"""
+
+
+def new_connector(limit: int = 100) -> aiohttp.TCPConnector:
+    """タスク間で共有する接続プール（ブラウザ側の ignore_https_errors に合わせ証明書検証なし）"""
+    return aiohttp.TCPConnector(limit=limit, limit_per_host=4, ttl_dns_cache=300, ssl=False)
+
+
+# ========= 解析 =========
+def _text(node: Optional[Tag]) -> str:
+    if node is None:
+        return ""
+    return re.sub(r"\s+", " ", node.get_text(" ", strip=True)).strip()
+
+
+def _label_text(el: Tag, doc: BeautifulSoup) -> str:
+    """extract_labels_bulk と同じ順序でラベルを探す（label[for] → 包含 label → dt → th）"""
+    el_id = el.get("id")
+    if el_id:
+        lbl = doc.find("label", attrs={"for": el_id})
+        if lbl:
+            return _text(lbl)
+    wrap = el.find_parent("label")
+    if wrap:
+        return _text(wrap)
+    dd = el.find_parent("dd")
+    if dd:
+        dt = dd.find_previous_sibling()
+        if dt is not None and dt.name == "dt":
+            return _text(dt)
+    tr = el.find_parent("tr")
+    if tr:
+        th = tr.find("th")
+        if th:
+            return _text(th)
+    return ""
+
+
+def _hidden_by_markup(el: Tag) -> bool:
+    """hidden 属性・インライン style による非表示（CSS は評価できないので近似）"""
+    node: Optional[Tag] = el
+    while isinstance(node, Tag) and node.name not in ("form", "body", "html"):
+        if node.has_attr("hidden"):
+            return True
+        style = (node.get("style") or "").replace(" ", "").lower()
+        if "display:none" in style or "visibility:hidden" in style:
+            return True
+        node = node.parent
+    return False
+
+
+def _form_encoding(form: Tag, fallback: Optional[str]) -> str:
+    """
+    フォームを送る文字コード。accept-charset（空白/カンマ区切りの候補列）のうち最初に使えるもの、
+    無ければ fallback（ページの文字コード）。BeautifulSoup は accept-charset を文字列のリストで返す
+    """
+    raw = form.get("accept-charset") or ""
+    if isinstance(raw, str):
+        raw = [raw]
+    for cand in (c for part in raw for c in re.split(r"[\s,]+", part) if c):
+        try:
+            return codecs.lookup(cand).name
+        except LookupError:
+            continue
+    try:
+        return codecs.lookup(fallback or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
+def _selector(el: Tag) -> str:
+    el_id = el.get("id")
+    if el_id:
+        return f"#{css_escape(el_id)}"
+    name = (el.get("name") or "").replace('"', '\\"')
+    sel = f'{el.name}[name="{name}"]'
+    if (el.get("type") or "").lower() in ("radio", "checkbox") and el.has_attr("value"):
+        sel += f'[value="{(el.get("value") or "").replace(chr(34), chr(92) + chr(34))}"]'
+    return sel
+
+
+def parse_form_fields(form: Tag, doc: BeautifulSoup) -> List[Dict[str, Any]]:
+    """フォーム内の入力要素を extract_labels_bulk と同じ形の dict 列にする（"element" に Tag を保持）"""
+    fields: List[Dict[str, Any]] = []
+    for el in form.find_all(["input", "textarea", "select"]):
+        tag = el.name
+        typ = (el.get("type") or "").lower() if tag == "input" else ""
+        if typ in _SKIP_TYPES or not el.get("name"):
+            continue
+        mxl = el.get("maxlength")
+        fields.append({
+            "tag": tag,
+            "type": typ,
+            "name": el.get("name") or "",
+            "id": el.get("id") or "",
+            "class": " ".join(el.get("class") or []),
+            "placeholder": el.get("placeholder") or "",
+            "ariaLabel": el.get("aria-label") or "",
+            "labelText": _label_text(el, doc),
+            "visible": typ != "hidden" and not _hidden_by_markup(el),
+            "autocomplete": el.get("autocomplete") or "",
+            "required": el.has_attr("required") or el.get("aria-required") == "true",
+            "pattern": el.get("pattern") or "",
+            "maxlength": int(mxl) if (mxl or "").isdigit() else "",
+            "selector": _selector(el),
+            "element": el,
+        })
+    return fields
+
+
+def _submit_controls(form: Tag) -> List[Tag]:
+    out: List[Tag] = []
+    for el in form.find_all(["input", "button"]):
+        typ = (el.get("type") or "").lower()
+        if el.name == "button" and typ in ("", "submit"):
+            out.append(el)
+        elif el.name == "input" and typ in ("submit", "image"):
+            out.append(el)
+    return out
+
+
+def _pick_form(doc: BeautifulSoup) -> Tag:
+    """問い合わせフォームらしい POST フォームを1つ選ぶ（無ければ Fallback）"""
+    best: Optional[Tag] = None
+    best_score = 0
+    for form in doc.find_all("form"):
+        if (form.get("method") or "get").strip().lower() != "post":
+            continue
+        if (form.get("role") or "").lower() == "search":
+            continue
+        fillable = [
+            el for el in form.find_all(["input", "textarea"])
+            if el.name == "textarea" or (el.get("type") or "").lower() in _TEXT_TYPES
+        ]
+        score = len(fillable) + (3 if form.find("textarea") else 0)
+        if score > best_score:
+            best, best_score = form, score
+    if best is None or best_score < 3:
+        raise Fallback("no-static-form")
+    return best
+
+
+def _check_static(doc: BeautifulSoup, html: str, form: Tag) -> None:
+    if _CAPTCHA_PAT.search(html):
+        raise Fallback("captcha")
+    if doc.find("meta", attrs={"name": re.compile(r"csrf", re.I)}):
+        raise Fallback("csrf-meta")
+    action = (form.get("action") or "").strip().lower()
+    if action.startswith("javascript:") or form.has_attr("onsubmit"):
+        raise Fallback("js-submit")
+    for el in form.find_all(True):
+        if el.name == "input" and (el.get("type") or "").lower() == "file":
+            raise Fallback("file-input")
+        if any(_JS_BINDING_ATTRS.match(a) for a in el.attrs):
+            raise Fallback("js-binding")
+
+
+# ========= 値の決定（fill_form と同じ方針） =========
+def _resolve_values(assigned: Dict[str, Dict[str, Any]], data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """{key: field} を受け取り、氏名/フリガナ分割・確認欄コピーを反映した {key: field}（値は data に反映）"""
+    mapping = dict(assigned)
+    if "name" in data:
+        last_name, first_name = split_name(data["name"])
+        if "last_name" in data:
+            data["last_name"] = last_name
+        if "first_name" in data:
+            data["first_name"] = first_name
+        fn, ln = mapping.get("first_name"), mapping.get("last_name")
+        if fn and ln and fn["selector"] != ln["selector"]:
+            mapping.pop("name", None)
+        else:
+            if "name" not in mapping:
+                if fn:
+                    mapping["name"] = fn
+                elif ln:
+                    mapping["name"] = ln
+            mapping.pop("first_name", None)
+            mapping.pop("last_name", None)
+    if "furigana" in data:
+        last_kana, first_kana = split_name(data["furigana"])
+        if "kanaSei" in mapping:
+            data["kanaSei"] = last_kana
+        if "kanaMei" in mapping:
+            data["kanaMei"] = first_kana
+        if "kanaSei" in mapping and "kanaMei" in mapping:
+            mapping.pop("furigana", None)
+    if "email" in mapping and "email_confirm" in mapping and "email" in data:
+        data["email_confirm"] = data.get("email_confirm") or data["email"]
+    return mapping
+
+
+def _phone_group(form: Tag, phone_el: Tag) -> List[Tag]:
+    """分割電話欄（tel1/tel2/tel3 等）を検出。同じ親コンテナ内に tel/phone 系の入力が3つ以上"""
+    container = phone_el.find_parent(["td", "dd", "div", "p", "li"]) or form
+    tok = re.compile(r"(?:^|[^a-z])(tel|phone|denwa)(?:[^a-z]|$)", re.I)
+    group = [
+        el for el in container.find_all("input")
+        if (el.get("type") or "text").lower() in ("text", "tel", "number")
+        and (tok.search(el.get("name") or "") or tok.search(" ".join(el.get("class") or [])))
+    ]
+    return group if len(group) >= 3 else []
+
+
+def _option_pairs(select: Tag) -> List[Tuple[str, str, bool]]:
+    out = []
+    for opt in select.find_all("option"):
+        label = _text(opt)
+        value = opt.get("value") if opt.has_attr("value") else label
+        out.append((label, value or "", opt.has_attr("disabled")))
+    return out
+
+
+def _default_select_value(select: Tag) -> str:
+    opts = select.find_all("option")
+    chosen = next((o for o in opts if o.has_attr("selected")), opts[0] if opts else None)
+    if chosen is None:
+        return ""
+    return chosen.get("value") if chosen.has_attr("value") else _text(chosen)
+
+
+class HttpFastPath:
+    """aiohttp による静的フォーム処理。process_form の前段で try_process() を呼ぶ"""
+
+    def __init__(self, filler: "FormFiller", *, timeout: float = 12.0, connector_limit: int = 100) -> None:
+        self.filler = filler
+        self.timeout = aiohttp.ClientTimeout(total=float(timeout))
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._connector_limit = connector_limit
+        self.stats: Counter[str] = Counter()
+
+    async def __aenter__(self) -> "HttpFastPath":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _session(self) -> aiohttp.ClientSession:
+        # 接続は共有し、Cookie はタスクごとに分離
+        if self._connector is None or self._connector.closed:
+            self._connector = new_connector(self._connector_limit)
+        return aiohttp.ClientSession(
+            connector=self._connector,
+            connector_owner=False,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            headers=DEFAULT_HEADERS,
+            timeout=self.timeout,
+        )
+
+    async def close(self) -> None:
+        if self._connector is not None:
+            await self._connector.close()
+            self._connector = None
+        if self.stats:
+            logger.info("[http-fast] 集計: " + ", ".join(f"{k}={v}" for k, v in self.stats.most_common()))
+
+    async def try_process(self, task: FormTask) -> Optional[FormResult]:
+        """静的に処理できれば FormResult、できなければ None（ブラウザ経路へ）"""
+        if getattr(self.filler, "learn", False):
+            return None
+        try:
+            async with self._session() as session:
+                result = await self._process(session, task)
+            self.stats["handled"] += 1
+            return result
+        except Fallback as e:
+            self.stats[f"fallback:{e}"] += 1
+            logger.info(f"[http-fast] ブラウザ経路へ: {task.form_url} ({e})")
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, ValueError) as e:
+            # POST 前の取得・解析失敗のみここに来る
+            self.stats["fallback:fetch"] += 1
+            logger.debug(f"[http-fast] 取得失敗のためブラウザ経路へ: {task.form_url} ({e})")
+            return None
+        except Exception as e:
+            # 想定外の解析エラーも POST 前に限られる（POST 以降は _process が FormResult にする）のでブラウザ経路へ
+            self.stats["fallback:error"] += 1
+            logger.warning(f"[http-fast] 解析エラーのためブラウザ経路へ: {task.form_url} ({type(e).__name__}: {e})")
+            return None
+
+    async def _process(self, session: aiohttp.ClientSession, task: FormTask) -> FormResult:
+        async with session.get(task.form_url, allow_redirects=True) as resp:
+            if resp.status >= 400:
+                raise Fallback(f"status-{resp.status}")
+            ctype = (resp.headers.get("Content-Type") or "").lower()
+            if ctype and "html" not in ctype:
+                raise Fallback("not-html")
+            raw = await resp.content.read(MAX_HTML_BYTES)
+            page_url = str(resp.url)
+            charset = resp.charset
+
+        doc = BeautifulSoup(raw, "html.parser", from_encoding=charset)
+        html = str(doc)
+        form = _pick_form(doc)
+        _check_static(doc, html, form)
+        # フォームはページの文字コード（accept-charset 指定があればそれ）で送る
+        encoding = _form_encoding(form, doc.original_encoding or charset)
+
+        submits = _submit_controls(form)
+        if not submits:
+            raise Fallback("no-submit-button")
+        submit = next((b for b in submits if _SEND_PAT.search(b.get("value") or _text(b))), submits[0])
+        submit_label = submit.get("value") or _text(submit)
+        if _CONFIRM_STEP_PAT.search(submit_label) and not _SEND_PAT.search(submit_label):
+            raise Fallback("confirm-step")
+
+        data = dict(task.data)
+        fields = parse_form_fields(form, doc)
+        visible = [f for f in fields if f["visible"]]
+        trace = MappingTrace()
+        assigned, _, _ = self.filler._cascade_assign(visible, data, trace=trace)
+        mapping = _resolve_values(assigned, data)
+        trace.derive(mapping, "post-process")
+        pairs = self._build_pairs(form, fields, mapping, data)
+        self._emit_mapping(task.form_url, mapping, trace)
+        unmapped = [k for k in self.filler.fillable_keys if k in data and k not in mapping]
+
+        if self.filler.dry_run or self.filler.no_submit:
+            return FormResult(
+                form_url=task.form_url,
+                status="DRY_RUN",
+                note="送信スキップ（dry-run, http）",
+                timestamp=datetime.now().isoformat(),
+                unmapped_fields=",".join(unmapped),
+            )
+
+        if submit.get("name"):
+            pairs.append((submit["name"], submit.get("value") or ""))
+        action = urljoin(page_url, (submit.get("formaction") or form.get("action") or "").strip())
+        headers = {"Referer": page_url}
+        if "multipart" in (form.get("enctype") or "").lower():
+            body: Any = aiohttp.FormData(charset=encoding)
+            for k, v in pairs:
+                body.add_field(k, v)
+        else:
+            body = urlencode(pairs, encoding=encoding, errors="xmlcharrefreplace")
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        # ここから先はブラウザ経路へ戻さない（二重送信防止）
+        try:
+            async with session.post(action, data=body, headers=headers, allow_redirects=True) as resp:
+                status = resp.status
+                final_url = str(resp.url)
+                after = BeautifulSoup(await resp.content.read(MAX_HTML_BYTES), "html.parser", from_encoding=resp.charset)
+        except Exception as e:
+            return FormResult(
+                form_url=task.form_url,
+                status="SUBMIT_FAIL",
+                note=f"HTTP送信エラー: {e}",
+                timestamp=datetime.now().isoformat(),
+                unmapped_fields=",".join(unmapped),
+            )
+
+        try:
+            before_ok = looks_like_success_text(_text(doc.body or doc))
+            text_ok = looks_like_success_text(_text(after.body or after)) and not before_ok
+            url_ok = final_url != page_url and bool(_SUCCESS_URL_PAT.search(final_url))
+        except Exception as e:
+            return FormResult(
+                form_url=task.form_url,
+                status="SUBMIT_FAIL",
+                note=f"HTTP送信後の判定エラー: {e}",
+                timestamp=datetime.now().isoformat(),
+                unmapped_fields=",".join(unmapped),
+            )
+        ok = status < 400 and (text_ok or url_ok)
+        return FormResult(
+            form_url=task.form_url,
+            status="OK" if ok else "SUBMIT_FAIL",
+            note=(f"HTTP送信完了（{'URL遷移' if url_ok else '完了文言'}）" if ok else f"HTTP送信後に完了表示なし（status={status}）"),
+            timestamp=datetime.now().isoformat(),
+            unmapped_fields=",".join(unmapped),
+        )
+
+    def _build_pairs(
+        self,
+        form: Tag,
+        fields: List[Dict[str, Any]],
+        mapping: Dict[str, Dict[str, Any]],
+        data: Dict[str, Any],
+    ) -> List[Tuple[str, str]]:
+        """送信する (name, value) を文書順に組み立てる。必須欄が埋まらなければ Fallback"""
+        values: Dict[int, str] = {}
+        checked: Dict[int, bool] = {}
+        for key, f in mapping.items():
+            el: Tag = f["element"]
+            value = data.get(key)
+            if f["tag"] == "textarea":
+                values[id(el)] = data.get("inquiry_template", DEFAULT_INQUIRY_TEXT)
+            elif f["tag"] == "select":
+                opts = _option_pairs(el)
+                want = str(value or "")
+                hit = next((v for (lbl, v, dis) in opts if not dis and (v == want or lbl == want)), None)
+                if hit is None:
+                    raise Fallback(f"select-value:{key}")
+                values[id(el)] = hit
+            elif f["type"] in ("checkbox", "radio"):
+                checked[id(el)] = bool(value)
+            elif key == "phone":
+                group = _phone_group(form, el)
+                if len(group) == 3:
+                    for g, part in zip(group, split_phone(str(value or ""))):
+                        values[id(g)] = part
+                else:
+                    values[id(el)] = str(value)
+            elif key == "website":
+                val = value or data.get("company_url") or ""
+                if val and not re.match(r"^https?://", val, re.I):
+                    val = "https://" + val
+                values[id(el)] = val
+            else:
+                values[id(el)] = str(value)
+
+        # 未マップの textarea は1つだけ救済入力（fallback_fill_textarea 相当）
+        if not any(f["tag"] == "textarea" for f in mapping.values()):
+            for f in fields:
+                if f["tag"] == "textarea" and f["visible"] and not _text(f["element"]):
+                    values[id(f["element"])] = data.get("inquiry_template") or data.get("message") or FALLBACK_INQUIRY_TEXT
+                    break
+
+        pref = _get_pref_from_data(data)
+        pairs: List[Tuple[str, str]] = []
+        radio_groups: Dict[str, List[Tag]] = {}
+        required_groups: set[str] = set()
+        for f in fields:
+            el: Tag = f["element"]
+            if el.has_attr("disabled"):
+                continue
+            name = f["name"]
+            typ = f["type"]
+            if typ == "radio":
+                radio_groups.setdefault(name, []).append(el)
+                if f["required"]:
+                    required_groups.add(name)
+                continue
+            if typ == "checkbox":
+                label = f"{f['labelText']} {name} {f['id']}"
+                on = checked.get(id(el), el.has_attr("checked") or f["required"] or bool(_CONSENT_PAT.search(label)))
+                if on:
+                    pairs.append((name, el.get("value") or "on"))
+                continue
+            if f["tag"] == "select":
+                value = values.get(id(el))
+                if value is None:
+                    opts = _option_pairs(el)
+                    label = _best_pref_match(opts, pref) if pref else None
+                    if label:
+                        value = next((v for (lbl, v, _) in opts if lbl.strip() == label), None)
+                    if not value:
+                        value = _default_select_value(el)
+                    if not value:
+                        # choose_second_option_in_form と同じく先頭以外の有効な選択肢
+                        value = next((v for (_, v, dis) in opts[1:] if not dis and v), "")
+                pairs.append((name, value))
+                continue
+            if f["tag"] == "textarea":
+                value = values.get(id(el), el.get_text())
+            else:
+                value = values.get(id(el), el.get("value") or "")
+            if f["required"] and f["visible"] and not str(value).strip():
+                raise Fallback(f"required:{name}")
+            pairs.append((name, str(value)))
+
+        for name, radios in radio_groups.items():
+            picked = next((r for r in radios if checked.get(id(r))), None)
+            if picked is None:
+                picked = next((r for r in radios if r.has_attr("checked")), None)
+            if picked is None:
+                if name not in required_groups:
+                    # 任意の未選択グループは送らない（ブラウザ経路も触らない）
+                    continue
+                # 必須の未選択グループは「2番目優先」（ブラウザ経路と同じ安全側）
+                picked = radios[1] if len(radios) > 1 else radios[0]
+            pairs.append((name, picked.get("value") or "on"))
+        return pairs
+
+    def _emit_mapping(self, url: str, mapping: Dict[str, Dict[str, Any]], trace: MappingTrace) -> None:
+        """ブラウザ経路（FormFiller._mapping_event）と同じ形の mapping イベントを出す"""
+        if not getattr(self.filler, "emit_json", False):
+            return
+        try:
+            event = self.filler._mapping_event(None, {k: f["selector"] for k, f in mapping.items()}, trace=trace)
+            event.update(url=url, method="http")
+            print(json.dumps(event), flush=True)
+        except Exception:
+            pass
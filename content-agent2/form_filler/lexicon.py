@@ -0,0 +1,422 @@
+"""
+語彙（キー → シノニムのパターン列）のコンパイル済み表現
+
+find_best_field_match / label_mentions / ヒント抽出は、1つの文字列に対して
+「どのキーのどのパターンが当たるか」を何度も問い合わせる。パターンごとに re.search を回す代わりに
+- 正規表現の記号を含まない文字列パターン → 全キー共通の Aho-Corasick オートマトン（小文字で照合）
+- それ以外 → キーごとに1本の交替（alternation）にまとめて事前判定し、当たったキーだけ個別に確認
+として、1回の走査で「一致したキーとパターンの一覧」を返す。生成後は変更しない。
+
+YAML（base/custom/--lexicon）を読んでマージ・コンパイルした結果は、語彙ディレクトリ配下の
+キャッシュファイルに保存し、YAML の mtime（変わっていればハッシュ）が同じ間は再利用する（load_lexicon）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import sys
+import tempfile
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import yaml
+
+__all__ = [
+    "Lexicon", "default_lexicon", "lexicon_sources", "read_lexicon_yaml",
+    "build_lexicon", "load_lexicon", "write_lexicon_cache",
+]
+
+logger = logging.getLogger(__name__)
+
+# キャッシュファイルの形式を変えたら上げる
+LEXICON_CACHE_VERSION = 1
+
+# これらを含まないパターンは正規表現としても単なる部分文字列一致と同じ意味になる
+_REGEX_META = set(".^$*+?{}[]\\|()")
+# 交替にまとめると意味が変わる（後方参照・途中のインラインフラグ）パターン
+_UNSAFE_TO_COMBINE = re.compile(r"\\\d|\(\?[aiLmsux]+\)")
+
+# scan() の結果を覚えておく件数（同じ属性文字列をキーごとに何度も照合するため）
+_SCAN_CACHE_SIZE = 4096
+
+
+def _is_literal(pattern: str) -> bool:
+    return not any(ch in _REGEX_META for ch in pattern)
+
+
+def _compile(pattern: str) -> re.Pattern:
+    try:
+        return re.compile(pattern, re.I)
+    except re.error:
+        return re.compile(re.escape(str(pattern)), re.I)
+
+
+class _AhoCorasick:
+    """文字列パターンの多パターン照合（出力は登録時の値）"""
+
+    __slots__ = ("_goto", "_fail", "_out")
+
+    def __init__(self, words: Iterable[Tuple[str, Tuple[str, str]]]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[str, str]]] = [[]]
+        for word, value in words:
+            if not word:
+                continue
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(value)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                cand = goto[f].get(ch, 0)
+                fail[nxt] = cand if cand != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+
+    def find(self, text: str) -> List[Tuple[str, str]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        hits: List[Tuple[str, str]] = []
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                hits.extend(out[node])
+        return hits
+
+
+class Lexicon:
+    """
+    キー → シノニムのパターン列（生成後は不変）。source_keys は外部 YAML で定義されたキー。
+
+    正規表現のコンパイルは初回の照合時まで遅延する（キャッシュから読み込んだ直後に全パターンを
+    コンパイルし直さないため）。pickle されるのはパターン文字列とオートマトンの表だけ。
+    語彙そのものは変更できないため、複数の FormFiller や fork した子プロセスで共有してよい
+    （遅延コンパイルと照合結果のメモは各プロセス内に閉じる）。
+    """
+
+    def __init__(self, patterns: Mapping[str, Iterable[str]], source_keys: Iterable[str] = ()) -> None:
+        self.source_keys: FrozenSet[str] = frozenset(source_keys)
+        raw: Dict[str, Tuple[str, ...]] = {}
+        for key, pats in patterns.items():
+            # 重複もそのまま残す（スコアは一致したパターンごとに加点されるため）
+            raw[str(key)] = tuple(p.pattern if hasattr(p, "pattern") else str(p) for p in pats or [])
+
+        literals: List[Tuple[str, Tuple[str, str]]] = []
+        literal_exact: Dict[str, List[Tuple[str, str]]] = {}
+        regex: Dict[str, Tuple[str, ...]] = {}
+        for key, pats in raw.items():
+            rx: List[str] = []
+            for p in pats:
+                if _is_literal(p):
+                    low = p.lower()
+                    literals.append((low, (key, p)))
+                    literal_exact.setdefault(low, []).append((key, p))
+                elif p not in rx:
+                    rx.append(p)
+            regex[key] = tuple(rx)
+        self._patterns: Mapping[str, Tuple[str, ...]] = MappingProxyType(raw)
+        self._automaton = _AhoCorasick(literals)
+        self._literal_exact = {k: tuple(v) for k, v in literal_exact.items()}
+        self._regex = regex
+        self._reset_compiled()
+
+    def _reset_compiled(self) -> None:
+        self._rx: Dict[str, re.Pattern] = {}
+        self._combined: Dict[Tuple[str, str], Optional[re.Pattern]] = {}
+        self._scan_cache: "OrderedDict[str, Mapping[str, Tuple[str, ...]]]" = OrderedDict()
+
+    # MappingProxyType と遅延コンパイル結果は保存しない
+    def __getstate__(self) -> Dict[str, Any]:
+        state = {k: v for k, v in self.__dict__.items() if k not in ("_rx", "_combined", "_scan_cache")}
+        state["_patterns"] = dict(self._patterns)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._patterns = MappingProxyType(state["_patterns"])
+        self._reset_compiled()
+
+    def _compiled_one(self, pattern: str) -> re.Pattern:
+        c = self._rx.get(pattern)
+        if c is None:
+            c = self._rx[pattern] = _compile(pattern)
+        return c
+
+    def _combined_for(self, kind: str, key: str = "") -> Optional[re.Pattern]:
+        """交替1本にまとめた正規表現（kind: any=全キーの正規表現 / pre=キーの正規表現 / full=キーの全パターン）"""
+        slot = (kind, key)
+        if slot in self._combined:
+            return self._combined[slot]
+        if kind == "any":
+            pats = [p for rx in self._regex.values() for p in rx]
+        elif kind == "pre":
+            pats = list(self._regex.get(key, ()))
+        else:
+            pats = list(dict.fromkeys(self._patterns.get(key, ())))
+        combined = None
+        if pats and not any(_UNSAFE_TO_COMBINE.search(p) for p in pats):
+            try:
+                combined = re.compile("|".join(f"(?:{p})" for p in pats), re.I)
+            except re.error:
+                combined = None  # 不正なパターンを含む → 個別判定（個別はエスケープして扱う）
+        self._combined[slot] = combined
+        return combined
+
+    # ---- 参照 ----
+    def keys(self) -> Iterable[str]:
+        return self._patterns.keys()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._patterns
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def patterns(self, key: str) -> Tuple[str, ...]:
+        return self._patterns.get(key, ())
+
+    def compiled(self, key: str) -> Tuple[re.Pattern, ...]:
+        return tuple(self._compiled_one(p) for p in self._patterns.get(key, ()))
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {k: list(v) for k, v in self._patterns.items()}
+
+    # ---- 照合 ----
+    def scan(self, text: str) -> Mapping[str, Tuple[str, ...]]:
+        """text に一致したキー → 一致したパターン（語彙の登録順）"""
+        text = text or ""
+        cached = self._scan_cache.get(text)
+        if cached is not None:
+            return cached
+
+        found: Dict[str, set] = {}
+        for key, pat in self._automaton.find(text.lower()):
+            found.setdefault(key, set()).add(pat)
+        any_regex = self._combined_for("any")
+        if any_regex is None or any_regex.search(text):
+            for key, rx in self._regex.items():
+                if not rx:
+                    continue
+                pre = self._combined_for("pre", key)
+                if pre is not None and not pre.search(text):
+                    continue
+                for p in rx:
+                    if self._compiled_one(p).search(text):
+                        found.setdefault(key, set()).add(p)
+
+        result = MappingProxyType({
+            key: tuple(p for p in self._patterns[key] if p in pats) for key, pats in found.items()
+        })
+        self._scan_cache[text] = result
+        if len(self._scan_cache) > _SCAN_CACHE_SIZE:
+            self._scan_cache.popitem(last=False)
+        return result
+
+    def matches(self, key: str, text: str) -> Tuple[str, ...]:
+        """key のパターンのうち text に一致したもの。語彙に無い key は key 自体をパターンとして扱う"""
+        if key not in self._patterns:
+            return (key,) if _compile(key).search(text or "") else ()
+        return self.scan(text).get(key, ())
+
+    def search(self, key: str, text: str) -> bool:
+        return bool(self.matches(key, text))
+
+    def fullmatch(self, key: str, text: str) -> bool:
+        """text 全体が key のいずれかのパターンに一致するか"""
+        text = text or ""
+        if any(k == key for k, _ in self._literal_exact.get(text.lower(), ())):
+            return True
+        full = self._combined_for("full", key)
+        if full is not None:
+            return bool(full.fullmatch(text))
+        return any(c.fullmatch(text) for c in self.compiled(key))
+
+
+_DEFAULT: Optional[Lexicon] = None
+
+
+def default_lexicon() -> Lexicon:
+    """constants.CANDIDATES だけから作った語彙（外部 YAML を読まない既定値）"""
+    global _DEFAULT
+    if _DEFAULT is None:
+        from .constants import CANDIDATES
+
+        _DEFAULT = Lexicon(CANDIDATES)
+    return _DEFAULT
+
+
+# ---- YAML からの構築とキャッシュ ----
+def lexicon_sources(extra: Optional[str] = None) -> List[str]:
+    """語彙 YAML の読み込み順（base → custom → --lexicon）"""
+    from .constants import DEFAULT_LEXICON_BASE, DEFAULT_LEXICON_CUSTOM
+
+    return [p for p in (DEFAULT_LEXICON_BASE, DEFAULT_LEXICON_CUSTOM, extra) if p]
+
+
+def read_lexicon_yaml(path: Optional[str]) -> Dict[str, List[str]]:
+    """語彙 YAML（キー → 文字列 or 文字列リスト）を読む。無い・壊れている場合は空"""
+    try:
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+            if isinstance(data, dict):
+                return {str(k): (list(v) if isinstance(v, list) else [str(v)]) for k, v in data.items()}
+    except Exception as e:
+        logger.debug(f"lexiconファイル読み込み失敗: {path}: {e}")
+    return {}
+
+
+def build_lexicon(paths: Sequence[Optional[str]], builtin: Optional[Mapping[str, Iterable[str]]] = None) -> Lexicon:
+    """組み込みの語彙に YAML を順に重ねて Lexicon を作る（同じキーは未登録のパターンだけ追加）"""
+    if builtin is None:
+        from .constants import CANDIDATES as builtin
+    merged: Dict[str, List[str]] = {k: [*v] for k, v in builtin.items()}
+    source_keys: set = set()
+    for path in paths:
+        for k, v in read_lexicon_yaml(path).items():
+            source_keys.add(k)
+            if k in merged:
+                merged[k].extend([x for x in v if x not in merged[k]])
+            else:
+                merged[k] = [*v]
+    return Lexicon(merged, source_keys)
+
+
+def _file_sha1(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _source_state(path: str, *, with_hash: bool) -> Tuple[str, Optional[int], Optional[int], Optional[str]]:
+    """(絶対パス, mtime_ns, size, sha1)。存在しなければ None 埋め"""
+    ap = os.path.abspath(path)
+    try:
+        st = os.stat(ap)
+    except OSError:
+        return (ap, None, None, None)
+    return (ap, st.st_mtime_ns, st.st_size, _file_sha1(ap) if with_hash else None)
+
+
+def _builtin_digest(builtin: Mapping[str, Iterable[str]]) -> str:
+    raw = json.dumps({k: list(v) for k, v in builtin.items()}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_header(paths: Sequence[str], builtin: Mapping[str, Iterable[str]]) -> Dict[str, Any]:
+    return {
+        "version": LEXICON_CACHE_VERSION,
+        "python": sys.version_info[:2],
+        "builtin": _builtin_digest(builtin),
+        "sources": [_source_state(p, with_hash=True) for p in paths],
+    }
+
+
+def _cache_path(paths: Sequence[str], cache_dir: str) -> str:
+    key = hashlib.sha1("\n".join(os.path.abspath(p) for p in paths).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"lexicon-v{LEXICON_CACHE_VERSION}-{key}.pickle")
+
+
+def _header_is_fresh(header: Any, paths: Sequence[str], builtin: Mapping[str, Iterable[str]]) -> bool:
+    """mtime/サイズが同じなら有効。違っていても内容のハッシュが同じなら有効"""
+    if not isinstance(header, dict):
+        return False
+    if header.get("version") != LEXICON_CACHE_VERSION or tuple(header.get("python") or ()) != sys.version_info[:2]:
+        return False
+    if header.get("builtin") != _builtin_digest(builtin):
+        return False
+    recorded = header.get("sources") or []
+    if len(recorded) != len(paths):
+        return False
+    for path, (r_path, r_mtime, r_size, r_hash) in zip(paths, recorded):
+        cur_path, cur_mtime, cur_size, _ = _source_state(path, with_hash=False)
+        if cur_path != r_path:
+            return False
+        if cur_mtime is None or r_mtime is None:
+            if cur_mtime != r_mtime:
+                return False
+            continue
+        if (cur_mtime, cur_size) == (r_mtime, r_size):
+            continue
+        if _file_sha1(cur_path) != r_hash:
+            return False
+    return True
+
+
+def write_lexicon_cache(
+    paths: Sequence[Optional[str]], cache_dir: str, builtin: Optional[Mapping[str, Iterable[str]]] = None
+) -> Tuple[Lexicon, str]:
+    """語彙を構築してキャッシュファイルへ書き出す（ビルド手順）。戻り値は (Lexicon, 書き出し先)"""
+    if builtin is None:
+        from .constants import CANDIDATES as builtin
+    srcs = [p for p in paths if p]
+    lexicon = build_lexicon(srcs, builtin)
+    out = _cache_path(srcs, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 複数プロセスが同時に書いても壊れないよう一時ファイル経由で置き換える
+    fd, tmp = tempfile.mkstemp(prefix=".lexicon-", dir=cache_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(_cache_header(srcs, builtin), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(lexicon, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, out)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return lexicon, out
+
+
+def load_lexicon(
+    paths: Sequence[Optional[str]], cache_dir: Optional[str], builtin: Optional[Mapping[str, Iterable[str]]] = None
+) -> Lexicon:
+    """キャッシュが新しければそれを、古ければ YAML から構築してキャッシュを書き直す"""
+    if builtin is None:
+        from .constants import CANDIDATES as builtin
+    srcs = [p for p in paths if p]
+    if not cache_dir:
+        return build_lexicon(srcs, builtin)
+    path = _cache_path(srcs, cache_dir)
+    try:
+        with open(path, "rb") as f:
+            if _header_is_fresh(pickle.load(f), srcs, builtin):
+                lexicon = pickle.load(f)
+                if isinstance(lexicon, Lexicon):
+                    return lexicon
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.debug(f"lexiconキャッシュ読み込み失敗（再構築）: {path}: {e}")
+    try:
+        lexicon, _ = write_lexicon_cache(srcs, cache_dir, builtin)
+        return lexicon
+    except OSError as e:
+        logger.debug(f"lexiconキャッシュ書き込み失敗: {cache_dir}: {e}")
+        return build_lexicon(srcs, builtin)
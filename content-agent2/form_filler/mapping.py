@@ -4,7 +4,7 @@ import re
 from typing import Dict, Optional
 
 from .utils import normalize
-from .constants import CANDIDATES
+from .lexicon import Lexicon, default_lexicon
 
 __all__ = [
     "label_mentions",
@@ -14,15 +14,12 @@ __all__ = [
 ]
 
 
-def label_mentions(label: str, key: str) -> bool:
-    """ラベル文字列が指定キーのシノニムにマッチするか（互換維持）。"""
-    pats = CANDIDATES.get(key, [])
-    nl = normalize(label)
-    for p in pats:
-        pat = p.pattern if hasattr(p, "pattern") else str(p)
-        if re.search(pat, nl):
-            return True
-    return False
+def label_mentions(label: str, key: str, lexicon: Optional[Lexicon] = None) -> bool:
+    """ラベル文字列が指定キーのシノニムにマッチするか（lexicon 省略時は組み込みの語彙）。"""
+    lexicon = lexicon or default_lexicon()
+    if key not in lexicon:
+        return False
+    return lexicon.search(key, normalize(label))
 
 
 # ------------------------------
@@ -67,6 +64,7 @@ def score_adjustment(
     attrs: Dict[str, str] | None = None,
     candidate_label_text: str = "",
     tentative_value: str = "",
+    lexicon: Optional[Lexicon] = None,
 ) -> int:
     """
     マッピング候補の追加スコア（減点/加点）を返す。
@@ -108,7 +106,7 @@ def score_adjustment(
     #         adj -= 8
 
     # labelにもヒントがある場合は微加点
-    if candidate_label_text and label_mentions(candidate_label_text, key):
+    if candidate_label_text and label_mentions(candidate_label_text, key, lexicon):
         adj += 2
 
     return adj
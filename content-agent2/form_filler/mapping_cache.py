@@ -0,0 +1,138 @@
+"""
+フォーム構造指紋によるマッピングキャッシュ（--mapping-cache）
+
+Contact Form 7 / Elementor / MW WP Form / HubSpot などの同一テンプレートは、
+extract_labels_bulk の (tag, type, name, id, labelText, visible, selector) 列が一致する。
+その指紋（＋入力データのキー集合）→ element_map を SQLite に保存し、次回はカスケードと
+フォールバックを飛ばしてそのまま入力に進む。
+- id の無い欄の selector は DOM 位置のパスなので指紋に含める（テーマのマークアップが違えば別の指紋）
+- 各エントリには保存時の要素の tag/name/type を添え、命中時に同じ要素を指すか確かめてから使う
+- 語彙（lexicon）のバージョンが変わった行は起動時に破棄する
+- 複数プロセス（--processes）から同じファイルを共有できるよう WAL モードで開く
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+__all__ = ["MappingCache", "form_fingerprint"]
+
+logger = logging.getLogger(__name__)
+
+# 保存形式を変えたら上げる（古い行は語彙バージョン不一致と同様に破棄される）
+SCHEMA_VERSION = 2
+
+# (key, frame 参照, selector, 保存時の要素 {tag, name, type})。
+# frame 参照は "" = メインフレーム、None = フレーム指定なし、それ以外は iframe の URL
+CachedEntry = Tuple[str, Optional[str], str, Dict[str, str]]
+
+
+def form_fingerprint(fields: Iterable[Dict[str, Any]], data_keys: Iterable[str]) -> str:
+    """extract_labels_bulk の結果と入力データのキー集合からフォーム構造の指紋を作る"""
+    shape = [
+        [
+            (f.get("tag") or "").lower(),
+            (f.get("type") or "").lower(),
+            f.get("name") or "",
+            f.get("id") or "",
+            " ".join((f.get("labelText") or "").split()).lower(),
+            bool(f.get("visible")),
+            f.get("selector") or "",
+        ]
+        for f in fields or []
+    ]
+    payload = json.dumps([SCHEMA_VERSION, shape, sorted(data_keys)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MappingCache:
+    """指紋 → element_map の永続キャッシュ（SQLite）"""
+
+    def __init__(self, path: str, lexicon_version: str) -> None:
+        self.path = path
+        self.lexicon_version = f"{SCHEMA_VERSION}:{lexicon_version}"
+        self.stats: Counter[str] = Counter()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError:
+            pass
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mappings ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " lexicon TEXT NOT NULL,"
+            " mapping TEXT NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0,"
+            " updated REAL NOT NULL)"
+        )
+        purged = self._conn.execute(
+            "DELETE FROM mappings WHERE lexicon != ?", (self.lexicon_version,)
+        ).rowcount
+        if purged:
+            logger.info(f"[mapping-cache] 語彙バージョン変更のため {purged} 件を破棄")
+
+    def get(self, fingerprint: str) -> Optional[List[CachedEntry]]:
+        try:
+            row = self._conn.execute(
+                "SELECT mapping FROM mappings WHERE fingerprint = ? AND lexicon = ?",
+                (fingerprint, self.lexicon_version),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"[mapping-cache] 読み込み失敗: {e}")
+            row = None
+        if row is None:
+            self.stats["miss"] += 1
+            return None
+        try:
+            entries = [(str(k), fr, str(sel), dict(meta or {})) for k, fr, sel, meta in json.loads(row[0])]
+        except Exception:
+            self.stats["miss"] += 1
+            return None
+        self.stats["hit"] += 1
+        try:
+            self._conn.execute("UPDATE mappings SET hits = hits + 1 WHERE fingerprint = ?", (fingerprint,))
+        except sqlite3.Error:
+            pass
+        return entries
+
+    def discard(self, fingerprint: str) -> None:
+        """命中したが要素が一致しなかった行を消す（再マッピング後の put で置き換わる）"""
+        self.stats["hit"] -= 1
+        self.stats["stale"] += 1
+        try:
+            self._conn.execute("DELETE FROM mappings WHERE fingerprint = ?", (fingerprint,))
+        except sqlite3.Error:
+            pass
+
+    def put(self, fingerprint: str, entries: List[CachedEntry]) -> None:
+        if not entries:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mappings (fingerprint, lexicon, mapping, hits, updated) VALUES (?, ?, ?, 0, ?)",
+                (fingerprint, self.lexicon_version, json.dumps(entries, ensure_ascii=False), time.time()),
+            )
+            self.stats["store"] += 1
+        except sqlite3.Error as e:
+            logger.debug(f"[mapping-cache] 書き込み失敗: {e}")
+
+    def log_stats(self) -> None:
+        if not self.stats:
+            return
+        hit, miss = self.stats["hit"], self.stats["miss"]
+        rate = (hit / (hit + miss) * 100) if (hit + miss) else 0.0
+        logger.info(
+            f"[mapping-cache] hit={hit} miss={miss} stale={self.stats['stale']} store={self.stats['store']} ({rate:.0f}% hit)"
+        )
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
 
-__all__ = ["FormTask", "FormResult"]
+__all__ = ["FormTask", "FormResult", "MappingDecision", "MappingTrace"]
 
 JSONDict = Dict[str, Any]
 
@@ -31,3 +31,60 @@ class FormResult:
 
     def to_csv_row(self) -> List[str]:
         return [self.form_url, self.status, self.note, self.timestamp, self.unmapped_fields]
+
+    def to_csv_line(self) -> str:
+        """結果CSVの1行（save_result と分割実行のマージで共通の書式）"""
+        return f'{self.form_url},{self.status},"{self.note}",{self.timestamp},"{self.unmapped_fields}"\n'
+
+
+@dataclass(slots=True)
+class MappingDecision:
+    """1キー分の割当の根拠（どの段で・何点で・次点との差・判定に要した時間）"""
+    stage: str  # "framework" / "cache" / "prepass" / "cascade" / "fallback" / "derived"
+    score: Optional[float] = None  # 規則で即決する段（framework/cache/prepass）は None
+    margin: Optional[float] = None  # 次点候補との差（候補が1つなら None）
+    elapsed_ms: float = 0.0  # 一括で決める段（cascade 等）は段全体の所要時間
+    detail: List[str] = field(default_factory=list)
+
+    def to_json(self) -> JSONDict:
+        return {
+            "stage": self.stage,
+            "score": None if self.score is None else round(self.score, 4),
+            "margin": None if self.margin is None else round(self.margin, 4),
+            "ms": round(self.elapsed_ms, 3),
+            "detail": list(self.detail),
+        }
+
+
+@dataclass(slots=True)
+class MappingTrace:
+    """find_all_field_matches 1回分の判定記録（--emit-json の mapping イベントに出す）"""
+    decisions: Dict[str, MappingDecision] = field(default_factory=dict)
+    stage_ms: Dict[str, float] = field(default_factory=dict)
+    # find_best_field_match の採点結果（採用されたものだけ adopt で decisions に移す）
+    ranked: Dict[str, MappingDecision] = field(default_factory=dict)
+
+    def record(
+        self,
+        key: str,
+        stage: str,
+        *,
+        score: Optional[float] = None,
+        margin: Optional[float] = None,
+        elapsed_ms: float = 0.0,
+        detail: Optional[List[str]] = None,
+    ) -> None:
+        self.decisions[key] = MappingDecision(stage, score, margin, elapsed_ms, list(detail or ()))
+
+    def adopt(self, key: str) -> None:
+        """フォールバックで採用したキーの採点結果を確定する（採点記録がなければ段だけ残す）"""
+        self.decisions[key] = self.ranked.pop(key, None) or MappingDecision("fallback")
+
+    def derive(self, keys: Iterable[str], detail: str) -> None:
+        """段を経ずに後処理で加わったキー（氏名・フリガナの分割反映など）を "derived" として残す"""
+        for key in keys:
+            if key not in self.decisions:
+                self.decisions[key] = MappingDecision("derived", detail=[detail])
+
+    def add_time(self, stage: str, elapsed_ms: float) -> None:
+        self.stage_ms[stage] = self.stage_ms.get(stage, 0.0) + elapsed_ms
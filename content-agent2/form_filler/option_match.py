@@ -0,0 +1,160 @@
+"""
+select の選択肢照合（都道府県・問い合わせ種別・役職）の前計算とキャッシュ
+
+選択肢の文言は「東京都」「製品について」のようにサイトをまたいで繰り返し現れる。
+正規化・bigram プロファイル・トークン集合は文字列ごとに LRU キャッシュし、2回目以降はほぼ辞書引きだけにする。
+- 都道府県は 47 件の表記ゆれ（漢字・接尾辞なし・ひらがな・カタカナ・ローマ字）を静的な索引に持ち、コードで比較する
+- 問い合わせ種別の照合語（データ行の inquiry 等）も同じキャッシュを通すため、同じ照合語の行では再計算しない
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional
+
+from .utils import normalize
+
+__all__ = [
+    "PREFECTURES",
+    "TextProfile",
+    "norm_text",
+    "text_profile",
+    "profile_cosine",
+    "canon_pref",
+    "pref_code",
+]
+
+_CACHE_SIZE = 16384
+
+# (JIS コード, 漢字表記, ひらがな, ローマ字の別表記...)
+PREFECTURES = (
+    (1, "北海道", "ほっかいどう", "hokkaido", "hokkaidou"),
+    (2, "青森県", "あおもり", "aomori"),
+    (3, "岩手県", "いわて", "iwate"),
+    (4, "宮城県", "みやぎ", "miyagi"),
+    (5, "秋田県", "あきた", "akita"),
+    (6, "山形県", "やまがた", "yamagata"),
+    (7, "福島県", "ふくしま", "fukushima"),
+    (8, "茨城県", "いばらき", "ibaraki"),
+    (9, "栃木県", "とちぎ", "tochigi"),
+    (10, "群馬県", "ぐんま", "gunma", "gumma"),
+    (11, "埼玉県", "さいたま", "saitama"),
+    (12, "千葉県", "ちば", "chiba"),
+    (13, "東京都", "とうきょう", "tokyo", "toukyou"),
+    (14, "神奈川県", "かながわ", "kanagawa"),
+    (15, "新潟県", "にいがた", "niigata"),
+    (16, "富山県", "とやま", "toyama"),
+    (17, "石川県", "いしかわ", "ishikawa"),
+    (18, "福井県", "ふくい", "fukui"),
+    (19, "山梨県", "やまなし", "yamanashi"),
+    (20, "長野県", "ながの", "nagano"),
+    (21, "岐阜県", "ぎふ", "gifu"),
+    (22, "静岡県", "しずおか", "shizuoka"),
+    (23, "愛知県", "あいち", "aichi"),
+    (24, "三重県", "みえ", "mie"),
+    (25, "滋賀県", "しが", "shiga"),
+    (26, "京都府", "きょうと", "kyoto", "kyouto"),
+    (27, "大阪府", "おおさか", "osaka", "oosaka"),
+    (28, "兵庫県", "ひょうご", "hyogo", "hyougo"),
+    (29, "奈良県", "なら", "nara"),
+    (30, "和歌山県", "わかやま", "wakayama"),
+    (31, "鳥取県", "とっとり", "tottori"),
+    (32, "島根県", "しまね", "shimane"),
+    (33, "岡山県", "おかやま", "okayama"),
+    (34, "広島県", "ひろしま", "hiroshima"),
+    (35, "山口県", "やまぐち", "yamaguchi"),
+    (36, "徳島県", "とくしま", "tokushima"),
+    (37, "香川県", "かがわ", "kagawa"),
+    (38, "愛媛県", "えひめ", "ehime"),
+    (39, "高知県", "こうち", "kochi", "kouchi"),
+    (40, "福岡県", "ふくおか", "fukuoka"),
+    (41, "佐賀県", "さが", "saga"),
+    (42, "長崎県", "ながさき", "nagasaki"),
+    (43, "熊本県", "くまもと", "kumamoto"),
+    (44, "大分県", "おおいた", "oita", "ooita"),
+    (45, "宮崎県", "みやざき", "miyazaki"),
+    (46, "鹿児島県", "かごしま", "kagoshima"),
+    (47, "沖縄県", "おきなわ", "okinawa"),
+)
+
+_PREF_SUFFIX = re.compile(r"[都道府県]$")
+# ローマ字表記の接尾辞（tokyo-to / osaka fu / aichi-ken / kyoto prefecture）
+_ROMAN_SUFFIX = re.compile(r"[-_]?(?:to|fu|ken|prefecture|pref\.?)$")
+_SPACE = re.compile(r"\s+")
+_TOKEN_SPLIT = re.compile(r"[\s/・,、]+")
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def norm_text(s: Optional[str]) -> str:
+    """utils.normalize のキャッシュ付き版（None は空文字）"""
+    return normalize(s or "")
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def canon_pref(s: Optional[str]) -> str:
+    """都道府県名の正規形: 空白除去、北海道はそのまま、それ以外は末尾の都/道/府/県を1つ外す"""
+    t = _SPACE.sub("", norm_text(s))
+    if not t:
+        return ""
+    if "北海道" in t:
+        return "北海道"
+    return _PREF_SUFFIX.sub("", t)
+
+
+def _katakana(s: str) -> str:
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in s)
+
+
+def _build_pref_index() -> Dict[str, int]:
+    index: Dict[str, int] = {}
+    for code, kanji, kana, *romaji in PREFECTURES:
+        # 接尾辞なしの漢字も登録する（「京都」は正規形が「京」になるため、部分一致で東京都に負けないように）
+        short = kanji if kanji == "北海道" else kanji[:-1]
+        for variant in (kanji, short, kana, _katakana(kana), *romaji):
+            index.setdefault(canon_pref(variant), code)
+    return index
+
+
+_PREF_INDEX = _build_pref_index()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def pref_code(s: Optional[str]) -> Optional[int]:
+    """表記ゆれを吸収した都道府県コード（1〜47。都道府県名でなければ None）"""
+    t = canon_pref(s)
+    if not t:
+        return None
+    code = _PREF_INDEX.get(t)
+    if code is None and t.isascii():
+        code = _PREF_INDEX.get(_ROMAN_SUFFIX.sub("", t))
+    return code
+
+
+class TextProfile:
+    """選択肢/照合語1つ分の前計算（正規化文字列・bigram の頻度とノルム・トークン集合）"""
+
+    __slots__ = ("norm", "bigrams", "length", "tokens")
+
+    def __init__(self, norm: str) -> None:
+        self.norm = norm
+        padded = f" {norm} "
+        self.bigrams = Counter(padded[i:i + 2] for i in range(max(len(padded) - 1, 1)))
+        self.length = math.sqrt(sum(v * v for v in self.bigrams.values()))
+        self.tokens: FrozenSet[str] = frozenset(x for x in _TOKEN_SPLIT.split(norm) if x)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def text_profile(s: Optional[str]) -> TextProfile:
+    return TextProfile(norm_text(s))
+
+
+def profile_cosine(a: TextProfile, b: TextProfile) -> float:
+    """bigram 頻度ベクトルの cosine"""
+    if a.length == 0 or b.length == 0:
+        return 0.0
+    small, large = (a.bigrams, b.bigrams) if len(a.bigrams) <= len(b.bigrams) else (b.bigrams, a.bigrams)
+    dot = sum(v * large[k] for k, v in small.items() if k in large)
+    return dot / (a.length * b.length)
@@ -0,0 +1,106 @@
+"""
+ページ内ヘルパ実行環境（window.__ff）
+
+各モジュールの JS（スナップショット・可視判定・ラベル抽出・スコープ判定・一括入力・同意判定など）を
+register() で名前付き関数として登録し、コンテキスト生成時に add_init_script で1度だけ注入する。
+呼び出し側は ff_call(frame, "snapshot", arg) のように関数名と引数だけを送るため、
+evaluate のたびに数KBのソースを CDP で送ってページ内で再コンパイルすることがなくなる。
+- 登録内容のハッシュを version とし、ページ側の版が違えば（またはまだ無ければ）その場で入れ直す
+  （init script 適用前に開いたページ・一時プールで開いたページでも動く）
+- 登録する JS は「引数1つを取る関数式」。要素に対して呼ぶものは (el, arg) を取る
+- 登録関数の中からは ff.<name> で他の登録関数を呼べる（同じオブジェクトリテラル内に展開されるため）
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+__all__ = ["register", "runtime_version", "runtime_script", "install_runtime", "ff_call", "ff_call_el"]
+
+_MISSING = "__ffMissing"
+
+_SOURCES: Dict[str, str] = {}
+# (version, init script, 入れ直し＋呼び出し, 入れ直し＋要素呼び出し)
+_built: Optional[Tuple[str, str, str, str]] = None
+
+_CALL_JS = f"""([n, v, a]) => {{
+  const ff = window.__ff;
+  return ff && ff.version === v ? ff[n](a) : {{ {_MISSING}: true }};
+}}"""
+
+_CALL_EL_JS = f"""(el, [n, v, a]) => {{
+  const ff = window.__ff;
+  return ff && ff.version === v ? ff[n](el, a) : {{ {_MISSING}: true }};
+}}"""
+
+
+def register(name: str, source: str) -> str:
+    """JS の関数式 source を window.__ff.<name> として登録する（source をそのまま返す）"""
+    global _built
+    src = source.strip()
+    if _SOURCES.get(name) != src:
+        _SOURCES[name] = src
+        _built = None
+    return source
+
+
+def _build() -> Tuple[str, str, str, str]:
+    global _built
+    if _built is None:
+        h = hashlib.sha1()
+        for name in sorted(_SOURCES):
+            h.update(name.encode("utf-8") + b"\0" + _SOURCES[name].encode("utf-8") + b"\0")
+        version = h.hexdigest()[:12]
+        entries = ",\n".join(f"    {name}: ({src})" for name, src in sorted(_SOURCES.items()))
+        body = (
+            f'const ff = {{\n    version: "{version}",\n{entries}\n  }};\n'
+            "  try {\n"
+            "    if (!(window.__ff && window.__ff.version === ff.version)) {\n"
+            '      Object.defineProperty(window, "__ff", { value: Object.freeze(ff), configurable: true });\n'
+            "    }\n"
+            "  } catch (e) {}\n"
+        )
+        _built = (
+            version,
+            f"(() => {{\n  {body}}})();",
+            f"([n, a]) => {{\n  {body}  return ff[n](a);\n}}",
+            f"(el, [n, a]) => {{\n  {body}  return ff[n](el, a);\n}}",
+        )
+    return _built
+
+
+def runtime_version() -> str:
+    return _build()[0]
+
+
+def runtime_script() -> str:
+    """add_init_script に渡すスクリプト（全フレームの文書生成時に window.__ff を定義）"""
+    return _build()[1]
+
+
+async def install_runtime(context: Any) -> None:
+    """BrowserContext に window.__ff を注入する（以降に開く全ページ・全フレームで有効）"""
+    await context.add_init_script(script=runtime_script())
+
+
+def _missing(res: Any) -> bool:
+    return isinstance(res, dict) and res.get(_MISSING) is True
+
+
+async def ff_call(target: Any, name: str, arg: Any = None) -> Any:
+    """Page/Frame 上で window.__ff.<name>(arg) を呼ぶ。未注入・旧版なら入れ直してから呼ぶ"""
+    version, _, install_call, _ = _build()
+    res = await target.evaluate(_CALL_JS, [name, version, arg])
+    if _missing(res):
+        res = await target.evaluate(install_call, [name, arg])
+    return res
+
+
+async def ff_call_el(handle: Any, name: str, arg: Any = None) -> Any:
+    """ElementHandle/Locator に対して window.__ff.<name>(el, arg) を呼ぶ"""
+    version, _, _, install_call_el = _build()
+    res = await handle.evaluate(_CALL_EL_JS, [name, version, arg])
+    if _missing(res):
+        res = await handle.evaluate(install_call_el, [name, arg])
+    return res
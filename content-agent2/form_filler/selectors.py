@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import weakref
+from typing import Any
+
 from bs4 import BeautifulSoup, Tag
+from .runtime import ff_call, ff_call_el, register
+from .url_classifier import BLOCK, UrlClassifier, default_classifier
 from .utils import css_escape, normalize
 
+# extract_labels_bulk で iframe 1つの抽出を待つ上限（秒）
+FRAME_EXTRACT_TIMEOUT = 3.0
+
 
 def selector_for(el: Tag) -> str:
     """Tagから安定CSSセレクタを生成"""
@@ -74,30 +84,124 @@ async def selector_for_locator(el) -> str:
             return "input"
 
 
+# get_label_text_for_locator の判定（label[for] → 祖先 label → dt → aria-labelledby → legend → 直前の兄弟 → 親）
+_LABEL_OF_JS = register("labelOf", r"""
+(n) => {
+  const byFor = (() => {
+      const id=n.getAttribute('id'); if(!id) return '';
+      const l=document.querySelector(`label[for="${id}"]`);
+      return l ? l.innerText.trim() : '';
+  })();
+  if (byFor) return byFor;
+  const wrap = n.closest('label'); if (wrap) return wrap.innerText.trim();
+  const dd = n.closest('dd'); if (dd && dd.previousElementSibling && dd.previousElementSibling.tagName.toLowerCase()==='dt') return dd.previousElementSibling.innerText.trim();
+  const ids=(n.getAttribute('aria-labelledby')||'').split(/\s+/).filter(Boolean);
+  const al = ids.map(id=>document.getElementById(id)?.innerText.trim()||'').filter(Boolean).join(' ');
+  if (al) return al;
+  const fs = n.closest('fieldset'); if (fs){ const lg=fs.querySelector('legend'); if(lg) return lg.innerText.trim(); }
+  let s=n.previousElementSibling; for(let i=0;i<3 && s;i++,s=s.previousElementSibling){ const t=(s.innerText||'').trim(); if(t && !s.querySelector('input,textarea,select,button')) return t.slice(0,64); }
+  const p = n.parentElement; if(p){ let s2=p.previousElementSibling; for(let i=0;i<3 && s2;i++,s2=s2.previousElementSibling){ const t=(s2.innerText||'').trim(); if(t && !s2.querySelector('input,textarea,select,button')) return t.slice(0,64); } }
+  return (n.parentElement?.innerText||'').trim().slice(0,64);
+}
+""")
+
+
 async def get_label_text_for_locator(frame, locator) -> str:
     """Locator から関連ラベルテキストを推定して返す（frameは互換用引数）"""
     try:
-        return (await locator.evaluate("""n => {
-            const byFor = (() => {
-                const id=n.getAttribute('id'); if(!id) return '';
-                const l=document.querySelector(`label[for="${id}"]`);
-                return l ? l.innerText.trim() : '';
-            })();
-            if (byFor) return byFor;
-            const wrap = n.closest('label'); if (wrap) return wrap.innerText.trim();
-            const dd = n.closest('dd'); if (dd && dd.previousElementSibling && dd.previousElementSibling.tagName.toLowerCase()==='dt') return dd.previousElementSibling.innerText.trim();
-            const ids=(n.getAttribute('aria-labelledby')||'').split(/\s+/).filter(Boolean);
-            const al = ids.map(id=>document.getElementById(id)?.innerText.trim()||'').filter(Boolean).join(' ');
-            if (al) return al;
-            const fs = n.closest('fieldset'); if (fs){ const lg=fs.querySelector('legend'); if(lg) return lg.innerText.trim(); }
-            let s=n.previousElementSibling; for(let i=0;i<3 && s;i++,s=s.previousElementSibling){ const t=(s.innerText||'').trim(); if(t && !s.querySelector('input,textarea,select,button')) return t.slice(0,64); }
-            const p = n.parentElement; if(p){ let s2=p.previousElementSibling; for(let i=0;i<3 && s2;i++,s2=s2.previousElementSibling){ const t=(s2.innerText||'').trim(); if(t && !s2.querySelector('input,textarea,select,button')) return t.slice(0,64); } }
-            return (n.parentElement?.innerText||'').trim().slice(0,64);
-        }""")) or ""
+        return (await ff_call_el(locator, "labelOf")) or ""
     except Exception:
         return ""
 
 
+# ページ内1回の evaluate で全コントロールの属性・ラベル・可視/personal/scope 判定を返す。
+# ラベルは登録済みの labelOf（get_label_text_for_locator と共通）をそのまま呼ぶ。
+# 可視/personal/scope は FormFiller._is_really_visible / _looks_personal / _within_scope と同じ判定をフレーム内で行う
+# （セレクタ生成は Python 側で selector_for_locator と同規則）。
+_SNAPSHOT_JS = register("snapshot", r"""
+(sc) => {
+  const scope = sc ? document.querySelector(sc) : null;
+  const personalRe = /(personal|private|kojin|個人)/i;
+  const vw = (window.innerWidth || document.documentElement.clientWidth);
+  const vh = (window.innerHeight || document.documentElement.clientHeight);
+  const hiddenMemo = new Map();
+  const hiddenNode = (n) => {
+    if (hiddenMemo.has(n)) return hiddenMemo.get(n);
+    const cs = getComputedStyle(n);
+    const v = n.hasAttribute('hidden') || n.getAttribute('aria-hidden') === 'true'
+      || cs.display === 'none' || cs.visibility === 'hidden' || parseFloat(cs.opacity) === 0;
+    hiddenMemo.set(n, v);
+    return v;
+  };
+  const visible = (el) => {
+    for (let n = el; n && n.nodeType === 1; n = n.parentElement) if (hiddenNode(n)) return false;
+    if (el.offsetParent === null) return false;
+    const r = el.getBoundingClientRect();
+    if (r.width === 0 || r.height === 0) return false;
+    if (r.right <= 0 || r.bottom <= 0 || r.left >= vw || r.top >= vh) return false;
+    return true;
+  };
+  const personal = (el) => {
+    for (let n = el; n && n.nodeType === 1; n = n.parentElement) {
+      const tokens = ((n.id||'') + ' ' + (n.getAttribute('name')||'') + ' ' + (n.className||'')).toLowerCase();
+      if (personalRe.test(tokens)) return true;
+    }
+    return false;
+  };
+  const nth = (e) => {
+    const p = e.parentNode; if (!p) return 1;
+    return 1 + Array.from(p.querySelectorAll(e.tagName) || []).indexOf(e);
+  };
+  const attrs = ['name', 'placeholder', 'aria-label', 'id', 'class', 'type', 'required'];
+  return Array.from(document.querySelectorAll('input, textarea, select')).map(el => {
+    const a = {};
+    for (const k of attrs) { const v = el.getAttribute(k); if (v) a[k] = v; }
+    let label = '';
+    try { label = ff.labelOf(el); } catch (e) {}
+    return {
+      tag: el.tagName.toLowerCase(),
+      attrs: a,
+      label,
+      nth: nth(el),
+      visible: visible(el),
+      personal: personal(el),
+      inScope: sc ? !!(scope && scope.contains(el)) : true,
+    };
+  });
+}
+""")
+
+
+def selector_from_snapshot(item: dict) -> str:
+    """snapshot_form_controls の1件から selector_for_locator と同じ規則でセレクタを組み立てる"""
+    tag = (item.get("tag") or "").strip() or "input"
+    attrs = item.get("attrs") or {}
+    if attrs.get("id"):
+        return f"#{css_escape(attrs['id'])}"
+    for key in ("name", "aria-label", "placeholder"):
+        if attrs.get(key):
+            return f'{tag}[{key}="{css_escape(attrs[key])}"]'
+    try:
+        idx = int(item.get("nth") or 1)
+    except Exception:
+        idx = 1
+    return f"{tag}:nth-of-type({idx})"
+
+
+async def snapshot_form_controls(frame, scope_selector: str | None = None) -> list[dict]:
+    """
+    フレーム内の input/textarea/select を1回の evaluate で列挙する。
+    各要素: tag, attrs(name/placeholder/aria-label/id/class/type/required), label, visible,
+    personal, inScope, selector。失敗時は例外をそのまま送出する（呼び出し側で旧経路へ）。
+    """
+    items = await ff_call(frame, "snapshot", scope_selector)
+    if not isinstance(items, list):
+        raise TypeError(f"unexpected snapshot result: {type(items).__name__}")
+    for item in items:
+        item["selector"] = selector_from_snapshot(item)
+    return items
+
+
 def extract_label_text(el: Tag, soup: BeautifulSoup) -> str:
     """BeautifulSoup上で要素に関連するラベルテキストを抽出（既存互換）。"""
     if not isinstance(el, Tag):
@@ -163,190 +267,286 @@ def extract_label_text(el: Tag, soup: BeautifulSoup) -> str:
 # 一括ラベル抽出（企業フォーム限定スコープに対応）
 # ========================
 
-async def extract_labels_bulk(page, scope_selector: str | None = None) -> list[dict]:
+# extract_labels_bulk のフレーム別キャッシュ: frame -> {scope_selector: (token, items)}
+# token は文書ごとの乱数IDと MutationObserver の世代番号。DOM が変わっていなければ再走査しない。
+_LABELS_CACHE: "weakref.WeakKeyDictionary[Any, dict]" = weakref.WeakKeyDictionary()
+
+# 文書に1度だけ MutationObserver を仕込み、変更のたびに世代番号を進める。
+# known と同じ token なら items を返さない（Python 側のキャッシュを使う）。
+_LABELS_GEN_JS = register("labelsGen", """
+(known) => {
+  let st = window.__ffLabelsGen;
+  if (!st || st.doc !== document) {
+    st = { doc: document, id: Math.random().toString(36).slice(2), gen: 0 };
+    const bump = () => { st.gen++; };
+    try {
+      new MutationObserver(bump).observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+      window.addEventListener("resize", bump);
+      // 後から読み込まれた CSS で可視性が変わる場合に備え、サブリソースの load でも進める
+      document.addEventListener("load", bump, true);
+    } catch (_) { st.id = ""; }
+    window.__ffLabelsGen = st;
+  }
+  const token = st.id ? `${st.id}:${st.gen}` : "";
+  return { token, fresh: !!token && token === known };
+}
+""")
+
+
+# extract_labels_bulk の抽出本体（フレーム1つ分）
+_LABELS_JS = register("labels", """
+(scopeSel) => {
+  const root = scopeSel ? document.querySelector(scopeSel) : document;
+  const toText = (s) => (s || "").replace(/\\s+/g, " ").trim();
+  const toInt  = (s) => { const n = parseInt(s, 10); return Number.isFinite(n) ? n : ""; };
+  const nodes = Array.from((root || document).querySelectorAll("input, textarea, select, button[type=submit]"));
+  const cssPath = (el) => {
+    try {
+      const elId = toText(el.getAttribute("id"));
+      if (elId) return `#${CSS.escape(elId)}`;
+      const path = [];
+      let cur = el;
+      while (cur && cur.nodeType === 1 && cur !== (root || document)) {
+        const tn = cur.tagName.toLowerCase();
+        let nth = 1, sib = cur;
+        while ((sib = sib.previousElementSibling)) if ((sib.tagName || "").toLowerCase() === tn) nth++;
+        path.unshift(`${tn}:nth-of-type(${nth})`);
+        cur = cur.parentElement;
+      }
+      return path.join(" > ");
+    } catch (_) { return ""; }
+  };
+  const items = [];
+  for (const el of nodes) {
+    const tag = (el.tagName || "").toLowerCase();
+    const form = el.form || el.closest("form");
+    const type = (el.getAttribute("type") || "").toLowerCase();
+    const name = toText(el.getAttribute("name"));
+    const id   = toText(el.getAttribute("id"));
+    const cls  = toText(el.getAttribute("class"));
+    const ph   = toText(el.getAttribute("placeholder"));
+    const aria = toText(el.getAttribute("aria-label"));
+    const ac   = toText(el.getAttribute("autocomplete"));
+    const req  = el.hasAttribute("required");
+    const pat  = toText(el.getAttribute("pattern"));
+    const mxl  = toText(el.getAttribute("maxlength"));
+    const ariaLb = toText(el.getAttribute("aria-labelledby"));
+    const ariaDb = toText(el.getAttribute("aria-describedby"));
+    const role = toText(el.getAttribute("role"));
+    const rectObj = (() => {
+      try {
+        const r = el.getBoundingClientRect();
+        return { x: (r.x ?? r.left ?? 0), y: (r.y ?? r.top ?? 0), width: (r.width ?? 0), height: (r.height ?? 0) };
+      } catch (_) { return { x:0, y:0, width:0, height:0 }; }
+    })();
+    const visible = (() => {
+      const r = el.getClientRects();
+      if (!r || r.length === 0) return false;
+      let n = el;
+      while (n && n.nodeType === 1) {
+        const cs = getComputedStyle(n);
+        if (n.hasAttribute("hidden") || cs.display === "none" || cs.visibility === "hidden" || parseFloat(cs.opacity || "1") === 0) return false;
+        n = n.parentElement;
+      }
+      return true;
+    })();
+    let labelText = "";
+    try {
+      const forId = el.getAttribute("id");
+      if (forId) {
+        const lbl = (root || document).querySelector(`label[for="${CSS.escape(forId)}"]`);
+        if (lbl) labelText = toText(lbl.textContent || "");
+      }
+      if (!labelText) {
+        const wrap = el.closest("label");
+        if (wrap) labelText = toText(wrap.textContent || "");
+      }
+      if (!labelText) {
+        // <dl><dt>…</dt><dd><input/></dd> やテーブルの見出しも拾う
+        const dd = el.closest("dd");
+        const dt = dd && dd.previousElementSibling && dd.previousElementSibling.tagName.toLowerCase()==="dt" ? dd.previousElementSibling : null;
+        if (dt) labelText = toText(dt.textContent || "");
+      }
+      if (!labelText) {
+        const th = el.closest("tr")?.querySelector("th");
+        if (th) labelText = toText(th.textContent || "");
+      }
+    } catch (_) {}
+    items.push({
+      tag, type, name, id, "class": cls, placeholder: ph, ariaLabel: aria, labelText, visible,
+      autocomplete: ac, required: req, pattern: pat, maxlength: toInt(mxl),
+      ariaLabelledby: ariaLb, ariaDescribedby: ariaDb, role,
+      rect: rectObj,
+      selector: cssPath(el),
+      // フォームフレームワーク判定用（frameworks パッケージ）
+      formSelector: form ? cssPath(form) : "",
+      formClass: form ? toText(`${form.getAttribute("class") || ""} ${(form.parentElement && form.parentElement.getAttribute("class")) || ""}`) : "",
+      formAction: form ? toText(form.getAttribute("action")) : "",
+      frameUrl: (document && document.location ? String(document.location.href) : "")
+    });
+  }
+  return items;
+}
+""")
+
+
+async def _labels_for_frame(frame, scope_selector: str | None) -> list[dict]:
+    """フレーム1つ分の抽出。DOM 世代が前回と同じならキャッシュを返す"""
+    try:
+        per_frame = _LABELS_CACHE.get(frame)
+    except TypeError:
+        per_frame = None
+    cached = per_frame.get(scope_selector) if per_frame else None
+    try:
+        state = await ff_call(frame, "labelsGen", cached[0] if cached else "")
+    except Exception:
+        state = None
+    token = state.get("token") if isinstance(state, dict) else ""
+    if cached and isinstance(state, dict) and state.get("fresh"):
+        # 呼び出し側が rect などの入れ子まで書き換えてもキャッシュを汚さないよう深いコピーを返す
+        return copy.deepcopy(cached[1])
+
+    items = await ff_call(frame, "labels", scope_selector)
+    if not isinstance(items, list):
+        return items
+    if token:
+        try:
+            _LABELS_CACHE.setdefault(frame, {})[scope_selector] = (token, items)
+        except TypeError:
+            pass
+    return copy.deepcopy(items) if token else items
+
+
+async def extract_labels_bulk(
+    page,
+    scope_selector: str | None = None,
+    *,
+    frame_timeout: float = FRAME_EXTRACT_TIMEOUT,
+    classifier: UrlClassifier | None = None,
+) -> list[dict]:
     """
     入力要素とラベルのペアを一括抽出（frameも横断）。scope_selector を渡すと、その配下だけに限定。
+    DOM に変更がなければフレームごとに前回の抽出結果を再利用する。
+    iframe は並行に抽出し、frame_timeout 秒で応答しないものは空として扱う。
+    classifier は広告 iframe の判定に使う（実行時の --blocklist/--allowlist を反映したもの。省略時は既定リスト）。
 
     取得フィールド（従来＋追加）:
       - 従来: tag, type, name, id, class, placeholder, ariaLabel, labelText, visible, selector
       - 追加: autocomplete, required(bool), pattern, maxlength(int|""), ariaLabelledby, ariaDescribedby, role,
               rect({x,y,width,height}), frameUrl
+      - フォーム文脈: formSelector, formClass（form と親要素の class）, formAction
     戻り値: List[dict]
     """
-    js = """
-    (scopeSel) => {
-      const root = scopeSel ? document.querySelector(scopeSel) : document;
-      const toText = (s) => (s || "").replace(/\\s+/g, " ").trim();
-      const toInt  = (s) => { const n = parseInt(s, 10); return Number.isFinite(n) ? n : ""; };
-      const nodes = Array.from((root || document).querySelectorAll("input, textarea, select, button[type=submit]"));
-      const items = [];
-      for (const el of nodes) {
-        const tag = (el.tagName || "").toLowerCase();
-        const type = (el.getAttribute("type") || "").toLowerCase();
-        const name = toText(el.getAttribute("name"));
-        const id   = toText(el.getAttribute("id"));
-        const cls  = toText(el.getAttribute("class"));
-        const ph   = toText(el.getAttribute("placeholder"));
-        const aria = toText(el.getAttribute("aria-label"));
-        const ac   = toText(el.getAttribute("autocomplete"));
-        const req  = el.hasAttribute("required");
-        const pat  = toText(el.getAttribute("pattern"));
-        const mxl  = toText(el.getAttribute("maxlength"));
-        const ariaLb = toText(el.getAttribute("aria-labelledby"));
-        const ariaDb = toText(el.getAttribute("aria-describedby"));
-        const role = toText(el.getAttribute("role"));
-        const rectObj = (() => {
-          try {
-            const r = el.getBoundingClientRect();
-            return { x: (r.x ?? r.left ?? 0), y: (r.y ?? r.top ?? 0), width: (r.width ?? 0), height: (r.height ?? 0) };
-          } catch (_) { return { x:0, y:0, width:0, height:0 }; }
-        })();
-        const visible = (() => {
-          const r = el.getClientRects();
-          if (!r || r.length === 0) return false;
-          let n = el;
-          while (n && n.nodeType === 1) {
-            const cs = getComputedStyle(n);
-            if (n.hasAttribute("hidden") || cs.display === "none" || cs.visibility === "hidden" || parseFloat(cs.opacity || "1") === 0) return false;
-            n = n.parentElement;
-          }
-          return true;
-        })();
-        let labelText = "";
-        try {
-          const forId = el.getAttribute("id");
-          if (forId) {
-            const lbl = (root || document).querySelector(`label[for="${CSS.escape(forId)}"]`);
-            if (lbl) labelText = toText(lbl.textContent || "");
-          }
-          if (!labelText) {
-            const wrap = el.closest("label");
-            if (wrap) labelText = toText(wrap.textContent || "");
-          }
-          if (!labelText) {
-            // <dl><dt>…</dt><dd><input/></dd> やテーブルの見出しも拾う
-            const dd = el.closest("dd");
-            const dt = dd && dd.previousElementSibling && dd.previousElementSibling.tagName.toLowerCase()==="dt" ? dd.previousElementSibling : null;
-            if (dt) labelText = toText(dt.textContent || "");
-          }
-          if (!labelText) {
-            const th = el.closest("tr")?.querySelector("th");
-            if (th) labelText = toText(th.textContent || "");
-          }
-        } catch (_) {}
-        items.push({
-          tag, type, name, id, "class": cls, placeholder: ph, ariaLabel: aria, labelText, visible,
-          autocomplete: ac, required: req, pattern: pat, maxlength: toInt(mxl),
-          ariaLabelledby: ariaLb, ariaDescribedby: ariaDb, role,
-          rect: rectObj,
-          selector: (() => {
-            try {
-              if (id) return `#${CSS.escape(id)}`;
-              const path = [];
-              let cur = el;
-              while (cur && cur.nodeType === 1 && cur !== (root || document)) {
-                const tn = cur.tagName.toLowerCase();
-                let nth = 1, sib = cur;
-                while ((sib = sib.previousElementSibling)) if ((sib.tagName || "").toLowerCase() === tn) nth++;
-                path.unshift(`${tn}:nth-of-type(${nth})`);
-                cur = cur.parentElement;
-              }
-              return path.join(" > ");
-            } catch (_) { return ""; }
-          })(),
-          frameUrl: (document && document.location ? String(document.location.href) : "")
-        });
-      }
-      return items;
-    }
-    """
-    # 1) ページ直下
-    results = await page.evaluate(js, scope_selector)
-    # 2) すべての iframe
-    for fr in page.frames:
-        if fr == page.main_frame:
-            continue
+    # ページ直下とすべての iframe を並行に抽出（広告・解析の iframe は対象外）
+    clf = classifier or default_classifier()
+    frames = [
+        fr for fr in page.frames
+        if fr != page.main_frame and clf.classify(getattr(fr, "url", "") or "", count=False) != BLOCK
+    ]
+
+    async def _iframe(fr) -> list[dict]:
         try:
-            part = await fr.evaluate(js, scope_selector)
-            if isinstance(part, list):
-                results.extend(part)
+            part = await asyncio.wait_for(_labels_for_frame(fr, scope_selector), frame_timeout)
+            return part if isinstance(part, list) else []
         except Exception:
-            pass
+            return []
+
+    main, *parts = await asyncio.gather(
+        _labels_for_frame(page, scope_selector),
+        *(_iframe(fr) for fr in frames),
+    )
+    results = main
+    for part in parts:
+        results.extend(part)
     return results
 
 
+# セレクタの要素が表示されているか（display/visibility/opacity と描画矩形）
+_VISIBLE_JS = register("visible", r"""
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return false;
+  const cs = getComputedStyle(el);
+  if (!cs) return false;
+  if (cs.display === 'none' || cs.visibility === 'hidden' || parseFloat(cs.opacity || '1') === 0) return false;
+  const r = el.getClientRects();
+  return !!(r && r.length > 0);
+}
+""")
+
+
+# fallback_fill_textarea の対象（無名/本文らしい先頭の textarea）の CSS パス
+_TEXTAREA_TARGET_JS = register("textareaTarget", r"""
+(sc) => {
+  const root = sc ? document.querySelector(sc) : document;
+  if (!root) return null;
+  const list = Array.from(root.querySelectorAll('textarea')).filter(t => {
+    const nm = t.getAttribute('name') || '';
+    return !nm || /message|inquiry|detail|お問い合わせ|内容/.test(nm);
+  });
+  return list.length ? (() => {
+    const t = list[0];
+    const sel = (() => {
+      if (t.id) return '#'+CSS.escape(t.id);
+      const parts=[]; for (let n=t; n && n.nodeType===1 && n!==document; n=n.parentElement) {
+        if (n.id) { parts.unshift('#'+CSS.escape(n.id)); break; }
+        const tn=n.tagName.toLowerCase(); let i=1,s=n;
+        while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
+        parts.unshift(`${tn}:nth-of-type(${i})`);
+      } return parts.join(' > ');
+    })();
+    return sel;
+  })() : null;
+}
+""")
+
+
 async def fallback_fill_textarea(page, text: str, dry_run: bool = False, scope_selector: str | None = None):
     """
     ラベルなし/無名の textarea に救済入力（1個だけ）。scope 指定時は配下限定。
     """
-    js = r"""
-    (sc) => {
-      const root = sc ? document.querySelector(sc) : document;
-      if (!root) return null;
-      const list = Array.from(root.querySelectorAll('textarea')).filter(t => {
-        const nm = t.getAttribute('name') || '';
-        return !nm || /message|inquiry|detail|お問い合わせ|内容/.test(nm);
-      });
-      return list.length ? (() => {
-        const t = list[0];
-        const sel = (() => {
-          if (t.id) return '#'+CSS.escape(t.id);
-          const parts=[]; for (let n=t; n && n.nodeType===1 && n!==document; n=n.parentElement) {
-            if (n.id) { parts.unshift('#'+CSS.escape(n.id)); break; }
-            const tn=n.tagName.toLowerCase(); let i=1,s=n;
-            while ((s=s.previousElementSibling)) if (s.tagName && s.tagName.toLowerCase()===tn) i++;
-            parts.unshift(`${tn}:nth-of-type(${i})`);
-          } return parts.join(' > ');
-        })();
-        return sel;
-      })() : null;
-    }
-    """
-    sel = await page.evaluate(js, scope_selector)
+    sel = await ff_call(page, "textareaTarget", scope_selector)
     if not sel:
         return
     # 可視性チェック（非表示は書き込まない）
-    is_visible = await page.evaluate(
-        "(sel)=>{const el=document.querySelector(sel); if(!el) return false; const cs=getComputedStyle(el); if(cs.display==='none'||cs.visibility==='hidden'||parseFloat(cs.opacity||'1')===0) return false; const r=el.getClientRects(); return r && r.length>0; }",
-        sel
-    )
+    is_visible = await ff_call(page, "visible", sel)
     if not is_visible:
         return
     # dry-run でも page.fill を使う（evaluate 直書きはしない）
     await page.fill(sel, text)
 
 
+# fallback_select_defaults の対象（選択肢2つ以上の select）の CSS パス
+_SELECT_TARGETS_JS = register("selectTargets", r"""
+(sc) => {
+  const root = sc ? document.querySelector(sc) : document;
+  if (!root) return [];
+  const sels = Array.from(root.querySelectorAll('select'));
+  const targets = sels.filter(s => s.options && s.options.length >= 2);
+  return targets.map(s => {
+    const sel = (() => {
+      if (s.id) return '#'+CSS.escape(s.id);
+      const parts=[]; for (let n=s; n && n.nodeType===1 && n!==document; n=n.parentElement) {
+        if (n.id) { parts.unshift('#'+CSS.escape(n.id)); break; }
+        const tn=n.tagName.toLowerCase(); let i=1,x=n;
+        while ((x=x.previousElementSibling)) if (x.tagName && x.tagName.toLowerCase()===tn) i++;
+        parts.unshift(`${tn}:nth-of-type(${i})`);
+      } return parts.join(' > ');
+    })();
+    return sel;
+  });
+}
+""")
+
+
 async def fallback_select_defaults(page, scope_selector: str | None = None):
     """
     単独 select がある場合に第2候補などを既定設定。scope 指定時は配下限定。
     """
-    js = r"""
-    (sc) => {
-      const root = sc ? document.querySelector(sc) : document;
-      if (!root) return [];
-      const sels = Array.from(root.querySelectorAll('select'));
-      const targets = sels.filter(s => s.options && s.options.length >= 2);
-      return targets.map(s => {
-        const sel = (() => {
-          if (s.id) return '#'+CSS.escape(s.id);
-          const parts=[]; for (let n=s; n && n.nodeType===1 && n!==document; n=n.parentElement) {
-            if (n.id) { parts.unshift('#'+CSS.escape(n.id)); break; }
-            const tn=n.tagName.toLowerCase(); let i=1,x=n;
-            while ((x=x.previousElementSibling)) if (x.tagName && x.tagName.toLowerCase()===tn) i++;
-            parts.unshift(`${tn}:nth-of-type(${i})`);
-          } return parts.join(' > ');
-        })();
-        return sel;
-      });
-    }
-    """
-    sels = await page.evaluate(js, scope_selector)
+    sels = await ff_call(page, "selectTargets", scope_selector)
     for sel in sels[:1]:
         # 非表示 select は対象外
-        vis = await page.evaluate(
-            "(sel)=>{const el=document.querySelector(sel); if(!el) return false; const cs=getComputedStyle(el); if(cs.display==='none'||cs.visibility==='hidden'||parseFloat(cs.opacity||'1')===0) return false; const r=el.getClientRects(); return r && r.length>0; }",
-            sel
-        )
+        vis = await ff_call(page, "visible", sel)
         if not vis:
             continue
         try:
@@ -0,0 +1,120 @@
+"""
+複数プロセスでの分割実行（--processes N）
+
+入力CSVをドメイン単位でシャードに分け、各子プロセスが独自のイベントループと
+ブラウザプールで FormFiller.run_tasks を実行する。結果は親が入力順に1つのCSVへまとめる。
+- 同一ドメインは必ず同じプロセスに入るため、ドメイン別レート制限はそのまま有効
+- グローバルレート制限はプロセス数で按分して各子へ渡す
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from .models import FormResult, FormTask
+
+__all__ = ["shard_key", "shard_tasks", "run_sharded"]
+
+logger = logging.getLogger(__name__)
+
+
+def shard_key(form_url: str) -> str:
+    """シャード振り分け用のホスト名（小文字・www. 除去）"""
+    try:
+        host = (urlparse(form_url).hostname or "").lower()
+    except Exception:
+        host = ""
+    if host.startswith("www."):
+        host = host[4:]
+    return host or (form_url or "")
+
+
+def shard_tasks(tasks: List[FormTask], processes: int) -> List[List[FormTask]]:
+    """crc32(ホスト名) でタスクを分割（空シャードは除外、各シャード内は入力順を維持）"""
+    n = max(1, int(processes or 1))
+    shards: List[List[FormTask]] = [[] for _ in range(n)]
+    for task in tasks:
+        idx = zlib.crc32(shard_key(task.form_url).encode("utf-8")) % n
+        shards[idx].append(task)
+    return [s for s in shards if s]
+
+
+def _run_shard(filler_kwargs: Dict[str, Any], tasks: List[FormTask], emit_json: bool, log_level: str) -> Dict[int, FormResult]:
+    """子プロセスのエントリポイント（spawn 起動のためモジュールトップレベルに置く）"""
+    from .core import FormFiller
+    from .logging_setup import setup_logging
+
+    setup_logging(log_level)
+    filler = FormFiller(**filler_kwargs)
+    filler.emit_json = bool(emit_json)
+    return asyncio.run(filler.run_tasks(tasks))
+
+
+def run_sharded(
+    filler_kwargs: Dict[str, Any],
+    input_file: str,
+    data_file: str,
+    output_file: str,
+    *,
+    processes: int,
+    emit_json: bool = False,
+    limit: Optional[int] = None,
+    log_level: str = "INFO",
+) -> int:
+    """
+    入力をドメイン単位で N プロセスに分割して実行し、結果を入力順で output_file に書き出す。
+    戻り値は処理件数。子プロセスが異常終了したシャードの行は ERROR として記録する。
+    """
+    from .constants import DEFAULT_LEXICON_CACHE_DIR
+    from .core import FormFiller
+    from .lexicon import lexicon_sources, load_lexicon
+
+    tasks = FormFiller.load_tasks(input_file, data_file, limit=limit)
+    shards = shard_tasks(tasks, processes)
+    kwargs = dict(filler_kwargs)
+    if shards:
+        kwargs["global_rate_per_min"] = float(kwargs.get("global_rate_per_min", 60.0)) / len(shards)
+    logger.info(f"分割実行: {len(tasks)} 件を {len(shards)} プロセスで処理")
+
+    results: Dict[int, FormResult] = {}
+    if shards:
+        # 語彙キャッシュを親で一度だけ作っておき、子プロセスは YAML を読まずに済むようにする
+        try:
+            load_lexicon(lexicon_sources(kwargs.get("lexicon")), DEFAULT_LEXICON_CACHE_DIR)
+        except Exception as e:
+            logger.debug(f"lexiconキャッシュの事前構築に失敗: {e}")
+        # Playwright/asyncio を fork 後に引き継がないよう spawn で起動
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=ctx) as executor:
+            futures = [
+                (shard, executor.submit(_run_shard, kwargs, shard, emit_json, log_level))
+                for shard in shards
+            ]
+            for shard, future in futures:
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    logger.error(f"シャード実行エラー: {e}")
+                    for task in shard:
+                        results.setdefault(task.index, FormResult(
+                            form_url=task.form_url,
+                            status="ERROR",
+                            note=f"worker process failed: {e}",
+                            timestamp=datetime.now().isoformat(),
+                        ))
+
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        f.write("form_url,status,note,timestamp,unmapped_fields\n")
+        for task in tasks:
+            result = results.get(task.index)
+            if result is not None:
+                f.write(result.to_csv_line())
+    logger.info(f"処理完了: {len(tasks)} 件")
+    return len(tasks)
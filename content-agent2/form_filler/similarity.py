@@ -0,0 +1,67 @@
+"""
+文字 n-gram による軽量な類似度（find_best_field_match の類似加点用）
+
+difflib.SequenceMatcher は比較のたびに文字列同士を照合し直す（最悪で二乗）。ここでは文字列ごとに
+n-gram の集合（ハッシュ値の frozenset）を一度だけ作り、比較は集合の積だけで済ませる。
+- cosine: |A∩B| / sqrt(|A||B|)、jaccard: |A∩B| / |A∪B|
+- similar(): 大きさの比から上限を出し、閾値に届かない組は積を取らずに落とす
+"""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+__all__ = ["NgramProfile", "ngram_profile", "cosine", "jaccard", "similar"]
+
+NGRAM = 2
+
+
+class NgramProfile:
+    """文字列1つ分の n-gram 集合（不変）"""
+
+    __slots__ = ("grams", "size")
+
+    def __init__(self, grams: FrozenSet[int]) -> None:
+        self.grams = grams
+        self.size = len(grams)
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+
+_EMPTY = NgramProfile(frozenset())
+
+
+@lru_cache(maxsize=8192)
+def ngram_profile(text: Optional[str], n: int = NGRAM) -> NgramProfile:
+    """text（正規化済みを想定）の n-gram 集合。n 文字未満の文字列はそれ自体を1つの gram とする"""
+    if not text:
+        return _EMPTY
+    if len(text) < n:
+        return NgramProfile(frozenset((hash(text),)))
+    return NgramProfile(frozenset(hash(text[i:i + n]) for i in range(len(text) - n + 1)))
+
+
+def cosine(a: Optional[NgramProfile], b: Optional[NgramProfile]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a.grams & b.grams) / math.sqrt(a.size * b.size)
+
+
+def jaccard(a: Optional[NgramProfile], b: Optional[NgramProfile]) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a.grams & b.grams)
+    return inter / (a.size + b.size - inter)
+
+
+def similar(a: Optional[NgramProfile], b: Optional[NgramProfile], threshold: float) -> bool:
+    """cosine(a, b) > threshold。集合の大きさだけで上限 sqrt(min/max) が閾値以下なら計算しない"""
+    if not a or not b:
+        return False
+    lo, hi = (a.size, b.size) if a.size <= b.size else (b.size, a.size)
+    if lo <= threshold * threshold * hi:
+        return False
+    return cosine(a, b) > threshold
@@ -1,10 +1,24 @@
+"""
+送信成功判定
+
+check_success（core）はここの race_success で、送信後の検出器を並行に走らせ、最初に決着した結果を返す。
+  - URL 変化（完了系 URL なら成功）、任意の POST 応答、問い合わせ系 POST の JSON/本文、
+    ページ内プローブ（完了文言・入力欄のクリア・入力エラー表示）、フレームワーク固有の成功表示（呼び出し側が追加）
+  - 全体で1つの締め切り。どれも決着しなければ失敗（POST も URL 変化も無ければ |no_post_detected）
+  - 入力欄のクリア・入力エラー表示は、POST 応答か URL 変化を見るか PROBE_GRACE 秒経つまでは決め手にしない
+    （送信と同時に JS が欄を空にするページ、送信前から残っているエラー表示で早合点しないため）
+"""
+
 from __future__ import annotations
 
-from typing import Iterable, List
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Sequence, Tuple
 
+from .runtime import ff_call, register
 
-# check_success は FormFiller に依存するため、現時点では core 内に保持。
-# ここでは有用な成功判定の語彙と軽量ユーティリティのみ提供する。
+# 検出器: 決着したら (成否, note)、決着しなければ None を返す
+Detector = Callable[[], Awaitable[Optional[Tuple[bool, str]]]]
 
 DEFAULT_SUCCESS_PHRASES_JA: List[str] = [
     "お問い合わせありがとうございました",
@@ -41,3 +55,153 @@ def looks_like_success_text(text: str, *, phrases: Iterable[str] | None = None)
         if p.lower() in txt:
             return True
     return False
+
+
+# 入力欄のクリア・エラー表示だけで決着させるまでの猶予（秒）。POST/URL 変化を見たら待たない
+PROBE_GRACE = 1.5
+
+# 完了ページらしい URL の断片
+THANKS_URL_TOKENS = ("/thanks", "/complete", "/success", "/thank", "done", "sent")
+# 問い合わせ送信らしい POST 先の語
+FORM_POST_KEYWORDS = ("contact", "inquiry", "form", "wpcf7", "submit", "send", "mail")
+
+# 完了文言（描画されている本文に含まれる最初のもの）・送信したフォームの入力欄の7割以上が空か・入力エラー表示が見えているか
+# form は送信したフォームの要素（無ければ最初の form）。送信後に外されていればクリア判定はしない
+_SUCCESS_PROBE_JS = register("successProbe", r"""
+({ phrases, form }) => {
+  const text = document.body ? (document.body.innerText || '') : '';
+  const phrase = phrases.find((p) => text.includes(p)) || null;
+  let cleared = false;
+  const f = form ? (form.isConnected ? form : null) : document.querySelector('form');
+  if (f) {
+    const fields = Array.from(f.querySelectorAll('input[type=text], input[type=email], textarea'));
+    if (fields.length) cleared = fields.filter((x) => !x.value || x.value.trim() === '').length / fields.length >= 0.7;
+  }
+  const invalid = Array.from(document.querySelectorAll('[aria-invalid="true"], .wpcf7-not-valid-tip, .is-invalid, .has-error'))
+    .some((el) => el.getClientRects().length > 0);
+  return { phrase, cleared, invalid };
+}
+""")
+
+
+def is_thanks_url(url: str) -> bool:
+    u = (url or "").lower()
+    return any(k in u for k in THANKS_URL_TOKENS)
+
+
+def _is_post(resp: Any) -> bool:
+    try:
+        return resp.request.method in ("POST", "PUT")
+    except Exception:
+        return False
+
+
+def _is_form_post(resp: Any) -> bool:
+    try:
+        return _is_post(resp) and any(k in resp.url.lower() for k in FORM_POST_KEYWORDS)
+    except Exception:
+        return False
+
+
+async def judge_post_response(response: Any) -> Optional[Tuple[bool, str]]:
+    """問い合わせ系 POST の応答から成功を判定（JSON の success/status、本文の完了語）。判定できなければ None"""
+    if not response or not response.ok:
+        return None
+    ctype = (response.headers.get("content-type") or "").lower()
+    try:
+        if "application/json" in ctype:
+            data = await response.json()
+            if isinstance(data, dict) and (data.get("success") or data.get("status") in ("success", "ok", "sent", True)):
+                return True, f"post_json_success:{response.url}"
+            if any(k in json.dumps(data).lower() for k in ["ok", "sent", "thank", "ありがとうございます"]):
+                return True, f"post_json_heuristic:{response.url}"
+        else:
+            txt = (await response.text()).lower()
+            if any(k in txt for k in ["ありがとうございます", "送信", "完了"]):
+                return True, f"post_text_success:{response.url}"
+    except Exception:
+        pass
+    return None
+
+
+async def race_success(
+    page: Any,
+    original_url: str,
+    *,
+    deadline: float,
+    phrases: Optional[Sequence[str]] = None,
+    extra: Iterable[Detector] = (),
+    form: Any = None,
+    poll: float = 0.25,
+    grace: float = PROBE_GRACE,
+) -> Tuple[bool, str]:
+    """
+    送信後の検出器を並行に走らせ、最初に決着したものの (成否, note) を返す。deadline 秒で打ち切り。
+    URL 変化・任意の POST は単独では決着せず、posted（note の |post_detected / |no_post_detected）にだけ効く。
+    form は送信したフォームの ElementHandle（入力欄のクリア判定をそのフォームに限る）。
+    入力欄のクリア・エラー表示は posted になるか grace 秒経つまで決着に使わない。
+    """
+    timeout_ms = max(int(deadline * 1000), 1)
+    phrase_list = list(phrases or DEFAULT_SUCCESS_PHRASES_JA)
+    posted = False
+
+    async def url_change() -> Optional[Tuple[bool, str]]:
+        nonlocal posted
+        await page.wait_for_function("(u) => window.location.href !== u", arg=original_url, timeout=timeout_ms)
+        posted = True
+        return (True, "url_change") if is_thanks_url(page.url) else None
+
+    async def any_post() -> Optional[Tuple[bool, str]]:
+        nonlocal posted
+        await page.wait_for_response(_is_post, timeout=timeout_ms)
+        posted = True
+        return None
+
+    async def form_post() -> Optional[Tuple[bool, str]]:
+        return await judge_post_response(await page.wait_for_response(_is_form_post, timeout=timeout_ms))
+
+    async def probe() -> Optional[Tuple[bool, str]]:
+        nonlocal form
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        while True:
+            try:
+                res = await ff_call(page, "successProbe", {"phrases": phrase_list, "form": form})
+            except Exception:
+                # 遷移中などで評価できない間は次の周期へ。
+                # フォームのハンドルが使えなくなった（遷移で破棄・別フレーム）なら以降は文書全体で判定する
+                form = None
+                res = None
+            if isinstance(res, dict):
+                if res.get("phrase"):
+                    return True, f"visible_phrase:{res['phrase']}" + ("|post_detected" if posted else "")
+                if posted or loop.time() - started >= grace:
+                    # エラー表示が出ていれば、入力欄が空でも（未入力のまま弾かれた等）失敗とする
+                    if res.get("invalid"):
+                        return False, "validation_error"
+                    if res.get("cleared"):
+                        return True, "fields_cleared"
+            await asyncio.sleep(poll)
+
+    tasks = [asyncio.ensure_future(d()) for d in (url_change, any_post, form_post, probe, *extra)]
+    try:
+        for fut in asyncio.as_completed(tasks, timeout=deadline):
+            try:
+                res = await fut
+            except asyncio.TimeoutError:
+                raise
+            except Exception:
+                continue
+            if res is not None:
+                return res
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    note = "no_success_indicator"
+    if not posted:
+        note += "|no_post_detected"
+    return False, note
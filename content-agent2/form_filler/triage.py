@@ -0,0 +1,124 @@
+"""
+URL トリアージ（--triage）
+
+ブラウザへ回す前に全 URL を aiohttp で並行に軽く叩き、明らかに処理できない行を即座に結果化する。
+- 名前解決失敗・接続拒否 → 到達不能
+- 404 / 410 → ページなし（403/429/5xx 等は bot 対策や一時障害の可能性があるためブラウザへ回す）
+- 先頭 256KB を読み、<form>/<input>/<textarea>/<iframe> も埋め込みフォームの痕跡も無い HTML → フォームなし
+  （本文を最後まで読めた場合に限る。判定できないものは常にブラウザへ回す安全側）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import socket
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+from .http_fastpath import DEFAULT_HEADERS, new_connector
+
+__all__ = ["TriageVerdict", "UrlTriage", "sniff_html"]
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 256 * 1024
+_DEAD_STATUSES = (404, 410)
+_FORM_MARKERS = re.compile(rb"<(form|input|textarea|select|iframe)\b", re.I)
+# JS で後から描画されるフォーム（SPA・埋め込みフォームサービス）の痕跡
+_DEFERRED_MARKERS = re.compile(
+    rb"(hsforms|hbspt|formrun|form\.run|typeform|jotform|formzu|tayori|google\.com/forms|forms\.gle|"
+    rb"__NEXT_DATA__|__NUXT__|ng-app|data-reactroot|id=[\"'](root|app|__next|__nuxt)[\"'])",
+    re.I,
+)
+
+
+@dataclass(slots=True)
+class TriageVerdict:
+    """トリアージ結果（viable=False なら reason を結果CSVの note に使う）"""
+    url: str
+    viable: bool
+    reason: str = ""
+    status: Optional[int] = None
+    final_url: str = ""
+
+
+def sniff_html(body: bytes, complete: bool) -> Optional[str]:
+    """フォームが無いと断定できれば "no-form"、それ以外は None"""
+    if not complete:
+        return None
+    if _FORM_MARKERS.search(body) or _DEFERRED_MARKERS.search(body):
+        return None
+    return "no-form"
+
+
+class UrlTriage:
+    """共有コネクタで URL を並行プローブする"""
+
+    def __init__(self, *, timeout: float = 8.0, concurrency: int = 50) -> None:
+        self.timeout = aiohttp.ClientTimeout(total=float(timeout))
+        self._sem = asyncio.Semaphore(max(1, int(concurrency)))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats: Counter[str] = Counter()
+
+    async def __aenter__(self) -> "UrlTriage":
+        self._session = aiohttp.ClientSession(
+            connector=new_connector(),
+            headers=DEFAULT_HEADERS,
+            timeout=self.timeout,
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self.stats:
+            logger.info("[triage] 集計: " + ", ".join(f"{k}={v}" for k, v in self.stats.most_common()))
+
+    async def probe(self, url: str) -> TriageVerdict:
+        async with self._sem:
+            verdict = await self._probe(url)
+        self.stats["viable" if verdict.viable else verdict.reason] += 1
+        return verdict
+
+    async def _probe(self, url: str) -> TriageVerdict:
+        if self._session is None:
+            raise RuntimeError("UrlTriage は async with で使用してください")
+        try:
+            async with self._session.get(url, allow_redirects=True) as resp:
+                final_url = str(resp.url)
+                if resp.status in _DEAD_STATUSES:
+                    return TriageVerdict(url, False, f"http-{resp.status}", resp.status, final_url)
+                ctype = (resp.headers.get("Content-Type") or "").lower()
+                if resp.status >= 400 or (ctype and "html" not in ctype):
+                    return TriageVerdict(url, True, "", resp.status, final_url)
+                body = b""
+                while len(body) < SNIFF_BYTES:
+                    chunk = await resp.content.read(SNIFF_BYTES - len(body))
+                    if not chunk:
+                        break
+                    body += chunk
+                complete = resp.content.at_eof()
+                reason = sniff_html(body, complete)
+                return TriageVerdict(url, reason is None, reason or "", resp.status, final_url)
+        except aiohttp.ClientSSLError:
+            # ブラウザ側は証明書エラーを無視するので判定保留
+            return TriageVerdict(url, True)
+        except aiohttp.ClientConnectorError as e:
+            # 名前解決失敗と接続拒否はどちらもブラウザでも失敗する
+            reason = "dns" if isinstance(e.os_error, socket.gaierror) else "connect"
+            return TriageVerdict(url, False, reason)
+        except aiohttp.InvalidURL:
+            return TriageVerdict(url, False, "invalid-url")
+        except Exception:
+            # タイムアウト等は判定保留（ブラウザ側の長めのタイムアウトに任せる）
+            return TriageVerdict(url, True)
@@ -0,0 +1,190 @@
+"""
+URL 分類器（広告・解析 / フォーム補助）
+
+ホスト名をラベル単位で後方一致させる辞書引きで判定する（O(ラベル数)）。
+- 遮断リスト: "doubleclick.net" のようなドメイン。サブドメインも一致
+- 許可リスト: "www.google.com/recaptcha" のように任意でパス接頭辞を付けられる
+- 既定リスト（constants）に加え、1行1エントリのテキストファイルを読み込める（# 以降はコメント）
+- 一致したルールごとのヒット数を数え、1回の実行で何を遮断したかを確認できる
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .constants import AD_ANALYTICS_DOMAINS, FORM_HELPER_DOMAINS
+
+__all__ = ["UrlClassifier", "load_list_file", "default_classifier"]
+
+logger = logging.getLogger(__name__)
+
+BLOCK = "block"
+ALLOW = "allow"
+
+
+def load_list_file(path: str) -> List[str]:
+    """1行1エントリのリストファイルを読む（空行・# コメントは無視）"""
+    entries: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                entries.append(line)
+    return entries
+
+
+def _split_entry(entry: str) -> Tuple[str, str]:
+    """'host[/path]' や URL 形式のエントリを (host, path接頭辞) に分解"""
+    entry = (entry or "").strip().lower()
+    if "://" in entry:
+        entry = entry.split("://", 1)[1]
+    host, sep, path = entry.partition("/")
+    host = host.lstrip("*.").rstrip(".")
+    return host, (sep + path) if path else ""
+
+
+def _host_and_path(url: str) -> Tuple[str, str]:
+    try:
+        parts = urlsplit(url)
+        return (parts.hostname or "").rstrip("."), parts.path or "/"
+    except Exception:
+        return "", ""
+
+
+class UrlClassifier:
+    """ホスト後方一致の辞書で広告・解析／フォーム補助を判定する"""
+
+    def __init__(
+        self,
+        block: Iterable[str] = AD_ANALYTICS_DOMAINS,
+        allow: Iterable[str] = FORM_HELPER_DOMAINS,
+    ) -> None:
+        self._block: set[str] = set()
+        self._allow: Dict[str, List[str]] = {}
+        self.hits: Counter[Tuple[str, str]] = Counter()
+        for entry in block:
+            self.add_block(entry)
+        for entry in allow:
+            self.add_allow(entry)
+
+    @classmethod
+    def from_files(cls, blocklist: Optional[str] = None, allowlist: Optional[str] = None) -> "UrlClassifier":
+        """既定リストにファイルのエントリを追加した分類器を作る"""
+        clf = cls()
+        if blocklist:
+            for entry in load_list_file(blocklist):
+                clf.add_block(entry)
+        if allowlist:
+            for entry in load_list_file(allowlist):
+                clf.add_allow(entry)
+        return clf
+
+    # ========= 登録 =========
+    def add_block(self, entry: str) -> None:
+        host, _ = _split_entry(entry)
+        if host:
+            self._block.add(host)
+
+    def add_allow(self, entry: str) -> None:
+        host, path = _split_entry(entry)
+        if not host:
+            return
+        prefixes = self._allow.setdefault(host, [])
+        if path not in prefixes:
+            prefixes.append(path)
+
+    @property
+    def block_domains(self) -> List[str]:
+        return sorted(self._block)
+
+    @property
+    def allow_hosts(self) -> List[str]:
+        """許可リストのホスト（パス接頭辞付きのエントリもホストだけ）"""
+        return sorted(self._allow)
+
+    # ========= 判定 =========
+    @staticmethod
+    def _suffixes(host: str):
+        labels = host.split(".")
+        for i in range(len(labels)):
+            yield ".".join(labels[i:])
+
+    def match_block(self, url: str) -> Optional[str]:
+        """遮断リストに一致したルール（ドメイン）を返す"""
+        host, _ = _host_and_path(url)
+        if not host:
+            return None
+        for suffix in self._suffixes(host):
+            if suffix in self._block:
+                return suffix
+        return None
+
+    def match_allow(self, url: str) -> Optional[str]:
+        """許可リストに一致したルール（host[/path]）を返す"""
+        host, path = _host_and_path(url)
+        if not host:
+            return None
+        path = path.lower()
+        for suffix in self._suffixes(host):
+            prefixes = self._allow.get(suffix)
+            if not prefixes:
+                continue
+            for prefix in prefixes:
+                if not prefix or path.startswith(prefix):
+                    return suffix + prefix
+        return None
+
+    def is_blocked(self, url: str) -> bool:
+        return self.match_block(url) is not None
+
+    def is_allowed(self, url: str) -> bool:
+        return self.match_allow(url) is not None
+
+    def classify(self, url: str, *, count: bool = True) -> Optional[str]:
+        """ALLOW / BLOCK / None を返す（許可リスト優先）。count=True でヒット数を記録"""
+        rule = self.match_allow(url)
+        if rule is not None:
+            if count:
+                self.hits[(ALLOW, rule)] += 1
+            return ALLOW
+        rule = self.match_block(url)
+        if rule is not None:
+            if count:
+                self.hits[(BLOCK, rule)] += 1
+            return BLOCK
+        return None
+
+    # ========= 統計 =========
+    def record(self, category: str, rule: str) -> None:
+        self.hits[(category, rule)] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """カテゴリ別の合計ヒット数"""
+        totals: Counter[str] = Counter()
+        for (category, _), n in self.hits.items():
+            totals[category] += n
+        return dict(totals)
+
+    def top(self, n: int = 10) -> List[Tuple[str, str, int]]:
+        return [(c, r, k) for (c, r), k in self.hits.most_common(n)]
+
+    def log_stats(self) -> None:
+        if not self.hits:
+            return
+        totals = ", ".join(f"{k}={v}" for k, v in sorted(self.stats().items()))
+        top = ", ".join(f"{r}({c})={k}" for c, r, k in self.top(5))
+        logger.info(f"[blocking] 遮断統計: {totals} / 上位: {top}")
+
+
+_DEFAULT: Optional[UrlClassifier] = None
+
+
+def default_classifier() -> UrlClassifier:
+    """既定リストのみの共有分類器（is_ad_or_analytics / is_form_helper 用）"""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = UrlClassifier()
+    return _DEFAULT
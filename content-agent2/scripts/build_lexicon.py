@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+語彙キャッシュのビルド: lexicon/base_synonyms.yml・custom_synonyms.yml（＋任意の追加 YAML）を
+マージ・コンパイルして lexicon/.cache/ に書き出す。FormFiller は YAML が変わるまでこれを再利用する。
+（キャッシュが無い・古い場合は実行時にも自動で作り直されるため、事前ビルドは任意）
+使い方: python scripts/build_lexicon.py [extra_lexicon.yml]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from form_filler.constants import DEFAULT_LEXICON_CACHE_DIR  # noqa: E402
+from form_filler.lexicon import lexicon_sources, write_lexicon_cache  # noqa: E402
+
+
+def main(extra: str | None = None) -> None:
+    lexicon, path = write_lexicon_cache(lexicon_sources(extra), DEFAULT_LEXICON_CACHE_DIR)
+    print(f"{path}: {len(lexicon)} keys")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
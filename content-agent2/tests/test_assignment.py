@@ -0,0 +1,49 @@
+import itertools
+
+from form_filler.assignment import hungarian, solve_assignment
+from form_filler.core import FormFiller
+
+
+def _brute_force_best(scores):
+    rows, cols = len(scores), len(scores[0])
+    best = 0.0
+    for perm in itertools.permutations(range(cols), rows):
+        best = max(best, sum(max(scores[i][j], 0.0) for i, j in enumerate(perm)))
+    return best
+
+
+def test_solve_assignment_is_globally_optimal():
+    # 貪欲（行順に最大を取る）だと 0 行目が列0を取り 9+1=10、最適は 8+7=15
+    scores = [[9, 8, 0], [7, 1, 0]]
+    assert solve_assignment(scores) == {0: 1, 1: 0}
+
+    scores = [[3, 5, 1, 0], [4, 2, 6, 1], [2, 7, 3, 5]]
+    got = solve_assignment(scores)
+    assert sum(scores[i][j] for i, j in got.items()) == _brute_force_best(scores)
+
+
+def test_solve_assignment_leaves_rows_without_positive_score_unassigned():
+    assert solve_assignment([[0, 0], [5, 0], [4, 0]]) == {1: 0}
+    assert solve_assignment([]) == {}
+    assert hungarian([[1, 2], [2, 1]]) == [0, 1]
+
+
+def test_cascade_assign_does_not_let_email_take_the_confirm_field():
+    core = FormFiller()
+    fields = [
+        {"selector": "#mail2", "tag": "input", "type": "email", "name": "mail_confirm",
+         "labelText": "メールアドレス（確認用）", "required": True, "visible": True},
+        {"selector": "#mail", "tag": "input", "type": "email", "name": "mail",
+         "labelText": "メールアドレス", "required": True, "visible": True},
+        {"selector": "#nm", "tag": "input", "type": "text", "name": "your-name",
+         "labelText": "お名前", "required": True, "visible": True},
+    ]
+    data = {"email": "a@example.com", "email_confirm": "a@example.com", "name": "山田 太郎"}
+
+    assigned, _, _ = core._cascade_assign(fields, data)
+
+    assert {k: f["selector"] for k, f in assigned.items()} == {
+        "email": "#mail",
+        "email_confirm": "#mail2",
+        "name": "#nm",
+    }
@@ -0,0 +1,76 @@
+import asyncio
+
+import form_filler.auto_select as auto_select_module
+from form_filler.auto_select import auto_select_all, reassert_selects
+
+PREFS = [("選択してください", "")] + [(f"県{i}", f"p{i}") for i in range(1, 46)] + [("東京都", "tokyo")]
+
+
+class SelectPage:
+    """window.__ff の selectState / applySelects を模擬するページ（values は selector → 現在値）"""
+
+    def __init__(self) -> None:
+        self.values = {"#pref": "", "#kind": "", "#hidden": ""}
+        self.options = {
+            "#pref": PREFS,
+            "#kind": [("選択してください", ""), ("製品について", "product"), ("採用について", "recruit")],
+            "#hidden": [("選択してください", ""), ("その他", "other")],
+        }
+        self.calls = []
+
+    async def evaluate(self, script, arg):
+        name, _version, value = arg
+        self.calls.append(name)
+        if name == "selectState":
+            sels, with_options = value
+            out = []
+            for sel in sels:
+                st = {"visible": sel != "#hidden", "value": self.values[sel]}
+                if with_options:
+                    st["options"] = [[t, v, False] for t, v in self.options[sel]]
+                out.append(st)
+            return out
+        if name == "applySelects":
+            res = []
+            for op in value:
+                v = dict(self.options[op["selector"]])[op["label"]]
+                self.values[op["selector"]] = v
+                res.append({"ok": True, "value": v})
+            return res
+        raise AssertionError(name)
+
+
+def test_auto_select_all_batches_and_reassert_only_touches_changed(monkeypatch):
+    async def fake_extract_labels_bulk(page_obj, scope_selector=None, classifier=None):
+        return [
+            {"selector": "#pref", "tag": "select", "name": "pref"},
+            {"selector": "#kind", "tag": "select", "name": "inquiry_type"},
+            {"selector": "#hidden", "tag": "select", "name": "category"},
+            {"selector": "#mail", "tag": "input", "name": "mail"},
+        ]
+
+    monkeypatch.setattr(auto_select_module, "extract_labels_bulk", fake_extract_labels_bulk)
+    page = SelectPage()
+    data = {"prefecture": "東京", "inquiry": "製品"}
+
+    async def run():
+        logs = await auto_select_all(page, data)
+        first_calls = list(page.calls)
+        page.calls.clear()
+        unchanged = await reassert_selects(page, data, logs)
+        page.values["#kind"] = "recruit"  # 後続処理が上書きした
+        changed = await reassert_selects(page, data, logs)
+        return logs, first_calls, unchanged, changed
+
+    logs, first_calls, unchanged, changed = asyncio.run(run())
+
+    assert first_calls == ["selectState", "applySelects"]
+    assert [(x["selector"], x["chosen_label"], x["value"]) for x in logs] == [
+        ("#pref", "東京都", "tokyo"),
+        ("#kind", "製品について", "product"),
+    ]
+    assert unchanged == []
+    assert [x["selector"] for x in changed] == ["#kind"]
+    assert page.values["#kind"] == "product"
+    # 変化なしの確認は selectState だけ、変化ありのときだけ applySelects
+    assert page.calls == ["selectState", "selectState", "applySelects"]
@@ -0,0 +1,117 @@
+import asyncio
+import types
+
+from form_filler.browser_pool import BrowserPool
+
+
+class FakeSession:
+    def __init__(self, sent) -> None:
+        self.sent = sent
+
+    async def send(self, method, params=None):
+        self.sent.append((method, params))
+        return {}
+
+    async def detach(self):
+        pass
+
+
+class FakePage:
+    def __init__(self, context) -> None:
+        self.context = context
+
+    async def close(self):
+        self.context.pages.remove(self)
+
+
+class FakeContext:
+    def __init__(self) -> None:
+        self.pages = []
+        self.handlers = {}
+        self.sent = []
+        self.cleared = []
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def new_cdp_session(self, page):
+        assert page in self.pages
+        return FakeSession(self.sent)
+
+    async def clear_cookies(self):
+        self.cleared.append("cookies")
+
+    async def clear_permissions(self):
+        self.cleared.append("permissions")
+
+    async def close(self):
+        self.closed = True
+
+    def visit(self, url, resource_type="document"):
+        self.handlers["request"](types.SimpleNamespace(url=url, resource_type=resource_type))
+
+
+class FakeBrowser:
+    def __init__(self, delay=0.0) -> None:
+        self.delay = delay
+        self.created = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **options):
+        await asyncio.sleep(self.delay)
+        ctx = FakeContext()
+        self.created.append(ctx)
+        return ctx
+
+
+def test_lease_clears_visited_origin_storage_before_reuse():
+    pool = BrowserPool(1, warm_contexts=1, max_heap_mb=0)
+    pool._browsers[0] = FakeBrowser()
+
+    async def run():
+        async with pool.lease() as first:
+            await first.new_page()
+            first.visit("https://example.com/contact")
+            first.visit("https://forms.example.net/embed?x=1")
+            first.visit("https://cdn.example.org/app.js", resource_type="script")
+        async with pool.lease() as second:
+            pass
+        await pool.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert second is first
+    assert first.cleared == ["cookies", "permissions", "cookies", "permissions"]
+    origins = [p["origin"] for m, p in first.sent if m == "Storage.clearDataForOrigin"]
+    assert origins == ["https://example.com", "https://forms.example.net"]
+    assert "local_storage" in first.sent[0][1]["storageTypes"] and "indexeddb" in first.sent[0][1]["storageTypes"]
+    # 2回目は訪問がないので CDP は使わない。ページはすべて閉じてから返す
+    assert len(first.sent) == 2 and first.pages == []
+
+
+def test_concurrent_refills_do_not_overshoot_warm_contexts():
+    pool = BrowserPool(1, warm_contexts=2, max_heap_mb=0)
+    browser = FakeBrowser(delay=0.05)
+    pool._browsers[0] = browser
+
+    async def run():
+        for _ in range(5):
+            pool._schedule_refill(0)
+        await asyncio.gather(*pool._refills.values())
+        idle = list(pool._idle[0])
+        await pool.close()
+        return idle
+
+    idle = asyncio.run(run())
+
+    assert len(idle) == 2
+    assert len(browser.created) == 2
@@ -0,0 +1,104 @@
+import asyncio
+
+from form_filler.consent import plan_control_actions, resolve_form_controls
+
+
+def box(i, name, label="", checked=False, pin=-1, **kw):
+    return {"i": i, "kind": "checkbox", "name": name, "id": "", "cls": "", "label": label,
+            "checked": checked, "pin": pin, "disabled": False, **kw}
+
+
+def radio(i, name, value, label="", context=None, **kw):
+    return {"i": i, "kind": "radio", "name": name, "id": "", "cls": "", "value": value, "label": label,
+            "ownLabel": label, "checked": False, "pin": -1, "disabled": False,
+            "required": False, "ariaRequired": "", "context": context or {"text": "", "reqAttr": ""}, **kw}
+
+
+def select(i, name, options, selected=0, in_root=True):
+    return {"i": i, "kind": "select", "name": name, "id": "", "cls": "", "disabled": False, "multiple": False,
+            "inRoot": in_root, "selectedIndex": selected,
+            "options": [{"value": v, "disabled": d} for v, d in options]}
+
+
+def test_plan_control_actions_matches_legacy_stages():
+    main = [
+        box(0, "news", "お知らせを受け取る"),
+        box(1, "kind[]", "お問い合わせ種別: 製品"),
+        box(2, "agree", "プライバシーポリシーに同意する", pin=3),
+        radio(3, "mailmag", "yes", "受け取る", context={"text": " メルマガ", "reqAttr": ""}),
+        radio(4, "mailmag", "no", "受け取らない"),
+        radio(5, "contact_by", "mail", "メール"),
+        radio(6, "contact_by", "tel", "電話で ok"),
+        select(7, "pref", [("", False), ("", True), ("hokkaido", False)]),
+        select(8, "done", [("", False), ("a", False)], selected=1),
+    ]
+    frame = [select(0, "outside", [("", False), ("x", False)], in_root=False)]
+
+    ops, summary = plan_control_actions([main, frame])
+
+    assert ops[0] == [
+        {"i": 1, "kind": "checkbox", "name": "kind[]"},
+        {"i": 2, "kind": "checkbox", "name": "agree"},
+        {"i": 6, "kind": "radio", "name": "contact_by"},
+        {"i": 7, "kind": "select", "name": "pref", "index": 2},
+    ]
+    assert ops[1] == []
+    assert summary["optional"] == "お問い合わせ種別: 製品"
+    assert summary["consent"] == "プライバシーポリシーに同意する"
+    assert summary["radios"] == ["contact_by"]
+    assert summary["selects"] == ["pref"]
+
+
+def test_plan_control_actions_uses_consent_radio_and_counts_it_as_selected():
+    snap = [
+        radio(0, "privacy", "0", "同意しない"),
+        radio(1, "privacy", "1", "同意する"),
+    ]
+    ops, summary = plan_control_actions([snap])
+
+    # 同意ラジオで選んだ群は未選択ラジオ群の段で二重に選ばない
+    assert ops == [[{"i": 1, "kind": "radio", "name": "privacy"}]]
+    assert summary["consent"] == "同意する" and summary["radios"] == []
+
+
+class ControlsFrame:
+    """window.__ff の controls / applyControls を模擬するフレーム"""
+
+    def __init__(self, snap, fail=False) -> None:
+        self.snap = snap
+        self.fail = fail
+        self.calls = []
+
+    async def evaluate(self, script, arg):
+        name, _version, value = arg
+        self.calls.append((name, value))
+        if self.fail:
+            raise RuntimeError("detached")
+        if name == "controls":
+            return [dict(c) for c in self.snap]
+        return [{"ok": True} for _ in value]
+
+
+class ControlsPage(ControlsFrame):
+    def __init__(self, snap, frames=(), fail=False) -> None:
+        super().__init__(snap, fail)
+        self.main_frame = object()
+        self.frames = [self.main_frame, *frames]
+
+
+def test_resolve_form_controls_uses_one_snapshot_and_one_apply_per_frame():
+    child = ControlsFrame([box(0, "agree", "利用規約に同意")])
+    page = ControlsPage([box(0, "category", "種別"), select(1, "pref", [("", False), ("tokyo", False)])], [child])
+
+    summary = asyncio.run(resolve_form_controls(page))
+
+    assert [n for n, _ in page.calls] == ["controls", "applyControls"]
+    assert [n for n, _ in child.calls] == ["controls", "applyControls"]
+    assert page.calls[0][1]["selects"] is True and child.calls[0][1]["selects"] is False
+    assert child.calls[1][1] == [{"i": 0, "kind": "checkbox", "name": "agree"}]
+    assert summary["applied"] == 3 and summary["failed"] == 0
+
+
+def test_resolve_form_controls_returns_none_when_no_frame_can_be_read():
+    page = ControlsPage([], fail=True)
+    assert asyncio.run(resolve_form_controls(page)) is None
@@ -42,7 +42,7 @@ def test_address_not_mapped_when_selector_reserved(monkeypatch):
     core = FormFiller()
     core.fast_mode = True
 
-    async def fake_extract_labels_bulk(page, scope_selector=None):
+    async def fake_extract_labels_bulk(page, scope_selector=None, classifier=None):
         return [
             {
                 "selector": "#shared",
@@ -200,14 +200,14 @@ def test_prefecture_defaults_survive_and_selection(monkeypatch, tmp_path):
             await self.select.select_option(label=label, value=value)
 
         async def evaluate(self, script, *args):
-            if "getClientRects" in script:
+            if args and args[0][0] == "rendered":
                 return True
             return None
 
     select = DummySelect(options_data)
     page = DummyPage(select)
 
-    async def fake_extract_labels_bulk(page_obj, scope_selector=None):
+    async def fake_extract_labels_bulk(page_obj, scope_selector=None, classifier=None):
         return [
             {
                 "selector": "#prefecture",
@@ -236,3 +236,166 @@ def test_prefecture_defaults_survive_and_selection(monkeypatch, tmp_path):
     changed = asyncio.run(run_auto_and_choose())
     assert changed == 0
     assert select.current_label == "東京都"
+
+
+class SnapshotPage(DummyPage):
+    """snapshot_form_controls の evaluate に固定のコントロール一覧を返すページ"""
+
+    def __init__(self, items) -> None:
+        super().__init__()
+        self.items = items
+        self.calls = 0
+
+    async def evaluate(self, script, *args):
+        self.calls += 1
+        return [dict(it) for it in self.items]
+
+
+def test_find_best_field_match_scores_snapshot_in_one_round_trip():
+    core = FormFiller()
+    page = SnapshotPage([
+        {"tag": "input", "attrs": {"name": "your-email", "type": "email"}, "label": "メールアドレス",
+         "nth": 1, "visible": False, "personal": False, "inScope": True},
+        {"tag": "input", "attrs": {"name": "personal_email", "type": "email"}, "label": "メールアドレス",
+         "nth": 2, "visible": True, "personal": True, "inScope": True},
+        {"tag": "input", "attrs": {"id": "mail", "type": "email"}, "label": "メールアドレス",
+         "nth": 3, "visible": True, "personal": False, "inScope": True},
+        {"tag": "textarea", "attrs": {"name": "message"}, "label": "お問い合わせ内容",
+         "nth": 1, "visible": True, "personal": False, "inScope": True},
+    ])
+
+    async def run():
+        email = await core.find_best_field_match(page, "email")
+        message = await core.find_best_field_match(page, "message")
+        excluded = await core.find_best_field_match(page, "email", exclude_selectors={"#mail"})
+        return email, message, excluded
+
+    email, message, excluded = asyncio.run(run())
+
+    assert email == (page, "#mail")
+    assert message == (page, 'textarea[name="message"]')
+    assert excluded is None
+    assert page.calls == 1
+
+
+def test_mapping_event_reports_stage_score_and_timing(monkeypatch):
+    core = FormFiller()
+    core.fast_mode = True
+
+    async def fake_extract_labels_bulk(page, scope_selector=None, classifier=None):
+        return [
+            {"selector": "#mail", "tag": "input", "type": "email", "name": "your-mail",
+             "labelText": "メールアドレス", "visible": True},
+            {"selector": "#url", "tag": "input", "type": "url", "name": "hp",
+             "labelText": "ホームページ", "visible": True},
+        ]
+
+    monkeypatch.setattr(core_module, "extract_labels_bulk", fake_extract_labels_bulk)
+    page = SnapshotPage([
+        {"tag": "input", "attrs": {"name": "corp", "type": "text"}, "label": "会社名",
+         "nth": 1, "visible": True, "personal": False, "inScope": True},
+    ])
+    data = {"email": "a@example.com", "website": "https://example.com", "company": "Example"}
+
+    element_map = asyncio.run(core.find_all_field_matches(page, data))
+    event = core._mapping_event(page, element_map)
+
+    by_key = {m["key"]: m for m in event["mapping"]}
+    assert by_key["email"]["stage"] == "prepass"
+    assert by_key["email"]["score"] is None
+    assert by_key["website"]["stage"] == "cascade"
+    assert by_key["website"]["score"] > 0
+    assert by_key["company"]["stage"] == "fallback"
+    assert by_key["company"]["score"] >= 5
+    assert by_key["company"]["detail"]
+    assert all(m["ms"] >= 0 for m in event["mapping"])
+    assert {"framework", "prepass", "cascade", "fallback"} <= set(event["stages"])
+
+
+def test_mapping_does_not_serialize_page_unless_learning(monkeypatch):
+    core = FormFiller()
+    core.fast_mode = True
+
+    async def fake_extract_labels_bulk(page, scope_selector=None, classifier=None):
+        return [
+            {"selector": "#corp_sub", "tag": "input", "type": "text", "name": "corp_sub",
+             "labelText": "件名", "visible": False},
+            {"selector": None, "tag": "input", "type": "text", "name": "address_hint",
+             "labelText": "mailing address", "visible": True},
+        ]
+
+    monkeypatch.setattr(core_module, "extract_labels_bulk", fake_extract_labels_bulk)
+
+    class CountingPage(DummyPage):
+        def __init__(self) -> None:
+            super().__init__()
+            self.content_calls = 0
+
+        async def content(self) -> str:
+            self.content_calls += 1
+            return "<html></html>"
+
+    page = CountingPage()
+    data = {"subject": "ご相談", "address": "東京都"}
+
+    element_map = asyncio.run(core.find_all_field_matches(page, data))
+    assert element_map["subject"] == (None, "#corp_sub")
+    assert page.content_calls == 0
+
+    core.learn = True
+    signals = []
+
+    async def record(self, page, soup, key):
+        signals.append((soup is not None, key))
+
+    core._record_learning_signal = types.MethodType(record, core)
+    asyncio.run(core.find_all_field_matches(page, data))
+    assert signals == [(True, "address")]
+    assert page.content_calls == 1
+
+
+def test_batch_fill_sends_one_plan_per_frame_and_reports_fallbacks():
+    core = FormFiller(batch_fill=True)
+    core._corp_scope_selector = None
+
+    class BatchPage(DummyPage):
+        def __init__(self) -> None:
+            super().__init__()
+            self.plans = []
+
+        async def evaluate(self, script, arg):
+            name, _version, (ops, _scope) = arg
+            assert name == "fill"
+            self.plans.append(ops)
+            results = {
+                "#nm": {"ok": True, "tag": "input", "type": "text"},
+                "#url": {"ok": True, "tag": "input", "type": "url"},
+                "#ta": {"ok": True, "tag": "textarea"},
+                "#pers": {"ok": False, "reason": "personal"},
+                "#sel": {"ok": False, "reason": "no-option", "tag": "select"},
+            }
+            return [results[op["selector"]] for op in ops]
+
+        async def evaluate_handle(self, script, selector):
+            return types.SimpleNamespace(as_element=lambda: ("form-of", selector))
+
+    page = BatchPage()
+    element_map = {
+        "name": (None, "#nm"), "website": (None, "#url"), "message": (None, "#ta"),
+        "company": (None, "#pers"), "subject": (None, "#sel"), "phone": (None, "#tel"),
+    }
+    data = {
+        "name": "山田 太郎", "website": "example.com", "message": "x", "company": "Example",
+        "subject": "資料請求", "phone": "03-0000-0000", "inquiry_template": "本文",
+    }
+    order = ["company", "name", "email", "phone", "website", "message", "subject"]
+
+    done, form = asyncio.run(core._batch_fill(page, element_map, data, order))
+
+    assert len(page.plans) == 1
+    sent = {op["selector"]: op for op in page.plans[0]}
+    assert "#tel" not in sent
+    assert sent["#url"]["value"] == "https://example.com"
+    assert sent["#ta"]["textareaValue"] == "本文"
+    assert done == {"name", "website", "message", "company"}
+    assert form == ("form-of", "#nm")
@@ -0,0 +1,59 @@
+from form_filler.frameworks import detect_framework
+
+
+def _field(name, *, tag="input", type_="text", form_class="", selector=None, visible=True, **extra):
+    return {
+        "tag": tag, "type": type_, "name": name, "visible": visible,
+        "selector": selector or f'{tag}[name="{name}"]',
+        "formSelector": "#f", "formClass": form_class, "formAction": "", "frameUrl": "https://example.com/contact",
+        **extra,
+    }
+
+
+def test_wpcf7_default_template_is_complete():
+    cf7 = "wpcf7-form init wpcf7"
+    fields = [
+        _field("_wpcf7", type_="hidden", visible=False, form_class=cf7),
+        _field("your-name", form_class=cf7),
+        _field("your-email", type_="email", form_class=cf7),
+        _field("your-subject", form_class=cf7),
+        _field("your-message", tag="textarea", form_class=cf7),
+        _field("", type_="submit", form_class=cf7),
+    ]
+    match = detect_framework(fields, ["name", "email", "message"])
+    assert match is not None and match.name == "wpcf7"
+    assert match.complete
+    # データに無い key（subject）はマッピングしない
+    assert match.mapping == {
+        "name": 'input[name="your-name"]',
+        "email": 'input[name="your-email"]',
+        "message": 'textarea[name="your-message"]',
+    }
+    assert match.scoped_submit_selectors()[0] == "#f input.wpcf7-submit"
+    assert ".wpcf7-mail-sent-ok" in match.success_selectors
+
+
+def test_elementor_custom_field_makes_match_partial():
+    fields = [
+        _field("form_fields[name]"),
+        _field("form_fields[email]", type_="email"),
+        _field("form_fields[field_3a9c]"),
+    ]
+    match = detect_framework(fields, ["name", "email"])
+    assert match is not None and match.name == "elementor"
+    assert not match.complete
+    assert match.unknown_fields == ["form_fields[field_3a9c]"]
+    assert set(match.mapping) == {"name", "email"}
+
+
+def test_hubspot_prefixed_names_and_no_match_for_generic_form():
+    fields = [
+        _field("0-1/firstname", form_class="hs-form stacked"),
+        _field("0-1/lastname", form_class="hs-form stacked"),
+        _field("0-1/email", type_="email", form_class="hs-form stacked"),
+    ]
+    match = detect_framework(fields, ["first_name", "last_name", "email"])
+    assert match is not None and match.name == "hubspot" and match.complete
+    assert match.mapping["first_name"] == 'input[name="0-1/firstname"]'
+
+    assert detect_framework([_field("email", type_="email"), _field("name")], ["name", "email"]) is None
@@ -0,0 +1,195 @@
+import asyncio
+import json
+from urllib.parse import parse_qsl, urlencode
+
+from aiohttp import web
+from bs4 import BeautifulSoup
+
+import form_filler.http_fastpath as http_fastpath_module
+from form_filler.core import FormFiller
+from form_filler.http_fastpath import HttpFastPath, _pick_form, _resolve_values, parse_form_fields
+from form_filler.models import FormTask, MappingTrace
+
+STATIC_FORM = """
+<html><body>
+<form method="post" action="/send">
+  <input type="hidden" name="token" value="abc123">
+  <table>
+    <tr><th>会社名</th><td><input type="text" name="company"></td></tr>
+    <tr><th>お名前</th><td><input type="text" name="your_name" required></td></tr>
+    <tr><th>メールアドレス</th><td><input type="email" name="your_email" required></td></tr>
+    <tr><th>お問い合わせ内容</th><td><textarea name="body"></textarea></td></tr>
+  </table>
+  <label><input type="checkbox" name="agree" value="1"> プライバシーポリシーに同意する</label>
+  <input type="submit" value="送信する">
+</form>
+</body></html>
+"""
+
+CAPTCHA_FORM = STATIC_FORM.replace("<form", '<script src="https://www.google.com/recaptcha/api.js"></script><form')
+
+
+def test_http_fast_path_submits_static_form_and_falls_back_on_captcha():
+    posted = []
+
+    async def form_page(request):
+        return web.Response(text=STATIC_FORM, content_type="text/html")
+
+    async def captcha_page(request):
+        return web.Response(text=CAPTCHA_FORM, content_type="text/html")
+
+    async def send(request):
+        posted.append(dict(await request.post()))
+        return web.Response(text="<p>お問い合わせありがとうございました。</p>", content_type="text/html")
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/contact", form_page)
+        app.router.add_get("/captcha", captcha_page)
+        app.router.add_post("/send", send)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        base = f"http://127.0.0.1:{port}"
+
+        filler = FormFiller()
+        data = {"company": "テスト株式会社", "name": "山田 太郎", "email": "taro@example.com"}
+        try:
+            async with HttpFastPath(filler, timeout=5) as fast:
+                ok = await fast.try_process(FormTask(form_url=f"{base}/contact", data=dict(data), index=0))
+                skipped = await fast.try_process(FormTask(form_url=f"{base}/captcha", data=dict(data), index=1))
+        finally:
+            await runner.cleanup()
+        return ok, skipped
+
+    ok, skipped = asyncio.run(main())
+
+    assert ok is not None and ok.status == "OK"
+    assert skipped is None
+    assert len(posted) == 1
+    sent = posted[0]
+    assert sent["token"] == "abc123"
+    assert sent["company"] == "テスト株式会社"
+    assert sent["your_name"] == "山田 太郎"
+    assert sent["your_email"] == "taro@example.com"
+    assert sent["body"]
+    assert sent["agree"] == "1"
+
+
+
+def test_http_mapping_event_matches_browser_shape(capsys):
+    doc = BeautifulSoup(STATIC_FORM, "html.parser")
+    form = _pick_form(doc)
+    data = {"company": "テスト株式会社", "name": "山田 太郎", "email": "taro@example.com"}
+    filler = FormFiller()
+    filler.emit_json = True
+    trace = MappingTrace()
+    assigned, _, _ = filler._cascade_assign([f for f in parse_form_fields(form, doc) if f["visible"]], data, trace=trace)
+    # 姓の欄しかない場合、name は後処理（_resolve_values）で姓の欄に寄せられる
+    assigned["last_name"] = assigned.pop("name")
+    trace.decisions["last_name"] = trace.decisions.pop("name")
+    mapping = _resolve_values(assigned, {**data, "last_name": ""})
+    trace.derive(mapping, "post-process")
+
+    HttpFastPath(filler)._emit_mapping("https://example.com/contact", mapping, trace)
+
+    event = json.loads(capsys.readouterr().out)
+    assert event["event"] == "mapping" and event["method"] == "http"
+    assert "cascade" in event["stages"]
+    by_key = {m["key"]: m for m in event["mapping"]}
+    assert set(by_key["email"]) == {"key", "selector", "stage", "score", "margin", "ms", "detail"}
+    assert by_key["email"]["stage"] == "cascade" and by_key["email"]["score"] > 0
+    assert by_key["name"]["stage"] == "derived" and by_key["name"]["detail"] == ["post-process"]
+
+
+async def _serve(pages, fn):
+    """pages（パス → HTML）を返し /send への POST の生本文を記録するサーバーで fn(base) を実行する"""
+    posted = []
+
+    async def page(request):
+        return web.Response(text=pages[request.path], content_type="text/html")
+
+    async def send(request):
+        posted.append(await request.read())
+        return web.Response(text="<p>お問い合わせありがとうございました。</p>", content_type="text/html")
+
+    app = web.Application()
+    for path in pages:
+        app.router.add_get(path, page)
+    app.router.add_post("/send", send)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await fn(f"http://127.0.0.1:{port}"), posted
+    finally:
+        await runner.cleanup()
+
+
+def test_http_fast_path_honours_accept_charset_lists():
+    pages = {
+        "/sjis": STATIC_FORM.replace("<form", '<form accept-charset="Shift_JIS"'),
+        "/list": STATIC_FORM.replace("<form", '<form accept-charset="bogus,UTF-8 Shift_JIS"'),
+    }
+    data = {"company": "テスト株式会社", "name": "山田 太郎", "email": "taro@example.com"}
+
+    async def run(base):
+        async with HttpFastPath(FormFiller(), timeout=5) as fast:
+            return [
+                await fast.try_process(FormTask(form_url=f"{base}{path}", data=dict(data), index=i))
+                for i, path in enumerate(pages)
+            ]
+
+    results, posted = asyncio.run(_serve(pages, run))
+
+    assert [r.status for r in results] == ["OK", "OK"]
+    assert urlencode({"company": "テスト株式会社"}, encoding="shift_jis").encode() in posted[0]
+    assert urlencode({"company": "テスト株式会社"}, encoding="utf-8").encode() in posted[1]
+
+
+def test_http_fast_path_only_defaults_required_radio_groups():
+    radios = """
+  <label><input type="radio" name="contact_by" value="mail">メール</label>
+  <label><input type="radio" name="contact_by" value="tel">電話</label>
+  <label><input type="radio" name="gender" value="m">男性</label>
+  <label><input type="radio" name="gender" value="f">女性</label>
+  <label><input type="radio" name="plan" value="a" required>A</label>
+  <label><input type="radio" name="plan" value="b" required>B</label>
+  <label><input type="radio" name="size" value="s">S</label>
+  <label><input type="radio" name="size" value="l" checked>L</label>
+"""
+    pages = {"/contact": STATIC_FORM.replace("<input type=\"submit\"", radios + "<input type=\"submit\"")}
+    data = {"company": "テスト株式会社", "name": "山田 太郎", "email": "taro@example.com"}
+
+    async def run(base):
+        async with HttpFastPath(FormFiller(), timeout=5) as fast:
+            return await fast.try_process(FormTask(form_url=f"{base}/contact", data=dict(data), index=0))
+
+    result, posted = asyncio.run(_serve(pages, run))
+
+    assert result.status == "OK"
+    sent = dict(parse_qsl(posted[0].decode()))
+    assert sent["plan"] == "b" and sent["size"] == "l"
+    assert "contact_by" not in sent and "gender" not in sent
+
+
+def test_try_process_falls_back_on_unexpected_parse_errors(monkeypatch):
+    def broken(form, fallback):
+        raise AttributeError("boom")
+
+    monkeypatch.setattr(http_fastpath_module, "_form_encoding", broken)
+    pages = {"/contact": STATIC_FORM}
+
+    async def run(base):
+        async with HttpFastPath(FormFiller(), timeout=5) as fast:
+            res = await fast.try_process(FormTask(form_url=f"{base}/contact", data={"email": "a@example.com"}, index=0))
+            return res, dict(fast.stats)
+
+    (res, stats), posted = asyncio.run(_serve(pages, run))
+
+    assert res is None and posted == []
+    assert stats == {"fallback:error": 1}
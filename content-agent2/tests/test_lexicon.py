@@ -0,0 +1,83 @@
+import re
+
+from form_filler.lexicon import Lexicon
+
+
+PATTERNS = {
+    "email": ["mail", r"e[-_ ]?mail", "メール", "mail"],
+    "phone": ["tel", r"(?<![a-z])phone", "電話番号"],
+    "name": [r"(氏名|お名前)", "fullname"],
+}
+
+
+def _brute(key, text):
+    return tuple(p for p in PATTERNS[key] if re.search(p, text, re.I))
+
+
+def test_scan_returns_every_matching_key_and_pattern():
+    lex = Lexicon(PATTERNS)
+    for text in ["your-email", "E-Mail メール", "お名前 tel", "telephone", "smartphone", "", "fullname_mail"]:
+        hits = lex.scan(text)
+        for key in PATTERNS:
+            assert hits.get(key, ()) == _brute(key, text), (key, text)
+            assert lex.matches(key, text) == _brute(key, text)
+
+
+def test_fullmatch_and_unknown_key():
+    lex = Lexicon(PATTERNS)
+    assert lex.fullmatch("email", "E-mail")
+    assert lex.fullmatch("phone", "電話番号")
+    assert not lex.fullmatch("phone", "電話番号（半角）")
+    assert lex.matches("zip_code", "zip_code_1") == ("zip_code",)
+    assert lex.matches("zip_code", "postal") == ()
+
+
+def test_load_lexicon_reuses_cache_until_yaml_changes(tmp_path, monkeypatch):
+    import os
+
+    import form_filler.lexicon as lexicon_module
+    from form_filler.lexicon import load_lexicon
+
+    src = tmp_path / "custom.yml"
+    src.write_text("email:\n  - pc_mail\nshoe_size:\n  - 靴\n", encoding="utf-8")
+    cache_dir = str(tmp_path / ".cache")
+
+    first = load_lexicon([str(src)], cache_dir, builtin=PATTERNS)
+    assert first.matches("email", "pc_mail") == ("mail", "mail", "pc_mail")
+    assert first.source_keys == {"email", "shoe_size"}
+
+    def _no_build(*args, **kwargs):
+        raise AssertionError("cache should have been used")
+
+    # mtime だけ変わっても内容が同じならキャッシュを使う
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+    with monkeypatch.context() as m:
+        m.setattr(lexicon_module, "build_lexicon", _no_build)
+        cached = load_lexicon([str(src)], cache_dir, builtin=PATTERNS)
+    assert cached.matches("shoe_size", "靴のサイズ") == ("靴",)
+
+    src.write_text("email:\n  - 連絡先\n", encoding="utf-8")
+    rebuilt = load_lexicon([str(src)], cache_dir, builtin=PATTERNS)
+    assert rebuilt.matches("email", "連絡先") == ("連絡先",)
+    assert "shoe_size" not in rebuilt
+
+
+def test_formfillers_with_different_lexicons_do_not_share_state(tmp_path, monkeypatch):
+    from form_filler.constants import CANDIDATES, FILLABLE_KEYS
+    from form_filler.core import FormFiller
+
+    monkeypatch.chdir(tmp_path)
+    a_path, b_path = tmp_path / "a.yml", tmp_path / "b.yml"
+    a_path.write_text("member_no:\n  - 会員番号\n", encoding="utf-8")
+    b_path.write_text("ticket_no:\n  - チケット番号\n", encoding="utf-8")
+    builtin_before = {k: list(v) for k, v in CANDIDATES.items()}
+    fillable_before = set(FILLABLE_KEYS)
+
+    a = FormFiller(lexicon=str(a_path))
+    b = FormFiller(lexicon=str(b_path))
+
+    assert a.lexicon.search("member_no", "会員番号") and "ticket_no" not in a.lexicon
+    assert b.lexicon.search("ticket_no", "チケット番号") and "member_no" not in b.lexicon
+    assert "member_no" in a.fillable_keys and "member_no" not in b.fillable_keys
+    assert CANDIDATES == builtin_before and FILLABLE_KEYS == fillable_before
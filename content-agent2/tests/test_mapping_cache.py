@@ -0,0 +1,81 @@
+import asyncio
+
+from form_filler.core import FormFiller
+from form_filler.mapping_cache import MappingCache, form_fingerprint
+
+
+FIELDS = [
+    {"tag": "input", "type": "text", "name": "your-name", "id": "", "labelText": "お名前", "visible": True},
+    {"tag": "input", "type": "email", "name": "your-email", "id": "", "labelText": "メールアドレス", "visible": True},
+]
+
+
+def test_fingerprint_depends_on_structure_and_data_keys():
+    base = form_fingerprint(FIELDS, ["name", "email"])
+    assert form_fingerprint([dict(f) for f in FIELDS], ["email", "name"]) == base
+    assert form_fingerprint(FIELDS, ["name"]) != base
+    changed = [dict(FIELDS[0]), dict(FIELDS[1], labelText="Email")]
+    assert form_fingerprint(changed, ["name", "email"]) != base
+    # id の無い欄の DOM パスが違えば（同じテンプレートでもテーマが違えば）別の指紋
+    here = [dict(f, selector=f"div:nth-of-type(1) > input:nth-of-type({i})") for i, f in enumerate(FIELDS, 1)]
+    there = [dict(f, selector=f"main > div:nth-of-type(2) > input:nth-of-type({i})") for i, f in enumerate(FIELDS, 1)]
+    assert form_fingerprint(here, ["name", "email"]) != form_fingerprint(there, ["name", "email"])
+
+
+def test_cache_round_trip_and_lexicon_invalidation(tmp_path):
+    path = str(tmp_path / "mapping.sqlite")
+    fp = form_fingerprint(FIELDS, ["name", "email"])
+    entries = [
+        ("name", "", 'input[name="your-name"]', {"tag": "input", "name": "your-name", "type": "text"}),
+        ("subject", None, "#corp_sub", {"tag": "input", "name": "corp_sub", "type": "hidden"}),
+    ]
+
+    cache = MappingCache(path, "lex-a")
+    assert cache.get(fp) is None
+    cache.put(fp, entries)
+    assert cache.get(fp) == entries
+    assert (cache.stats["hit"], cache.stats["miss"], cache.stats["store"]) == (1, 1, 1)
+    cache.close()
+
+    reopened = MappingCache(path, "lex-a")
+    assert reopened.get(fp) == entries
+    reopened.close()
+
+    bumped = MappingCache(path, "lex-b")
+    assert bumped.get(fp) is None
+    bumped.close()
+
+
+class MetaPage:
+    """window.__ff の fieldMetas を模擬するページ（dom は selector → 要素の tag/name/type）"""
+
+    def __init__(self, dom) -> None:
+        self.dom = dom
+        self.frames = []
+        self.main_frame = None
+
+    async def evaluate(self, script, arg):
+        name, _version, sels = arg
+        assert name == "fieldMetas"
+        return [self.dom.get(sel) for sel in sels]
+
+
+def test_cache_hit_is_checked_against_recorded_elements():
+    core = FormFiller()
+    path = "form > p:nth-of-type(2) > input"
+    first = MetaPage({path: {"tag": "input", "name": "your-email", "type": "email"}})
+    element_map = {"email": (first, path)}
+
+    entries = asyncio.run(core._mapping_to_cache_entries(first, element_map))
+    assert entries == [("email", "", path, {"tag": "input", "name": "your-email", "type": "email"})]
+
+    def check(page):
+        cached = core._mapping_from_cache_entries(page, entries)
+        return asyncio.run(core._cached_mapping_still_matches(page, cached, entries))
+
+    assert check(first)
+    # 同じパスが別サイトでは別の欄・存在しない要素を指す
+    assert not check(MetaPage({path: {"tag": "input", "name": "your-name", "type": "text"}}))
+    assert not check(MetaPage({}))
+    # 要素を確かめられないマッピングは保存しない
+    assert asyncio.run(core._mapping_to_cache_entries(MetaPage({}), {"email": (None, path)})) == []
@@ -0,0 +1,56 @@
+import math
+import re
+from collections import Counter
+
+from form_filler.auto_select import _best_pref_match, _choose_inquiry, _score_inquiry_option
+from form_filler.option_match import PREFECTURES, pref_code, text_profile
+from form_filler.utils import normalize
+
+
+def _reference_score(label, query):
+    """置き換え前の実装（Counter で毎回 bigram を数え直す）"""
+    def bigrams(s):
+        s = f" {s} "
+        return [s[i:i + 2] for i in range(max(len(s) - 1, 1))]
+
+    t, q = normalize(label), normalize(query)
+    ca, cb = Counter(bigrams(t)), Counter(bigrams(q))
+    dot = sum(ca[x] * cb[x] for x in set(ca) & set(cb))
+    na = math.sqrt(sum(v * v for v in ca.values()))
+    nb = math.sqrt(sum(v * v for v in cb.values()))
+    score = (1.5 if t == q else 0.0) + (1.0 if q in t else 0.0) + 0.9 * (dot / (na * nb) if na and nb else 0.0)
+    toks_t = {x for x in re.split(r"[\s/・,、]+", t) if x}
+    toks_q = {x for x in re.split(r"[\s/・,、]+", q) if x}
+    if toks_q:
+        score += 0.6 * len(toks_t & toks_q) / len(toks_q)
+    return score + min(len(label), 60) * 0.005
+
+
+def test_inquiry_score_matches_reference_and_reuses_profiles():
+    labels = ["製品について", "サービス・料金について", "採用について", "その他", "Product inquiry", ""]
+    for q in ["製品", "料金 サービス", "product", "その他のお問い合わせ"]:
+        for label in labels:
+            assert math.isclose(_score_inquiry_option(label, q), _reference_score(label, q)), (label, q)
+    assert text_profile("製品について") is text_profile("製品について")
+    options = [(x, x, False) for x in ["選択してください"] + labels[:-1]]
+    assert _choose_inquiry(options, "製品") == "製品について"
+
+
+def test_prefecture_index_covers_all_spelling_variants():
+    assert len(PREFECTURES) == 47
+    assert {pref_code(row[1]) for row in PREFECTURES} == set(range(1, 48))
+    for variant in ["東京", "東京都", "とうきょう", "トウキョウ", "Tokyo", "tokyo-to", "ＴＯＫＹＯ", "Tokyo Prefecture"]:
+        assert pref_code(variant) == 13, variant
+    assert pref_code("京都") == 26 and pref_code("Kyoto-fu") == 26
+    assert pref_code("北海道札幌市") == 1
+    assert pref_code("渋谷区") is None
+
+
+def test_best_pref_match_uses_codes_for_romaji_values():
+    options = [("選択してください", "", False), ("京都府", "kyoto", False), ("東京都", "tokyo", False)]
+    assert _best_pref_match(options, "東京都") == "東京都"
+    assert _best_pref_match(options, "とうきょう") == "東京都"
+    assert _best_pref_match([("Tokyo", "13", False), ("Kyoto", "26", False)], "東京") == "Tokyo"
+    assert _best_pref_match(options, "渋谷") is None
+    # 「京都」の正規形「京」は「東京」に部分一致するが、コードで先に京都府を選ぶ
+    assert _best_pref_match([("東京都", "13", False), ("京都府", "26", False)], "京都") == "京都府"
@@ -0,0 +1,65 @@
+import asyncio
+
+import form_filler.core  # noqa: F401  各モジュールの register を走らせる
+from form_filler.runtime import ff_call, install_runtime, runtime_script, runtime_version
+
+
+class RuntimePage:
+    """window.__ff の有無だけを模擬するページ（installed=False なら呼び出しは未注入の sentinel を返す）"""
+
+    def __init__(self, installed: bool) -> None:
+        self.installed = installed
+        self.sent = []
+
+    async def evaluate(self, script, arg=None):
+        self.sent.append((script, arg))
+        if len(arg) == 3:
+            name, version, value = arg
+            if not self.installed or version != runtime_version():
+                return {"__ffMissing": True}
+            return {"name": name, "value": value}
+        self.installed = True
+        name, value = arg
+        return {"name": name, "value": value, "reinstalled": True}
+
+
+class RuntimeContext:
+    def __init__(self) -> None:
+        self.scripts = []
+
+    async def add_init_script(self, script=None):
+        self.scripts.append(script)
+
+
+def test_ff_call_sends_only_name_and_reinstalls_when_missing():
+    fresh = RuntimePage(installed=False)
+    ready = RuntimePage(installed=True)
+
+    async def run():
+        first = await ff_call(fresh, "visible", "#mail")
+        second = await ff_call(fresh, "visible", "#mail")
+        third = await ff_call(ready, "snapshot", None)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert first == {"name": "visible", "value": "#mail", "reinstalled": True}
+    assert second == {"name": "visible", "value": "#mail"}
+    assert third == {"name": "snapshot", "value": None}
+    # 注入済みなら毎回送るのは短い呼び出し JS だけ
+    assert len(ready.sent) == 1 and len(ready.sent[0][0]) < 200
+    # 未注入: 呼び出し → 入れ直し＋呼び出し、以降は呼び出しだけ
+    assert len(fresh.sent) == 3
+    assert runtime_version() in fresh.sent[1][0]
+    assert fresh.sent[2][1] == ["visible", runtime_version(), "#mail"]
+
+
+def test_install_runtime_registers_every_helper_once_per_context():
+    ctx = RuntimeContext()
+    asyncio.run(install_runtime(ctx))
+
+    assert ctx.scripts == [runtime_script()]
+    script = ctx.scripts[0]
+    assert f'version: "{runtime_version()}"' in script
+    for name in ("snapshot", "labels", "labelsGen", "visible", "withinScope", "fill", "labelText", "selectOptions"):
+        assert f"    {name}: (" in script
@@ -0,0 +1,101 @@
+import asyncio
+
+from form_filler.selectors import extract_labels_bulk, selector_from_snapshot
+from form_filler.url_classifier import UrlClassifier
+from form_filler.utils import css_escape
+
+
+class GenPage:
+    """window.__ff の labelsGen と labels を模擬するページ（token は DOM 世代）"""
+
+    def __init__(self) -> None:
+        self.frames = []
+        self.main_frame = None
+        self.token = "doc:0"
+        self.scans = 0
+
+    async def evaluate(self, script, arg=None):
+        name, _version, value = arg
+        if name == "labelsGen":
+            return {"token": self.token, "fresh": value == self.token}
+        self.scans += 1
+        return [{"selector": "#mail", "name": "mail", "visible": True, "scan": self.scans,
+                 "rect": {"x": 0, "y": 0, "width": 100, "height": 20}}]
+
+
+def test_extract_labels_bulk_reuses_scan_until_dom_changes():
+    page = GenPage()
+
+    async def run():
+        first = await extract_labels_bulk(page)
+        first[0]["selector"] = "mutated-by-caller"
+        first[0]["rect"]["width"] = 0
+        second = await extract_labels_bulk(page)
+        page.token = "doc:1"
+        third = await extract_labels_bulk(page)
+        scoped = await extract_labels_bulk(page, scope_selector="form")
+        return second, third, scoped
+
+    second, third, scoped = asyncio.run(run())
+
+    assert second[0] == {"selector": "#mail", "name": "mail", "visible": True, "scan": 1,
+                         "rect": {"x": 0, "y": 0, "width": 100, "height": 20}}
+    assert third[0]["scan"] == 2
+    assert scoped[0]["scan"] == 3
+    assert page.scans == 3
+
+
+def test_selector_from_snapshot_matches_locator_rules():
+    assert selector_from_snapshot({"tag": "input", "attrs": {"id": "1a", "name": "x"}}) == "#" + css_escape("1a")
+    assert selector_from_snapshot({"tag": "select", "attrs": {"name": "pref"}}) == 'select[name="pref"]'
+    assert selector_from_snapshot({"tag": "input", "attrs": {"placeholder": "mail"}}) == 'input[placeholder="mail"]'
+    assert selector_from_snapshot({"tag": "textarea", "attrs": {}, "nth": 2}) == "textarea:nth-of-type(2)"
+
+
+class FakeFrame:
+    def __init__(self, url: str, delay: float = 0.0) -> None:
+        self.url = url
+        self.delay = delay
+        self.evaluated = False
+
+    async def evaluate(self, script, arg=None):
+        self.evaluated = True
+        if arg[0] == "labelsGen":
+            return {"token": "", "fresh": False}
+        await asyncio.sleep(self.delay)
+        return [{"selector": "#f", "frameUrl": self.url}]
+
+
+def test_extract_labels_bulk_runs_frames_concurrently_and_skips_ads():
+    page = GenPage()
+    form = FakeFrame("https://forms.example.com/embed", delay=0.2)
+    form2 = FakeFrame("https://share.hsforms.com/x", delay=0.2)
+    slow = FakeFrame("https://slow.example.com/", delay=5)
+    ad = FakeFrame("https://googleads.g.doubleclick.net/pagead")
+    page.frames = [page.main_frame, form, form2, slow, ad]
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        fields = await extract_labels_bulk(page, frame_timeout=0.5)
+        return fields, loop.time() - started
+
+    fields, elapsed = asyncio.run(run())
+
+    urls = [f.get("frameUrl") for f in fields]
+    assert urls[1:] == ["https://forms.example.com/embed", "https://share.hsforms.com/x"]
+    assert not ad.evaluated
+    assert elapsed < 1.0
+
+
+def test_extract_labels_bulk_uses_the_run_classifier():
+    page = GenPage()
+    form = FakeFrame("https://forms.example.com/embed")
+    page.frames = [page.main_frame, form]
+    # 実行時の --blocklist に載ったフォーム提供元は、既定リストに無くても抽出しない
+    clf = UrlClassifier(block=["forms.example.com"], allow=[])
+
+    fields = asyncio.run(extract_labels_bulk(page, classifier=clf))
+
+    assert [f.get("frameUrl") for f in fields[1:]] == []
+    assert not form.evaluated
@@ -0,0 +1,26 @@
+from form_filler.models import FormTask
+from form_filler.sharding import shard_key, shard_tasks
+
+
+def test_shard_tasks_keeps_domain_together_and_input_order():
+    urls = [
+        "https://www.example.com/contact",
+        "https://foo.example.org/form",
+        "https://example.com/inquiry",
+        "https://bar.example.net/",
+        "https://foo.example.org/form2",
+    ]
+    tasks = [FormTask(form_url=u, data={}, index=i) for i, u in enumerate(urls)]
+
+    shards = shard_tasks(tasks, 3)
+
+    assert sorted(t.index for s in shards for t in s) == list(range(len(urls)))
+    for shard in shards:
+        indices = [t.index for t in shard]
+        assert indices == sorted(indices)
+    owner = {}
+    for n, shard in enumerate(shards):
+        for t in shard:
+            owner.setdefault(shard_key(t.form_url), set()).add(n)
+    assert all(len(v) == 1 for v in owner.values())
+    assert shard_key(urls[0]) == shard_key(urls[2]) == "example.com"
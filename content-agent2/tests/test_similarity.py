@@ -0,0 +1,20 @@
+import difflib
+
+from form_filler.similarity import cosine, jaccard, ngram_profile, similar
+
+
+def test_cosine_tracks_sequence_matcher_on_field_names():
+    pairs = [("email", "email"), ("email", "your-email"), ("email", "company_name"), ("phone", "tel"), ("name", "n")]
+    for a, b in pairs:
+        ratio = difflib.SequenceMatcher(None, a, b).ratio()
+        assert similar(ngram_profile(a), ngram_profile(b), 0.65) == (ratio > 0.65), (a, b)
+
+
+def test_similarity_edge_cases():
+    empty = ngram_profile("")
+    assert cosine(empty, ngram_profile("email")) == 0.0
+    assert not similar(empty, empty, 0.0)
+    assert not similar(ngram_profile("email"), None, 0.1)
+    assert jaccard(ngram_profile("abcd"), ngram_profile("abce")) == 2 / 4
+    # 大きさの比だけで閾値に届かない組
+    assert not similar(ngram_profile("ab"), ngram_profile("abcdefghijklmnop"), 0.65)
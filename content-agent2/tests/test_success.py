@@ -0,0 +1,125 @@
+import asyncio
+import types
+
+from form_filler.success import race_success
+
+
+class SuccessPage:
+    """送信後のページを模擬する（probes は successProbe の返り値を順に返し、最後の値を繰り返す）"""
+
+    def __init__(self, probes, response=None, response_delay=None, url="https://example.com/contact") -> None:
+        self.probes = list(probes)
+        self.response = response
+        self.response_delay = response_delay
+        self.url = url
+        self.pending = 0
+        self.forms = []
+
+    async def wait_for_function(self, expression, arg=None, timeout=None):
+        await self._hang(timeout)
+
+    async def wait_for_response(self, predicate, timeout=None):
+        if self.response is not None and self.response_delay is not None:
+            await asyncio.sleep(self.response_delay)
+            if predicate(self.response):
+                return self.response
+        await self._hang(timeout)
+
+    async def evaluate(self, script, arg):
+        name, _version, value = arg
+        assert name == "successProbe"
+        self.forms.append(value["form"])
+        return self.probes.pop(0) if len(self.probes) > 1 else self.probes[0]
+
+    async def _hang(self, timeout):
+        self.pending += 1
+        try:
+            await asyncio.sleep(timeout / 1000)
+            raise RuntimeError("Timeout")
+        finally:
+            self.pending -= 1
+
+
+NOTHING = {"phrase": None, "cleared": False, "invalid": False}
+
+
+def _run(page, **kw):
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        res = await race_success(page, "https://example.com/contact", poll=0.05, **kw)
+        return res, loop.time() - started
+
+    return asyncio.run(run())
+
+
+def test_race_success_returns_on_first_phrase_and_cancels_waits():
+    page = SuccessPage([NOTHING, NOTHING, {"phrase": "送信完了", "cleared": False, "invalid": False}])
+
+    (ok, note), elapsed = _run(page, deadline=5.0)
+
+    assert ok and note == "visible_phrase:送信完了"
+    assert elapsed < 1.0
+    assert page.pending == 0
+
+
+def test_race_success_judges_form_post_json():
+    response = types.SimpleNamespace(
+        request=types.SimpleNamespace(method="POST"),
+        url="https://example.com/wp-json/contact-form-7/v1/feedback",
+        ok=True,
+        headers={"content-type": "application/json"},
+    )
+
+    async def json_body():
+        return {"status": "mail_sent", "success": True}
+
+    response.json = json_body
+    page = SuccessPage([NOTHING], response=response, response_delay=0.1)
+
+    (ok, note), _ = _run(page, deadline=5.0)
+
+    assert ok and note.startswith("post_json_success:")
+
+
+def test_race_success_gives_up_at_one_deadline_or_on_validation_errors():
+    (ok, note), elapsed = _run(SuccessPage([NOTHING]), deadline=0.4)
+    assert not ok and note == "no_success_indicator|no_post_detected"
+    assert elapsed < 1.0
+
+    # POST が見えないままのエラー表示は猶予が過ぎてから決着させる
+    (ok, note), elapsed = _run(SuccessPage([{"phrase": None, "cleared": False, "invalid": True}]), deadline=5.0, grace=0.3)
+    assert not ok and note == "validation_error"
+    assert 0.3 <= elapsed < 1.0
+
+
+def test_race_success_runs_extra_detectors():
+    async def framework_success():
+        await asyncio.sleep(0.05)
+        return True, "framework_success:cf7"
+
+    (ok, note), _ = _run(SuccessPage([NOTHING]), deadline=5.0, extra=[framework_success])
+    assert ok and note == "framework_success:cf7"
+
+
+def test_race_success_prefers_validation_error_over_cleared_form():
+    # 未入力のまま弾かれたフォームは空欄（cleared）でもエラー表示がある
+    form = object()
+    page = SuccessPage([{"phrase": None, "cleared": True, "invalid": True}])
+
+    (ok, note), _ = _run(page, deadline=5.0, form=form, grace=0.1)
+
+    assert not ok and note == "validation_error"
+    # クリア判定は送信したフォームに限る
+    assert page.forms and all(f is form for f in page.forms)
+
+
+def test_race_success_waits_for_the_post_before_trusting_cleared_fields():
+    # 送信と同時に JS が欄を空にするページ：POST 応答（0.3秒後）までは成功としない
+    response = types.SimpleNamespace(request=types.SimpleNamespace(method="POST"), url="https://example.com/api/log")
+    page = SuccessPage([{"phrase": None, "cleared": True, "invalid": False}], response=response, response_delay=0.3)
+
+    (ok, note), elapsed = _run(page, deadline=5.0)
+
+    assert ok and note == "fields_cleared"
+    assert 0.3 <= elapsed < 1.0
@@ -0,0 +1,50 @@
+import asyncio
+
+from aiohttp import web
+
+from form_filler.triage import UrlTriage, sniff_html
+
+
+def test_sniff_html_is_conservative():
+    assert sniff_html(b"<html><body><p>company profile</p></body></html>", True) == "no-form"
+    assert sniff_html(b"<html><body><form method=post></form></body></html>", True) is None
+    assert sniff_html(b'<html><body><div id="root"></div></body></html>', True) is None
+    assert sniff_html(b"<html><body><p>truncated", False) is None
+
+
+def test_probe_classifies_dead_and_viable_urls():
+    def page(text=None, status=200):
+        async def handler(request):
+            return web.Response(text=text, status=status, content_type="text/html")
+        return handler
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/form", page("<form><input name=a></form>"))
+        app.router.add_get("/plain", page("<p>no contact form here</p>"))
+        app.router.add_get("/busy", page(status=503))
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            async with UrlTriage(timeout=5) as triage:
+                return {
+                    name: await triage.probe(url)
+                    for name, url in {
+                        "form": f"{base}/form",
+                        "plain": f"{base}/plain",
+                        "missing": f"{base}/missing",
+                        "busy": f"{base}/busy",
+                        "refused": "http://127.0.0.1:1/",
+                    }.items()
+                }
+        finally:
+            await runner.cleanup()
+
+    v = asyncio.run(main())
+    assert v["form"].viable and v["busy"].viable
+    assert (v["plain"].viable, v["plain"].reason) == (False, "no-form")
+    assert (v["missing"].viable, v["missing"].reason) == (False, "http-404")
+    assert (v["refused"].viable, v["refused"].reason) == (False, "connect")
@@ -0,0 +1,112 @@
+import asyncio
+import types
+
+from form_filler.blocking import RequestBlocker
+from form_filler.core import is_ad_or_analytics, is_form_helper
+from form_filler.url_classifier import ALLOW, BLOCK, UrlClassifier
+
+
+def test_default_lists_match_by_host_suffix():
+    assert is_ad_or_analytics("https://www.googletagmanager.com/gtm.js?id=GTM-X")
+    assert is_ad_or_analytics("https://stats.g.doubleclick.net/collect")
+    assert not is_ad_or_analytics("https://doubleclick.net.example.com/")
+    assert not is_ad_or_analytics("https://example.com/?ref=doubleclick.net")
+
+    assert is_form_helper("https://www.google.com/recaptcha/api.js")
+    assert not is_form_helper("https://www.google.com/search?q=recaptcha")
+    assert is_form_helper("https://js.hcaptcha.com/1/api.js")
+
+
+def test_list_files_and_hit_counters(tmp_path):
+    block = tmp_path / "block.txt"
+    block.write_text("# comment\ntracker.example\n*.ads.example.org  # wildcard\n", encoding="utf-8")
+    allow = tmp_path / "allow.txt"
+    allow.write_text("tracker.example/form-helper\n", encoding="utf-8")
+
+    clf = UrlClassifier.from_files(str(block), str(allow))
+
+    assert clf.classify("https://cdn.tracker.example/pixel.js") == BLOCK
+    assert clf.classify("https://tracker.example/form-helper/v1.js") == ALLOW
+    assert clf.classify("https://x.ads.example.org/a") == BLOCK
+    assert clf.classify("https://example.org/") is None
+    assert clf.classify("https://cdn.tracker.example/pixel.js") == BLOCK
+    assert clf.stats() == {BLOCK: 3, ALLOW: 1}
+    assert clf.top(1) == [(BLOCK, "tracker.example", 2)]
+
+
+def test_allowlisted_path_under_blocked_host_is_left_to_route(tmp_path):
+    allow = tmp_path / "allow.txt"
+    allow.write_text("www.googletagmanager.com/gtag/js\n", encoding="utf-8")
+    blocker = RequestBlocker(UrlClassifier.from_files(allowlist=str(allow)))
+
+    # googletagmanager.com はネイティブ遮断から外し、他の広告ドメインは残す
+    assert not any("googletagmanager.com" in p for p in blocker.cdp_patterns)
+    assert "*://doubleclick.net/*" in blocker.cdp_patterns
+    assert blocker._ad_re.search("https://www.googletagmanager.com/gtag/js?id=G-X")
+
+    class FakeRoute:
+        def __init__(self, url):
+            self.request = types.SimpleNamespace(url=url)
+            self.outcome = None
+
+        async def continue_(self):
+            self.outcome = "continue"
+
+        async def abort(self):
+            self.outcome = "abort"
+
+    allowed = FakeRoute("https://www.googletagmanager.com/gtag/js?id=G-X")
+    blocked = FakeRoute("https://www.googletagmanager.com/gtm.js?id=GTM-X")
+    asyncio.run(blocker._on_ad(allowed))
+    asyncio.run(blocker._on_ad(blocked))
+    assert (allowed.outcome, blocked.outcome) == ("continue", "abort")
+
+
+class CdpPage:
+    """new_cdp_session の成否を差し替えられるページ（browser_name は browser_type.name）"""
+
+    def __init__(self, error=None, closed=False, browser_name="chromium") -> None:
+        self.error = error
+        self.closed = closed
+        self.sent = []
+        self.context = types.SimpleNamespace(
+            browser=types.SimpleNamespace(browser_type=types.SimpleNamespace(name=browser_name)),
+            new_cdp_session=self._new_cdp_session,
+        )
+
+    async def _new_cdp_session(self, page):
+        if self.error is not None:
+            raise self.error
+        sent = self.sent
+
+        class Session:
+            async def send(self, method, params=None):
+                sent.append(method)
+
+        return Session()
+
+    def is_closed(self):
+        return self.closed
+
+    def on(self, event, handler):
+        pass
+
+
+def test_attach_only_disables_native_blocking_for_unsupported_browsers():
+    blocker = RequestBlocker()
+
+    async def run():
+        crashed = await blocker.attach(CdpPage(error=RuntimeError("Target closed"), closed=True))
+        flaky = await blocker.attach(CdpPage(error=RuntimeError("Protocol error: Target crashed")))
+        after = CdpPage()
+        ok = await blocker.attach(after)
+        firefox = await blocker.attach(CdpPage(error=RuntimeError("CDP session is only available in Chromium"),
+                                               browser_name="firefox"))
+        return crashed, flaky, ok, after.sent, firefox
+
+    crashed, flaky, ok, sent, firefox = asyncio.run(run())
+
+    # 閉じた/落ちたページの失敗では後続のページのネイティブ遮断を止めない
+    assert (crashed, flaky, ok) == (False, False, True)
+    assert sent == ["Network.enable", "Network.setBlockedURLs"]
+    assert firefox is False and blocker.native is False